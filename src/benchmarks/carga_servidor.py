@@ -0,0 +1,157 @@
+# Prueba de carga del servidor HTTP/JSON (servidor.py): abre muchos clientes
+# concurrentes con conexión persistente, mezcla altas, atenciones y consultas
+# y reporta rendimiento y latencias p50/p99 por operación.
+# Sin --url levanta un servidor en memoria dentro del mismo proceso (clientes
+# y servidor comparten el loop, así que las cifras son conservadoras).
+# Uso (desde src/):
+#   python -m benchmarks.carga_servidor [--clientes 200] [--peticiones 50] [--url http://127.0.0.1:8080]
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from urllib.parse import urlsplit, quote
+
+from controllers.turnos import ControladorTurnos
+from models.paciente import Paciente
+from servidor import ServidorTurnos
+
+ESPECIALIDADES = list(Paciente.TIEMPOS_ESPECIALIDAD.keys())
+
+# (operación, peso): la mitad de las peticiones son lecturas
+MEZCLA = (
+    ('registrar', 40),
+    ('atender', 10),
+    ('siguiente', 15),
+    ('posicion', 15),
+    ('estado', 15),
+    ('estadisticas', 5)
+)
+
+
+class ClienteHTTP:
+    def __init__(self, host, puerto):
+        self.host = host
+        self.puerto = puerto
+        self.lector = None
+        self.escritor = None
+
+    async def conectar(self):
+        self.lector, self.escritor = await asyncio.open_connection(self.host, self.puerto)
+
+    async def pedir(self, metodo, ruta, datos=None):
+        cuerpo = json.dumps(datos).encode('utf-8') if datos is not None else b''
+        self.escritor.write((f"{metodo} {ruta} HTTP/1.1\r\n"
+                             f"Host: {self.host}\r\n"
+                             f"Content-Type: application/json\r\n"
+                             f"Content-Length: {len(cuerpo)}\r\n\r\n").encode('latin-1') + cuerpo)
+        await self.escritor.drain()
+
+        estado = int((await self.lector.readline()).split()[1])
+        largo = 0
+        while True:
+            linea = await self.lector.readline()
+            if linea in (b'\r\n', b'\n', b''):
+                break
+            clave, _, valor = linea.decode('latin-1').partition(':')
+            if clave.strip().lower() == 'content-length':
+                largo = int(valor)
+        return estado, json.loads(await self.lector.readexactly(largo))
+
+    async def cerrar(self):
+        self.escritor.close()
+        await self.escritor.wait_closed()
+
+
+async def cliente(numero, host, puerto, peticiones, latencias, errores):
+    conexion = ClienteHTTP(host, puerto)
+    await conexion.conectar()
+    generador = random.Random(numero)
+    operaciones = [operacion for operacion, _ in MEZCLA]
+    pesos = [peso for _, peso in MEZCLA]
+    registrados = []
+
+    try:
+        for i in range(peticiones):
+            operacion = generador.choices(operaciones, pesos)[0]
+            if operacion == 'registrar':
+                nombre = f"Cliente {numero}-{i}"
+                registrados.append(nombre)
+                argumentos = ('POST', '/pacientes', {
+                    'nombre': nombre,
+                    'edad': generador.randint(0, 100),
+                    'especialidad': generador.choice(ESPECIALIDADES)
+                })
+            elif operacion == 'atender':
+                argumentos = ('POST', '/atender')
+            elif operacion == 'posicion':
+                nombre = generador.choice(registrados) if registrados else "Nadie"
+                argumentos = ('GET', f"/posicion?nombre={quote(nombre)}")
+            else:
+                argumentos = ('GET', f"/{operacion}")
+
+            inicio = time.perf_counter()
+            estado, _ = await conexion.pedir(*argumentos)
+            latencias[operacion].append(time.perf_counter() - inicio)
+            # 404 en /posicion es válido: el paciente pudo haber sido atendido
+            if estado >= 500 or (estado >= 400 and operacion != 'posicion'):
+                errores[operacion] = errores.get(operacion, 0) + 1
+    finally:
+        await conexion.cerrar()
+
+
+def percentil(valores, fraccion):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(round(fraccion * (len(ordenados) - 1))))]
+
+
+def imprimir(latencias, errores, duracion, clientes):
+    todas = [latencia for valores in latencias.values() for latencia in valores]
+    print(f"{clientes} clientes, {len(todas)} peticiones en {duracion:.2f} s "
+          f"-> {len(todas) / duracion:,.0f} peticiones/s")
+    print(f"\n{'operación':<14}{'cantidad':>10}{'p50 (ms)':>12}{'p99 (ms)':>12}{'errores':>10}")
+    for operacion, valores in list(latencias.items()) + [('total', todas)]:
+        if not valores:
+            continue
+        errores_operacion = sum(errores.values()) if operacion == 'total' else errores.get(operacion, 0)
+        print(f"{operacion:<14}{len(valores):>10}{percentil(valores, 0.50) * 1000:>12.2f}"
+              f"{percentil(valores, 0.99) * 1000:>12.2f}{errores_operacion:>10}")
+
+
+async def ejecutar(opciones):
+    servidor = None
+    if opciones.url:
+        partes = urlsplit(opciones.url)
+        host, puerto = partes.hostname, partes.port or 80
+    else:
+        servidor = ServidorTurnos(ControladorTurnos())
+        host = '127.0.0.1'
+        puerto = await servidor.iniciar(host, 0)
+
+    latencias = {operacion: [] for operacion, _ in MEZCLA}
+    errores = {}
+    try:
+        inicio = time.perf_counter()
+        await asyncio.gather(*(cliente(numero, host, puerto, opciones.peticiones, latencias, errores)
+                               for numero in range(opciones.clientes)))
+        duracion = time.perf_counter() - inicio
+    finally:
+        if servidor is not None:
+            await servidor.detener()
+
+    imprimir(latencias, errores, duracion, opciones.clientes)
+    return 1 if errores else 0
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description="Prueba de carga del servidor de turnos")
+    parser.add_argument('--clientes', type=int, default=200, help="Clientes concurrentes")
+    parser.add_argument('--peticiones', type=int, default=50, help="Peticiones por cliente")
+    parser.add_argument('--url', help="Servidor ya en ejecución (por defecto uno en memoria)")
+    opciones = parser.parse_args(argumentos)
+    return asyncio.run(ejecutar(opciones))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
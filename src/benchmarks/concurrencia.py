@@ -0,0 +1,127 @@
+# Contención con varias recepciones (hilos productores) y doctores (hilos
+# consumidores) sobre un mismo ControladorTurnos. Compara la cola concurrente
+# de dos candados contra la cola normal protegida por un único candado global
+# y verifica al final que no se perdió ni se duplicó ningún paciente.
+# Uso (desde src/):
+#   python -m benchmarks.concurrencia [--pacientes 20000] [--intervalo 0.0005]
+import argparse
+import sys
+import threading
+import time
+
+from controllers.turnos import ControladorTurnos
+from models.paciente import Paciente
+
+ESPECIALIDADES = list(Paciente.TIEMPOS_ESPECIALIDAD.keys())
+COMBINACIONES = ((1, 1), (2, 2), (4, 4), (8, 2), (2, 8), (8, 8))
+ESPERA_DOCTOR = 0.0005
+
+
+class ControladorConCandado:
+    # Referencia: el controlador de siempre con un candado alrededor de todo
+    def __init__(self):
+        self.controlador = ControladorTurnos()
+        self._candado = threading.Lock()
+
+    def registrar_paciente(self, *argumentos):
+        with self._candado:
+            return self.controlador.registrar_paciente(*argumentos)
+
+    def atender_paciente(self):
+        with self._candado:
+            return self.controlador.atender_paciente()
+
+
+def ejecutar(crear, productores, consumidores, pacientes):
+    objetivo = crear()
+    controlador = getattr(objetivo, 'controlador', objetivo)
+    por_productor = pacientes // productores
+    total = por_productor * productores
+    atendidos = [[] for _ in range(consumidores)]
+    registrados = [0] * productores
+    listos = threading.Barrier(productores + consumidores + 1)
+    sin_altas = threading.Event()  # Todas las recepciones terminaron
+
+    def productor(numero):
+        listos.wait()
+        for i in range(por_productor):
+            # Cada nombre se intenta dos veces: desde su recepción y desde la
+            # siguiente, para forzar carreras en la revisión de duplicados
+            nombre = f"Paciente {(numero * por_productor + i) % total}"
+            exito, _ = objetivo.registrar_paciente(nombre, 30, ESPECIALIDADES[i % len(ESPECIALIDADES)])
+            registrados[numero] += exito
+            otro = f"Paciente {((numero + 1) % productores * por_productor + i) % total}"
+            exito, _ = objetivo.registrar_paciente(otro, 30, ESPECIALIDADES[i % len(ESPECIALIDADES)])
+            registrados[numero] += exito
+
+    def consumidor(numero):
+        listos.wait()
+        while True:
+            # Si ya no hay altas y la cola está vacía, no llegará nadie más
+            terminado = sin_altas.is_set()
+            paciente, _ = objetivo.atender_paciente()
+            if paciente is not None:
+                atendidos[numero].append(paciente.nombre)
+            elif terminado:
+                break
+            else:
+                # Doctor sin pacientes: espera un poco en vez de girar sobre
+                # la cola vacía y quitarle el GIL a las recepciones
+                time.sleep(ESPERA_DOCTOR)
+
+    recepciones = [threading.Thread(target=productor, args=(i,)) for i in range(productores)]
+    doctores = [threading.Thread(target=consumidor, args=(i,)) for i in range(consumidores)]
+    for hilo in recepciones + doctores:
+        hilo.start()
+    listos.wait()
+    inicio = time.perf_counter()
+    for hilo in recepciones:
+        hilo.join()
+    sin_altas.set()
+    for hilo in doctores:
+        hilo.join()
+    duracion = time.perf_counter() - inicio
+
+    nombres = [nombre for lista in atendidos for nombre in lista]
+    # Un nombre puede volver a registrarse después de ser atendido, así que lo
+    # que se exige es que cada alta exitosa se atienda exactamente una vez
+    errores = []
+    if len(nombres) != sum(registrados):
+        errores.append(f"{sum(registrados)} altas y {len(nombres)} atenciones")
+    if controlador.cola.tamano() != 0 or not controlador.cola.esta_vacia():
+        errores.append(f"quedaron {controlador.cola.tamano()} pacientes en la cola")
+    if controlador.total_pacientes_atendidos != len(nombres):
+        errores.append(f"contador de atendidos {controlador.total_pacientes_atendidos}")
+    operaciones = productores * por_productor * 2 + len(nombres)
+    return operaciones / duracion, errores
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description="Contención de la cola con varios hilos")
+    parser.add_argument('--pacientes', type=int, default=20_000, help="Altas distintas por corrida")
+    parser.add_argument('--intervalo', type=float, default=None,
+                        help="sys.setswitchinterval en segundos (menor = más contención)")
+    opciones = parser.parse_args(argumentos)
+    if opciones.intervalo is not None:
+        sys.setswitchinterval(opciones.intervalo)
+
+    variantes = (
+        ('dos candados', lambda: ControladorTurnos(concurrente=True)),
+        ('candado global', ControladorConCandado)
+    )
+    fallos = 0
+    print(f"{'recepciones':>12}{'doctores':>10}" + "".join(f"{nombre + ' (ops/s)':>26}" for nombre, _ in variantes))
+    for productores, consumidores in COMBINACIONES:
+        fila = f"{productores:>12}{consumidores:>10}"
+        for nombre, crear in variantes:
+            ops, errores = ejecutar(crear, productores, consumidores, opciones.pacientes)
+            fila += f"{ops:>26,.0f}"
+            for error in errores:
+                fallos += 1
+                print(f"  ERROR {nombre} {productores}x{consumidores}: {error}")
+        print(fila)
+    return 1 if fallos else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,181 @@
+# Micro-benchmarks de ColaPacientes y ControladorTurnos a distintos tamaños.
+# No usa Tk ni Graphviz. Uso (desde src/):
+#   python -m benchmarks.escalamiento                      # 10 .. 100k
+#   python -m benchmarks.escalamiento --max 1000000
+#   python -m benchmarks.escalamiento --guardar-base       # escribe la línea base
+#   python -m benchmarks.escalamiento --comparar           # falla si hay regresión
+import argparse
+import itertools
+import json
+import math
+import os
+import sys
+import time
+
+from controllers.turnos import ControladorTurnos
+from models.cola import ColaPacientes
+from models.paciente import Paciente
+
+ESPECIALIDADES = list(Paciente.TIEMPOS_ESPECIALIDAD.keys())
+TAMANOS = [10, 100, 1_000, 10_000, 100_000, 1_000_000]
+RUTA_BASE = os.path.join(os.path.dirname(__file__), 'linea_base.json')
+TIEMPO_MINIMO = 0.05  # Segundos mínimos de medición por operación y tamaño
+
+
+def crear_paciente(i):
+    return Paciente(f"Paciente {i}", i % 100, ESPECIALIDADES[i % len(ESPECIALIDADES)])
+
+
+def crear_controlador(tamano, almacen):
+    controlador = ControladorTurnos(almacen=almacen)
+    controlador.cola.encolar_lote(crear_paciente(i) for i in range(tamano))
+    return controlador
+
+
+def medir(funcion, repeticiones_iniciales=1):
+    # Repite la operación hasta juntar TIEMPO_MINIMO y devuelve segundos por operación
+    repeticiones = repeticiones_iniciales
+    while True:
+        inicio = time.perf_counter()
+        for _ in range(repeticiones):
+            funcion()
+        transcurrido = time.perf_counter() - inicio
+        if transcurrido >= TIEMPO_MINIMO or repeticiones >= 1_000_000:
+            return transcurrido / repeticiones
+        repeticiones *= 10
+
+
+def operaciones(tamano, almacen):
+    # Cada operación recibe un controlador con `tamano` pacientes y deja el
+    # tamaño aproximadamente estable para que las repeticiones sean comparables
+    controlador = crear_controlador(tamano, almacen)
+    cola = controlador.cola
+    ultimo = f"Paciente {tamano - 1}"
+    extra = (crear_paciente(i) for i in itertools.count(tamano))
+
+    def encolar_desencolar():
+        cola.encolar(next(extra))
+        cola.desencolar()
+
+    return controlador, {
+        'encolar+desencolar': encolar_desencolar,
+        'buscar': lambda: cola.buscar(ultimo),
+        'obtener_posicion_paciente': lambda: controlador.obtener_posicion_paciente(ultimo),
+        'tamano': cola.tamano,
+        'obtener_estadisticas_especialidad': controlador.obtener_estadisticas_especialidad,
+        'obtener_estado_cola': controlador.obtener_estado_cola,
+        'obtener_lista_pacientes(mitad, 20)': lambda: controlador.obtener_lista_pacientes(tamano // 2, 20),
+    }
+
+
+def pendiente_loglog(tamanos, tiempos):
+    # Ajuste por mínimos cuadrados de log(t) = k*log(n) + c; k ~ exponente
+    xs = [math.log(n) for n in tamanos]
+    ys = [math.log(max(t, 1e-12)) for t in tiempos]
+    media_x = sum(xs) / len(xs)
+    media_y = sum(ys) / len(ys)
+    numerador = sum((x - media_x) * (y - media_y) for x, y in zip(xs, ys))
+    denominador = sum((x - media_x) ** 2 for x in xs)
+    return numerador / denominador if denominador else 0.0
+
+
+def clasificar(pendiente):
+    if pendiente < 0.25:
+        return "O(1)"
+    if pendiente < 0.75:
+        return "sublineal"
+    if pendiente < 1.4:
+        return "O(n)"
+    return "O(n^2) o peor"
+
+
+def ejecutar(tamanos, almacen):
+    resultados = {}
+    for tamano in tamanos:
+        controlador, ops = operaciones(tamano, almacen)
+        for nombre, funcion in ops.items():
+            segundos = medir(funcion)
+            resultados.setdefault(nombre, {})[str(tamano)] = 1.0 / segundos
+        del controlador
+    return resultados
+
+
+def imprimir(resultados, tamanos):
+    encabezado = f"{'Operación':<34}" + "".join(f"{n:>12}" for n in tamanos) + f"{'Pendiente':>11}  Complejidad"
+    print("Operaciones por segundo")
+    print(encabezado)
+    print("-" * len(encabezado))
+    for nombre, por_tamano in resultados.items():
+        ops_seg = [por_tamano[str(n)] for n in tamanos]
+        pendiente = pendiente_loglog(tamanos, [1.0 / ops for ops in ops_seg])
+        fila = f"{nombre:<34}" + "".join(f"{ops:>12,.0f}" for ops in ops_seg)
+        print(f"{fila}{pendiente:>11.2f}  {clasificar(pendiente)}")
+
+
+def comparar(resultados, base, tolerancia):
+    # Regresión: menos ops/s que la base más allá de la tolerancia, o una
+    # complejidad ajustada peor que la registrada
+    regresiones = []
+    for nombre, por_tamano in resultados.items():
+        if nombre not in base:
+            continue
+        for tamano, ops in por_tamano.items():
+            ops_base = base[nombre].get(tamano)
+            if ops_base and ops < ops_base * (1 - tolerancia):
+                regresiones.append(
+                    f"{nombre} n={tamano}: {ops:,.0f} ops/s vs base {ops_base:,.0f} ops/s")
+
+        tamanos = sorted(int(t) for t in por_tamano if t in base[nombre])
+        if len(tamanos) >= 3:
+            actual = pendiente_loglog(tamanos, [1.0 / por_tamano[str(n)] for n in tamanos])
+            anterior = pendiente_loglog(tamanos, [1.0 / base[nombre][str(n)] for n in tamanos])
+            if clasificar(actual) != clasificar(anterior) and actual > anterior:
+                regresiones.append(
+                    f"{nombre}: complejidad {clasificar(actual)} (base {clasificar(anterior)})")
+    return regresiones
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description="Benchmarks de escalamiento de la cola")
+    parser.add_argument('--max', type=int, default=100_000, help="Tamaño máximo de cola")
+    parser.add_argument('--almacen', default='enlazada', choices=list(ColaPacientes.ALMACENES.keys()))
+    parser.add_argument('--base', default=RUTA_BASE, help="Archivo JSON de línea base")
+    parser.add_argument('--guardar-base', action='store_true', help="Guardar resultados como línea base")
+    parser.add_argument('--comparar', action='store_true', help="Comparar contra la línea base")
+    parser.add_argument('--tolerancia', type=float, default=0.5,
+                        help="Caída relativa de ops/s permitida antes de fallar (0.5 = 50%%)")
+    opciones = parser.parse_args(argumentos)
+
+    tamanos = [n for n in TAMANOS if n <= opciones.max]
+    resultados = ejecutar(tamanos, opciones.almacen)
+    imprimir(resultados, tamanos)
+
+    if opciones.guardar_base:
+        base = {}
+        if os.path.exists(opciones.base):
+            with open(opciones.base, encoding='utf-8') as archivo:
+                base = json.load(archivo)
+        base[opciones.almacen] = resultados
+        with open(opciones.base, 'w', encoding='utf-8') as archivo:
+            json.dump(base, archivo, indent=2)
+        print(f"\nLínea base guardada en {opciones.base}")
+
+    if opciones.comparar:
+        if not os.path.exists(opciones.base):
+            print(f"\nNo existe la línea base {opciones.base}")
+            return 1
+        with open(opciones.base, encoding='utf-8') as archivo:
+            base = json.load(archivo).get(opciones.almacen, {})
+        regresiones = comparar(resultados, base, opciones.tolerancia)
+        if regresiones:
+            print("\nREGRESIONES DETECTADAS:")
+            for regresion in regresiones:
+                print(f"  - {regresion}")
+            return 1
+        print("\nSin regresiones respecto a la línea base")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
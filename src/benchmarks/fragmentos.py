@@ -0,0 +1,68 @@
+# Rendimiento del CoordinadorClinicas a medida que crece la cantidad de
+# fragmentos (procesos). Cada ronda registra pacientes en lotes repartidos
+# por clínica, atiende una parte y consulta estado y estadísticas combinados.
+# Uso (desde src/):
+#   python -m benchmarks.fragmentos [--pacientes 200000] [--lote 5000] [--max-fragmentos N]
+import argparse
+import os
+import sys
+import time
+
+from controllers.coordinador import CoordinadorClinicas
+from models.paciente import Paciente
+
+ESPECIALIDADES = list(Paciente.TIEMPOS_ESPECIALIDAD.keys())
+
+
+def ejecutar(cantidad_fragmentos, pacientes, tamano_lote):
+    clinicas = [f"Clínica {i + 1}" for i in range(cantidad_fragmentos)]
+    with CoordinadorClinicas(clinicas) as coordinador:
+        # Un lote global se reparte en un sublote por clínica
+        inicio = time.perf_counter()
+        for desde in range(0, pacientes, tamano_lote):
+            filas = [{'nombre': f"Paciente {i}", 'edad': i % 100,
+                      'especialidad': ESPECIALIDADES[i % len(ESPECIALIDADES)],
+                      'clinica': clinicas[i % cantidad_fragmentos]}
+                     for i in range(desde, min(desde + tamano_lote, pacientes))]
+            resultados = coordinador.registrar_pacientes_lote(filas)
+            if not all(exito for exito, _ in resultados):
+                raise RuntimeError("Alta rechazada en el benchmark")
+        duracion_altas = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        for clinica in clinicas:
+            coordinador.atender_pacientes(clinica, pacientes // (2 * cantidad_fragmentos))
+        duracion_atenciones = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        for _ in range(100):
+            estado = coordinador.obtener_estado_cola()
+            estadisticas = coordinador.obtener_estadisticas_especialidad()
+        duracion_consultas = (time.perf_counter() - inicio) / 100
+
+        if sum(estadisticas.values()) != estado['total_pacientes']:
+            raise RuntimeError("Estado y estadísticas combinados no coinciden")
+    return pacientes / duracion_altas, pacientes / 2 / duracion_atenciones, duracion_consultas
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description="Escalamiento por fragmentos del coordinador")
+    parser.add_argument('--pacientes', type=int, default=200_000)
+    parser.add_argument('--lote', type=int, default=5_000, help="Filas por lote enviado")
+    parser.add_argument('--max-fragmentos', type=int, default=os.cpu_count() or 1)
+    opciones = parser.parse_args(argumentos)
+
+    cantidades = sorted({1, 2, 4, 8, 16, opciones.max_fragmentos})
+    cantidades = [n for n in cantidades if n <= opciones.max_fragmentos]
+    print(f"Núcleos disponibles: {os.cpu_count()}")
+    print(f"{'fragmentos':>10}{'altas/s':>14}{'atenciones/s':>16}{'consulta (ms)':>16}{'aceleración':>14}")
+    base = None
+    for cantidad in cantidades:
+        altas, atenciones, consulta = ejecutar(cantidad, opciones.pacientes, opciones.lote)
+        base = base or altas
+        print(f"{cantidad:>10}{altas:>14,.0f}{atenciones:>16,.0f}{consulta * 1000:>16.2f}{altas / base:>13.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
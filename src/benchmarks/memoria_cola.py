@@ -0,0 +1,81 @@
+# Comparación de memoria entre almacenamientos de ColaPacientes. La línea
+# base es una copia aparte del Paciente y el Nodo originales (sin
+# __slots__, un __dict__ por instancia) enlazados como en la primera cola.
+# Uso (desde src/): python -m benchmarks.memoria_cola [tamaño ...]
+import gc
+import sys
+import tracemalloc
+
+from models.cola import ColaPacientes
+from models.paciente import Paciente
+
+TAMANOS = [10_000, 100_000, 1_000_000]
+ESPECIALIDADES = list(Paciente.TIEMPOS_ESPECIALIDAD.keys())
+
+
+class PacienteOriginal:
+    # Los seis atributos del Paciente antes de __slots__. Una subclase de
+    # Paciente no sirve: heredaría los slots y el __dict__ quedaría vacío.
+    def __init__(self, nombre, edad, especialidad):
+        self.nombre = nombre
+        self.edad = edad
+        self.especialidad = especialidad
+        self.tiempo_atencion = Paciente.TIEMPOS_ESPECIALIDAD.get(especialidad, 10)
+        self.tiempo_registro = None
+        self.tiempo_espera_estimado = 0
+
+
+class NodoOriginal:
+    def __init__(self, info):
+        self.info = info
+        self.siguiente = None
+
+
+class ColaOriginal:
+    # Solo el enlace de nodos: la cola original además recalculaba todas las
+    # esperas en cada alta (O(n²)), lo que no cambia la memoria
+    def __init__(self):
+        self.primero = None
+        self.ultimo = None
+
+    def encolar(self, paciente):
+        nuevo_nodo = NodoOriginal(paciente)
+        if self.primero is None:
+            self.primero = nuevo_nodo
+        else:
+            self.ultimo.siguiente = nuevo_nodo
+        self.ultimo = nuevo_nodo
+
+
+def medir(tamano, almacen, clase_paciente=Paciente):
+    gc.collect()
+    tracemalloc.start()
+    cola = ColaOriginal() if almacen is None else ColaPacientes(almacen=almacen)
+    for i in range(tamano):
+        cola.encolar(clase_paciente(f"Paciente {i}", i % 100,
+                                    ESPECIALIDADES[i % len(ESPECIALIDADES)]))
+    actual, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del cola
+    return actual, pico
+
+
+def main(tamanos):
+    configuraciones = [
+        ('original (__dict__)', None, PacienteOriginal),
+        ('enlazada', 'enlazada', Paciente),
+        ('circular', 'circular', Paciente),
+    ]
+
+    print(f"{'Pacientes':>10} | {'Configuración':<20} | {'Actual (MB)':>11} | "
+          f"{'Pico (MB)':>9} | {'Bytes/paciente':>14}")
+    print("-" * 77)
+    for tamano in tamanos:
+        for nombre, almacen, clase_paciente in configuraciones:
+            actual, pico = medir(tamano, almacen, clase_paciente)
+            print(f"{tamano:>10} | {nombre:<20} | {actual / 2**20:>11.2f} | "
+                  f"{pico / 2**20:>9.2f} | {actual / tamano:>14.1f}")
+
+
+if __name__ == "__main__":
+    main([int(valor) for valor in sys.argv[1:]] or TAMANOS)
@@ -0,0 +1,104 @@
+# Compara el camino de archivos (render a PNG en disco + Image.open) contra el
+# camino en memoria (Digraph.pipe + BytesIO) para un refresco de la cola.
+# Requiere graphviz (Python y el binario dot) y Pillow. Uso (desde src/):
+#   python -m benchmarks.render_pipeline [pacientes] [repeticiones]
+import io
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from models.cola import ColaPacientes
+from models.paciente import Paciente
+from utils.graphviz_generator import GraphvizGenerator
+
+ESPECIALIDADES = list(Paciente.TIEMPOS_ESPECIALIDAD.keys())
+EVENTOS_CONTADOS = ('open', 'os.remove', 'os.rename', 'os.listdir', 'subprocess.Popen')
+
+
+class ContadorEventos:
+    # Cuenta eventos de auditoría del proceso (aperturas de archivo, borrados,
+    # subprocesos). Las llamadas al sistema de dot ocurren en el subproceso y
+    # no se cuentan; para verlas use: strace -f -c python -m benchmarks.render_pipeline
+    def __init__(self):
+        self.activo = False
+        self.conteo = {}
+        sys.addaudithook(self._gancho)
+
+    def _gancho(self, evento, argumentos):
+        if self.activo and evento in EVENTOS_CONTADOS:
+            self.conteo[evento] = self.conteo.get(evento, 0) + 1
+
+    def medir(self, funcion):
+        self.conteo = {}
+        self.activo = True
+        try:
+            funcion()
+        finally:
+            self.activo = False
+        return dict(self.conteo)
+
+
+def crear_pacientes(cantidad):
+    cola = ColaPacientes()
+    cola.encolar_lote(Paciente(f"Paciente {i}", i % 100, ESPECIALIDADES[i % len(ESPECIALIDADES)])
+                      for i in range(cantidad))
+    return cola.a_lista()
+
+
+def refresco_archivo(generador, pacientes, directorio):
+    # Camino original: DOT a disco, PNG a disco, borrar fuente, releer PNG
+    from PIL import Image
+    dot = generador.build_queue_dot(pacientes)
+    ruta = os.path.join(directorio, 'queue_visualization')
+    dot.render(ruta, format='png', cleanup=True)
+    with Image.open(f"{ruta}.png") as imagen:
+        imagen.thumbnail((600, 400), Image.Resampling.LANCZOS)
+
+
+def refresco_memoria(generador, pacientes):
+    from PIL import Image
+    png = generador.build_queue_dot(pacientes).pipe(format='png')
+    with Image.open(io.BytesIO(png)) as imagen:
+        imagen.thumbnail((600, 400), Image.Resampling.LANCZOS)
+
+
+def main(cantidad=20, repeticiones=20):
+    generador = GraphvizGenerator()
+    if not generador.is_available():
+        print("Graphviz no está disponible")
+        return 1
+    if not generador.has_executable():
+        print("No se encontró el ejecutable dot de Graphviz en el PATH")
+        return 1
+
+    pacientes = crear_pacientes(cantidad)
+    contador = ContadorEventos()
+    directorio = tempfile.mkdtemp(prefix='render_bench_')
+
+    caminos = {
+        'archivo (render + Image.open)': lambda: refresco_archivo(generador, pacientes, directorio),
+        'memoria (pipe + BytesIO)': lambda: refresco_memoria(generador, pacientes),
+    }
+
+    print(f"Refresco de cola con {cantidad} pacientes, {repeticiones} repeticiones")
+    for nombre, funcion in caminos.items():
+        funcion()  # Calentamiento
+        tiempos = []
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            funcion()
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+        eventos = contador.medir(funcion)
+
+        print(f"\n{nombre}")
+        print(f"  mediana: {statistics.median(tiempos):.1f} ms | "
+              f"mínimo: {min(tiempos):.1f} ms | máximo: {max(tiempos):.1f} ms")
+        print(f"  eventos por refresco: {eventos}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(*[int(valor) for valor in sys.argv[1:3]]))
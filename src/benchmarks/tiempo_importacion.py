@@ -0,0 +1,60 @@
+# Tiempo de importación de cada punto de entrada con `python -X importtime`:
+# total, los módulos más pesados y si se cargó algo de la interfaz gráfica
+# (tkinter, PIL, graphviz), que la línea de comandos no debería tocar.
+# Uso (desde src/):
+#   python -m benchmarks.tiempo_importacion [--top 10] [--repeticiones 5]
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+OBJETIVOS = ('cli', 'servidor', 'controllers.turnos', 'utils.graphviz_generator', 'views.main_page')
+MODULOS_GRAFICOS = ('tkinter', 'PIL', 'graphviz')
+
+
+def medir(modulo):
+    # Devuelve {módulo: (propio, acumulado)} en microsegundos
+    proceso = subprocess.run([sys.executable, '-X', 'importtime', '-c', f"import {modulo}"],
+                             cwd=SRC_DIR, capture_output=True, text=True)
+    if proceso.returncode != 0:
+        raise RuntimeError(proceso.stderr.strip().splitlines()[-1])
+
+    tiempos = {}
+    for linea in proceso.stderr.splitlines():
+        if not linea.startswith('import time:') or 'self [us]' in linea:
+            continue
+        propio, acumulado, nombre = linea[len('import time:'):].split('|')
+        tiempos[nombre.strip()] = (int(propio), int(acumulado))
+    return tiempos
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description="Tiempo de importación por punto de entrada")
+    parser.add_argument('--top', type=int, default=10, help="Módulos más pesados a mostrar")
+    parser.add_argument('--repeticiones', type=int, default=5, help="Se informa la mediana")
+    opciones = parser.parse_args(argumentos)
+
+    for objetivo in OBJETIVOS:
+        try:
+            corridas = [medir(objetivo) for _ in range(opciones.repeticiones)]
+        except RuntimeError as e:
+            print(f"\n{objetivo}: no se pudo importar ({e})")
+            continue
+
+        total = statistics.median(sum(propio for propio, _ in corrida.values()) for corrida in corridas)
+        ultima = corridas[-1]
+        graficos = sorted({nombre.split('.')[0] for nombre in ultima
+                           if nombre.split('.')[0] in MODULOS_GRAFICOS})
+        print(f"\n{objetivo}: {total / 1000:.1f} ms, {len(ultima)} módulos"
+              f" | gráficos: {', '.join(graficos) if graficos else 'ninguno'}")
+
+        pesados = sorted(ultima.items(), key=lambda elemento: elemento[1][1], reverse=True)
+        for nombre, (propio, acumulado) in pesados[:opciones.top]:
+            print(f"  {acumulado / 1000:>8.1f} ms acumulado {propio / 1000:>8.1f} ms propio  {nombre}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,182 @@
+# Línea de comandos sin interfaz gráfica para uso por scripts y en lote.
+# Solo importa modelos, controladores y la persistencia: Tk, PIL y Graphviz
+# no se cargan nunca. La cola vive en el diario de `--datos`, el mismo que
+# usa la interfaz gráfica. Uso (desde src/):
+#   python cli.py registrar "Ana Pérez" 34 Pediatría [--prioridad 1]
+#   python cli.py atender [--cantidad N]
+#   python cli.py estado [--json]
+#   python cli.py importar pacientes.csv
+#   python cli.py exportar cola.jsonl
+# Con --metricas RUTA se escribe al salir la latencia de cada operación del
+# controlador en formato de texto de Prometheus; con --perfil DIR se perfilan
+# las llamadas al controlador (cProfile + tracemalloc) y se dejan los
+# reportes en DIR.
+import argparse
+import json
+import os
+import sys
+
+from utils.diario import recuperar_controlador, bloquear_datos, ALMACENES
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'datos')
+
+
+def comando_registrar(controlador, opciones):
+    if opciones.prioridad is not None and controlador.almacen != 'triaje':
+        print(f"Aviso: la cola usa almacenamiento {controlador.almacen}; "
+              f"la prioridad se guarda pero no cambia el orden", file=sys.stderr)
+    exito, mensaje = controlador.registrar_paciente(
+        opciones.nombre, opciones.edad, opciones.especialidad, opciones.prioridad)
+    print(mensaje)
+    return exito
+
+
+def comando_atender(controlador, opciones):
+    for _ in range(opciones.cantidad):
+        paciente, mensaje = controlador.atender_paciente()
+        print(mensaje)
+        if paciente is None:
+            return False
+    return True
+
+
+def comando_estado(controlador, opciones):
+    estado = controlador.obtener_estado_cola()
+    siguiente = estado['siguiente_paciente']
+    estadisticas = controlador.obtener_estadisticas_especialidad()
+    tiempos = controlador.obtener_tiempos_servicio()
+
+    if opciones.json:
+        estado['siguiente_paciente'] = siguiente.a_diccionario() if siguiente else None
+        estado['especialidades'] = estadisticas
+        estado['tiempos_servicio'] = tiempos
+        print(json.dumps(estado, ensure_ascii=False, indent=2))
+        return True
+
+    print(f"Pacientes en cola: {estado['total_pacientes']}")
+    print(f"Tiempo total estimado: {estado['tiempo_total_estimado']} min "
+          f"(p50 {estado['tiempo_total_p50']}, p90 {estado['tiempo_total_p90']})")
+    print(f"Pacientes atendidos: {estado['pacientes_atendidos_hoy']}")
+    print(f"Siguiente paciente: {siguiente.nombre if siguiente else '-'}")
+    for especialidad, cantidad in estadisticas.items():
+        tiempo = tiempos[especialidad]
+        print(f"  {especialidad}: {cantidad} | atención {tiempo['media']} min"
+              f" ({tiempo['muestras']} muestras)")
+    return True
+
+
+def comando_importar(controlador, opciones):
+    from utils.importador import importar_pacientes
+    exito, mensaje, errores = importar_pacientes(controlador, opciones.ruta)
+    print(mensaje)
+    for numero_fila, error in errores[:opciones.max_errores]:
+        print(f"  Fila {numero_fila}: {error}")
+    if len(errores) > opciones.max_errores:
+        print(f"  ... y {len(errores) - opciones.max_errores} errores más")
+    return exito
+
+
+def comando_exportar(controlador, opciones):
+    from utils.importador import exportar_pacientes
+    exito, mensaje = exportar_pacientes(controlador, opciones.ruta)
+    print(mensaje)
+    return exito
+
+
+def crear_parser():
+    parser = argparse.ArgumentParser(prog="cli.py", description="Turnos médicos sin interfaz gráfica")
+    parser.add_argument('--datos', default=DATA_DIR, help="Directorio del diario e instantáneas")
+    parser.add_argument('--almacen', default=None, choices=ALMACENES,
+                        help="Por defecto el guardado en --datos (o enlazada)")
+    parser.add_argument('--metricas', metavar='RUTA', help="Archivo .prom con las latencias medidas")
+    parser.add_argument('--perfil', metavar='DIR', help="Directorio para .pstats y reportes de memoria")
+    parser.add_argument('--perfil-llamadas', type=int, default=1000,
+                        help="Llamadas al controlador a perfilar")
+    comandos = parser.add_subparsers(dest='comando', required=True)
+
+    registrar = comandos.add_parser('registrar', help="Registrar un paciente")
+    registrar.add_argument('nombre')
+    registrar.add_argument('edad', type=int)
+    registrar.add_argument('especialidad')
+    registrar.add_argument('--prioridad', type=int, default=None,
+                           help="1 Urgente, 2 Preferente, 3 Normal (solo con almacenamiento triaje)")
+    registrar.set_defaults(funcion=comando_registrar, modifica=True)
+
+    atender = comandos.add_parser('atender', help="Atender al siguiente paciente")
+    atender.add_argument('--cantidad', type=int, default=1)
+    atender.set_defaults(funcion=comando_atender, modifica=True)
+
+    estado = comandos.add_parser('estado', help="Estado de la cola")
+    estado.add_argument('--json', action='store_true', help="Salida en JSON")
+    estado.set_defaults(funcion=comando_estado, modifica=False)
+
+    importar = comandos.add_parser('importar', help="Importar pacientes desde .csv, .json o .jsonl")
+    importar.add_argument('ruta')
+    importar.add_argument('--max-errores', type=int, default=20, help="Errores a mostrar")
+    importar.set_defaults(funcion=comando_importar, modifica=True)
+
+    exportar = comandos.add_parser('exportar', help="Exportar la cola a .csv, .json o .jsonl")
+    exportar.add_argument('ruta')
+    exportar.set_defaults(funcion=comando_exportar, modifica=False)
+    return parser
+
+
+def main(argumentos=None):
+    opciones = crear_parser().parse_args(argumentos)
+    if not opciones.modifica:
+        return ejecutar(opciones)
+    # Dos comandos que modifican a la vez reproducirían el mismo estado y
+    # uno pisaría al otro: se espera al candado de --datos
+    candado = bloquear_datos(opciones.datos)
+    try:
+        return ejecutar(opciones)
+    finally:
+        candado.close()
+
+
+def ejecutar(opciones):
+    if opciones.perfil:
+        # Desde antes de cargar la cola, para que la primera instantánea la incluya
+        import tracemalloc
+        from utils.perfilado import MARCOS_TRACEMALLOC
+        tracemalloc.start(MARCOS_TRACEMALLOC)
+
+    # Las consultas no abren un diario ni escriben en --datos
+    try:
+        controlador = recuperar_controlador(opciones.datos, diario=opciones.modifica,
+                                            almacen=opciones.almacen)
+    except ValueError as e:
+        print(str(e), file=sys.stderr)
+        return 1
+    metricas = None
+    if opciones.metricas:
+        from utils.metricas import RegistroMetricas, METODOS_CONTROLADOR
+        metricas = RegistroMetricas()
+        metricas.instrumentar(controlador, METODOS_CONTROLADOR, 'controlador')
+    sesion = None
+    if opciones.perfil:
+        from utils.metricas import METODOS_CONTROLADOR
+        from utils.perfilado import SesionPerfilado
+        sesion = SesionPerfilado(opciones.perfil, opciones.perfil_llamadas,
+                                 lambda exito, mensaje, rutas: print(mensaje, file=sys.stderr))
+        _, mensaje = sesion.iniciar([(controlador, METODOS_CONTROLADOR)])
+        print(mensaje, file=sys.stderr)
+    try:
+        exito = opciones.funcion(controlador, opciones)
+    finally:
+        if sesion is not None and sesion.activa:
+            sesion.terminar()
+        # Cada invocación es un proceso corto: el diario se cierra con fsync.
+        # Si quedaron varios diarios sin cubrir se compactan en una
+        # instantánea, así el próximo arranque no los reproduce todos.
+        if controlador.diario is not None:
+            if controlador.diario.requiere_compactacion():
+                controlador.diario.guardar_instantanea(controlador)
+            controlador.diario.cerrar()
+        if metricas is not None:
+            metricas.escribir_prometheus(opciones.metricas)
+    return 0 if exito else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
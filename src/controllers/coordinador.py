@@ -0,0 +1,308 @@
+import multiprocessing
+import os
+from controllers.turnos import ControladorTurnos
+from models.paciente import Paciente
+
+
+def _ejecutar_fragmento(conexion, claves, directorio, opciones):
+    # Proceso de un fragmento: un ControladorTurnos por cada clave que le
+    # toca (clínica o especialidad), así cada una conserva su propio orden
+    # FIFO aunque compartan proceso. Responde por su conexión hasta recibir None.
+    controladores = {}
+    try:
+        for clave in claves:
+            if directorio is not None:
+                from utils.diario import recuperar_controlador
+                controladores[clave] = recuperar_controlador(os.path.join(directorio, clave), **opciones)
+            else:
+                controladores[clave] = ControladorTurnos(**opciones)
+
+        while True:
+            mensaje = conexion.recv()
+            if mensaje is None:
+                break
+            # Un mensaje por fragmento con los argumentos de cada clave; None
+            # es la misma consulta sin argumentos en todas sus claves
+            operacion, argumentos_por_clave = mensaje
+            if argumentos_por_clave is None:
+                argumentos_por_clave = {clave: () for clave in controladores}
+            try:
+                conexion.send((True, {clave: OPERACIONES[operacion](controladores[clave], *argumentos)
+                                      for clave, argumentos in argumentos_por_clave.items()}))
+            except Exception as e:
+                conexion.send((False, f"{type(e).__name__}: {str(e)}"))
+    finally:
+        for controlador in controladores.values():
+            if controlador.diario is not None:
+                controlador.diario.cerrar()
+        conexion.close()
+
+
+def _registrar(controlador, nombre, edad, especialidad, prioridad):
+    return controlador.registrar_paciente(nombre, edad, especialidad, prioridad)
+
+
+def _registrar_lote(controlador, filas):
+    return controlador.registrar_pacientes_lote(filas)
+
+
+def _atender(controlador, cantidad):
+    # Solo viajan de vuelta diccionarios: los Paciente quedan en el fragmento
+    atendidos = []
+    mensaje = "No hay pacientes en espera"
+    for _ in range(cantidad):
+        paciente, mensaje = controlador.atender_paciente()
+        if paciente is None:
+            break
+        atendidos.append(paciente.a_diccionario())
+    return atendidos, mensaje
+
+
+def _estado(controlador):
+    estado = controlador.obtener_estado_cola()
+    siguiente = estado['siguiente_paciente']
+    estado['siguiente_paciente'] = siguiente.a_diccionario() if siguiente else None
+    return estado
+
+
+def _estadisticas(controlador):
+    return controlador.obtener_estadisticas_especialidad()
+
+
+def _posicion(controlador, nombre):
+    return controlador.obtener_posicion_paciente(nombre)
+
+
+def _nombres(controlador):
+    return [paciente.nombre for paciente in controlador.iterar_pacientes()]
+
+
+OPERACIONES = {
+    'registrar': _registrar,
+    'registrar_lote': _registrar_lote,
+    'atender': _atender,
+    'estado': _estado,
+    'estadisticas': _estadisticas,
+    'posicion': _posicion,
+    'nombres': _nombres
+}
+
+
+class CoordinadorClinicas:
+    # Reparte la red de clínicas en fragmentos, cada uno un ControladorTurnos
+    # en su propio proceso (así se usan todos los núcleos). Con
+    # particion='clinica' cada clínica es un fragmento; con
+    # particion='especialidad' las especialidades se reparten entre
+    # `fragmentos` procesos. Dentro de un fragmento cada clave tiene su propio
+    # controlador, y atender una especialidad solo saca pacientes de ella.
+    # Altas y atenciones van solo al fragmento dueño; estado y estadísticas
+    # se piden a todos a la vez y se combinan. Un nombre solo puede estar en
+    # una cola de toda la red: el coordinador lleva el índice de nombres.
+    PARTICIONES = ('clinica', 'especialidad')
+
+    def __init__(self, clinicas=None, particion='clinica', fragmentos=None,
+                 directorio=None, **opciones_controlador):
+        if particion not in self.PARTICIONES:
+            raise ValueError(f"Partición no válida. Opciones: {list(self.PARTICIONES)}")
+        self.particion = particion
+
+        if particion == 'clinica':
+            if not clinicas:
+                raise ValueError("Debe indicar al menos una clínica")
+            self.nombres = list(clinicas)
+            self._dueno = {clinica: i for i, clinica in enumerate(self.nombres)}
+        else:
+            especialidades = list(Paciente.TIEMPOS_ESPECIALIDAD.keys())
+            cantidad = min(fragmentos or os.cpu_count() or 1, len(especialidades))
+            self.nombres = [f"fragmento {i + 1}" for i in range(cantidad)]
+            self._dueno = {especialidad: i % cantidad for i, especialidad in enumerate(especialidades)}
+
+        # 'spawn' evita heredar hilos (por ejemplo el del diario) a medio estado
+        contexto = multiprocessing.get_context('spawn')
+        self._conexiones = []
+        self._procesos = []
+        for indice, nombre in enumerate(self.nombres):
+            claves = [clave for clave, dueno in self._dueno.items() if dueno == indice]
+            propia, remota = contexto.Pipe()
+            proceso = contexto.Process(target=_ejecutar_fragmento,
+                                       args=(remota, claves, directorio, opciones_controlador),
+                                       name=f"turnos {nombre}", daemon=True)
+            proceso.start()
+            remota.close()
+            self._conexiones.append(propia)
+            self._procesos.append(proceso)
+
+        # Llave del nombre -> clave de la cola donde espera (incluye lo recuperado)
+        self._ubicacion = {}
+        for por_clave in self._difundir('nombres').values():
+            for clave, nombres in por_clave.items():
+                for nombre in nombres:
+                    self._ubicacion[Paciente.normalizar_llave(nombre)] = clave
+
+    def fragmento_de(self, clave):
+        # clave: nombre de la clínica o especialidad, según la partición
+        if clave not in self._dueno:
+            opciones = list(self._dueno.keys())
+            raise ValueError(f"{'Clínica' if self.particion == 'clinica' else 'Especialidad'} "
+                             f"no válida: {clave}. Opciones: {opciones}")
+        return self._dueno[clave]
+
+    def _clave(self, clinica, especialidad):
+        return clinica if self.particion == 'clinica' else especialidad
+
+    def _registrado(self, nombre):
+        if not isinstance(nombre, str):
+            return None  # La validación del fragmento lo rechaza
+        return self._ubicacion.get(Paciente.normalizar_llave(nombre.strip()))
+
+    def registrar_paciente(self, nombre, edad, especialidad, prioridad=None, clinica=None):
+        clave = self._clave(clinica, especialidad)
+        try:
+            self.fragmento_de(clave)
+        except ValueError as e:
+            return False, str(e)
+        if self._registrado(nombre) is not None:
+            return False, f"El paciente {nombre.strip()} ya está registrado en la cola"
+        exito, mensaje = self._pedir(clave, 'registrar', nombre, edad, especialidad, prioridad)
+        if exito:
+            self._ubicacion[Paciente.normalizar_llave(nombre.strip())] = clave
+        return exito, mensaje
+
+    def registrar_pacientes_lote(self, filas):
+        # Cada fila es un diccionario como en ControladorTurnos, con 'clinica'
+        # si la partición es por clínica. Se manda un solo lote por fragmento
+        # y todos los fragmentos trabajan en paralelo.
+        resultados = [None] * len(filas)
+        por_clave = {}
+        reservados = {}  # Llaves de este lote -> clave, para rechazar repetidos entre fragmentos
+        for i, fila in enumerate(filas):
+            clave = self._clave(fila.get('clinica'), fila.get('especialidad'))
+            try:
+                self.fragmento_de(clave)
+            except ValueError as e:
+                resultados[i] = (False, str(e))
+                continue
+            nombre = fila.get('nombre')
+            if self._registrado(nombre) is not None:
+                resultados[i] = (False, f"El paciente {nombre.strip()} ya está registrado en la cola")
+                continue
+            if isinstance(nombre, str):
+                llave = Paciente.normalizar_llave(nombre.strip())
+                if llave in reservados and reservados[llave] != clave:
+                    resultados[i] = (False, f"El paciente {nombre.strip()} está repetido en el lote")
+                    continue
+                reservados[llave] = clave
+            indices, lote = por_clave.setdefault(clave, ([], []))
+            indices.append(i)
+            lote.append({campo: valor for campo, valor in fila.items() if campo != 'clinica'})
+
+        respuestas = self._difundir('registrar_lote', {clave: (lote,) for clave, (_, lote)
+                                                       in por_clave.items()})
+        for clave, (indices, _) in por_clave.items():
+            for i, resultado in zip(indices, respuestas[clave]):
+                resultados[i] = resultado
+                if resultado[0]:
+                    self._ubicacion[Paciente.normalizar_llave(filas[i]['nombre'].strip())] = clave
+        return resultados
+
+    def atender_paciente(self, clave):
+        atendidos, mensaje = self.atender_pacientes(clave, 1)
+        return (atendidos[0] if atendidos else None), mensaje
+
+    def atender_pacientes(self, clave, cantidad):
+        # Devuelve los pacientes atendidos como diccionarios
+        try:
+            self.fragmento_de(clave)
+        except ValueError as e:
+            return [], str(e)
+        atendidos, mensaje = self._pedir(clave, 'atender', cantidad)
+        for paciente in atendidos:
+            self._ubicacion.pop(Paciente.normalizar_llave(paciente['nombre']), None)
+        return atendidos, mensaje
+
+    def obtener_posicion_paciente(self, nombre, clave=None):
+        # Sin clave se busca la cola del paciente en el índice de nombres
+        if clave is None:
+            clave = self._registrado(nombre)
+            if clave is None:
+                return -1, f"El paciente {nombre} no está en la cola"
+        try:
+            self.fragmento_de(clave)
+        except ValueError as e:
+            return -1, str(e)
+        return self._pedir(clave, 'posicion', nombre)
+
+    def obtener_estado_cola(self):
+        estados = {clave: estado for por_clave in self._difundir('estado').values()
+                   for clave, estado in por_clave.items()}
+        combinado = {
+            'total_pacientes': sum(estado['total_pacientes'] for estado in estados.values()),
+            'tiempo_total_estimado': sum(estado['tiempo_total_estimado'] for estado in estados.values()),
+            'pacientes_atendidos_hoy': sum(estado['pacientes_atendidos_hoy'] for estado in estados.values())
+        }
+        combinado['esta_vacia'] = combinado['total_pacientes'] == 0
+        # El siguiente paciente depende de la cola: se informa por separado
+        combinado['colas'] = estados
+        return combinado
+
+    def obtener_estadisticas_especialidad(self):
+        combinadas = {especialidad: 0 for especialidad in Paciente.TIEMPOS_ESPECIALIDAD.keys()}
+        for por_clave in self._difundir('estadisticas').values():
+            for estadisticas in por_clave.values():
+                for especialidad, cantidad in estadisticas.items():
+                    combinadas[especialidad] = combinadas.get(especialidad, 0) + cantidad
+        return combinadas
+
+    def _pedir(self, clave, operacion, *argumentos):
+        return self._difundir(operacion, {clave: argumentos})[clave]
+
+    def _difundir(self, operacion, argumentos_por_clave=None):
+        # Primero se envía a todos y después se recogen las respuestas, así
+        # los fragmentos trabajan al mismo tiempo. Cada fragmento recibe un
+        # solo mensaje con todas sus claves (varios envíos grandes seguidos
+        # por la misma tubería podrían bloquearse con su respuesta).
+        # Devuelve {clave: resultado}; sin argumentos por clave la operación
+        # corre en todas las colas y la respuesta es {índice: {clave: resultado}}.
+        if argumentos_por_clave is None:
+            por_fragmento = {indice: None for indice in range(len(self._conexiones))}
+        else:
+            por_fragmento = {}
+            for clave, argumentos in argumentos_por_clave.items():
+                por_fragmento.setdefault(self._dueno[clave], {})[clave] = argumentos
+        for indice, argumentos in por_fragmento.items():
+            self._conexiones[indice].send((operacion, argumentos))
+
+        respuestas = {}
+        errores = []
+        for indice in por_fragmento:
+            exito, resultado = self._conexiones[indice].recv()
+            if not exito:
+                errores.append(f"{self.nombres[indice]}: {resultado}")
+            elif argumentos_por_clave is None:
+                respuestas[indice] = resultado
+            else:
+                respuestas.update(resultado)
+        if errores:
+            raise RuntimeError(f"Error en {operacion}: {'; '.join(errores)}")
+        return respuestas
+
+    def cerrar(self):
+        for conexion in self._conexiones:
+            try:
+                conexion.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+        for proceso in self._procesos:
+            proceso.join(timeout=5)
+            if proceso.is_alive():
+                proceso.terminate()
+        for conexion in self._conexiones:
+            conexion.close()
+        self._conexiones = []
+        self._procesos = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, valor, traza):
+        self.cerrar()
@@ -0,0 +1,15 @@
+class EventoTurnos:
+    # Evento que emite ControladorTurnos después de cada cambio en la cola
+    REGISTRO = 'registro'
+    ATENCION = 'atencion'
+    LIMPIEZA = 'limpieza'
+
+    __slots__ = ('tipo', 'version', 'pacientes')
+
+    def __init__(self, tipo, version, pacientes=None):
+        self.tipo = tipo
+        self.version = version      # Versión del controlador tras el cambio
+        self.pacientes = pacientes or []  # Pacientes afectados
+
+    def __repr__(self):
+        return f"EventoTurnos({self.tipo!r}, version={self.version}, pacientes={len(self.pacientes)})"
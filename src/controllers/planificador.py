@@ -0,0 +1,114 @@
+import datetime
+from controllers.turnos import validar_datos_paciente
+from models.cola import ColaPacientes
+from models.estimador import EstimadorMultiservidor
+from models.historial import HistorialAtendidos
+from models.paciente import Paciente
+
+
+class PlanificadorEspecialidades:
+    # Una subcola por especialidad, cada una atendida por sus propios doctores.
+    # Los tiempos de espera se estiman con un min-heap de horas libres de los
+    # doctores de la especialidad: O(log k) por operación con k doctores.
+    def __init__(self, doctores_por_especialidad=None, almacen='enlazada'):
+        doctores_por_especialidad = doctores_por_especialidad or {}
+
+        self.colas = {}
+        self.doctores = {}  # id del doctor -> especialidad
+        self.paciente_en_consulta = {}  # id del doctor -> paciente actual
+        self.pacientes_atendidos = HistorialAtendidos()
+        self.total_pacientes_atendidos = 0
+
+        for especialidad in Paciente.TIEMPOS_ESPECIALIDAD.keys():
+            cantidad = doctores_por_especialidad.get(especialidad, 1)
+            self.colas[especialidad] = ColaPacientes(
+                almacen=almacen, estimador=EstimadorMultiservidor(cantidad))
+            for numero in range(1, cantidad + 1):
+                self.doctores[f"{especialidad} {numero}"] = especialidad
+
+        especialidades_invalidas = set(doctores_por_especialidad) - set(self.colas)
+        if especialidades_invalidas:
+            raise ValueError(f"Especialidades no válidas: {sorted(especialidades_invalidas)}")
+
+    def registrar_paciente(self, nombre, edad, especialidad):
+        try:
+            error = validar_datos_paciente(nombre, edad, especialidad)
+            if error:
+                return False, error
+
+            nombre = nombre.strip()
+            if self._buscar_cola(nombre) is not None:
+                return False, f"El paciente {nombre} ya está registrado en la cola"
+
+            paciente = Paciente(nombre, edad, especialidad)
+            paciente.tiempo_registro = datetime.datetime.now()
+            cola = self.colas[especialidad]
+            cola.encolar(paciente)
+
+            return True, (f"Paciente {nombre} registrado exitosamente. "
+                          f"Posición en {especialidad}: {cola.tamano()} | "
+                          f"Espera estimada: {paciente.tiempo_espera_estimado} min")
+
+        except Exception as e:
+            return False, f"Error al registrar paciente: {str(e)}"
+
+    def atender_paciente(self, doctor_id):
+        try:
+            if doctor_id not in self.doctores:
+                return None, f"Doctor no válido. Opciones: {list(self.doctores.keys())}"
+
+            cola = self.colas[self.doctores[doctor_id]]
+            if cola.esta_vacia():
+                self.paciente_en_consulta.pop(doctor_id, None)
+                return None, f"No hay pacientes en espera para {doctor_id}"
+
+            paciente = cola.desencolar()
+            paciente.tiempo_atencion_actual = datetime.datetime.now()
+            self.paciente_en_consulta[doctor_id] = paciente
+
+            self.pacientes_atendidos.append(paciente)
+            self.total_pacientes_atendidos += 1
+
+            mensaje = f"{doctor_id} atendiendo a: {paciente.nombre}\n"
+            mensaje += f"Edad: {paciente.edad} años\n"
+            mensaje += f"Tiempo de atención: {paciente.tiempo_atencion} minutos"
+
+            return paciente, mensaje
+
+        except Exception as e:
+            return None, f"Error al atender paciente: {str(e)}"
+
+    def obtener_posicion_paciente(self, nombre_paciente):
+        cola = self._buscar_cola(nombre_paciente)
+        if cola is None:
+            return -1, f"El paciente {nombre_paciente} no está en la cola"
+
+        posicion = cola.obtener_posicion_paciente(nombre_paciente)
+        paciente = cola.obtener_paciente(nombre_paciente)
+        return posicion, (f"El paciente {nombre_paciente} está en la posición {posicion} "
+                          f"de {paciente.especialidad}. Espera estimada: "
+                          f"{paciente.tiempo_espera_estimado} min")
+
+    def estimar_espera(self, especialidad):
+        # Espera de un paciente que se registre ahora en la especialidad: O(1)
+        return self.colas[especialidad].obtener_estimador().espera_para_nuevo()
+
+    def obtener_estado(self):
+        estado = {}
+        for especialidad, cola in self.colas.items():
+            estado[especialidad] = {
+                'pacientes': cola.tamano(),
+                'doctores': cola.obtener_estimador().cantidad_doctores,
+                'espera_nuevo_paciente': self.estimar_espera(especialidad),
+                'siguiente_paciente': cola.ver_primero()
+            }
+        return estado
+
+    def obtener_doctores(self):
+        return list(self.doctores.keys())
+
+    def _buscar_cola(self, nombre_paciente):
+        for cola in self.colas.values():
+            if cola.buscar(nombre_paciente):
+                return cola
+        return None
@@ -1,47 +1,168 @@
+import contextlib
 import datetime
+import threading
+from controllers.eventos import EventoTurnos
 from models.cola import ColaPacientes
+from models.cola_concurrente import ColaConcurrente
+from models.estimador import EstimadorAprendido
+from models.historial import HistorialAtendidos
 from models.paciente import Paciente
+from models.predictor import PredictorServicio
 
 
-class ControladorTurnos:
-    def __init__(self):
-        self.cola = ColaPacientes()
-        self.pacientes_atendidos = []  # Lista de pacientes ya atendidos
-        self.total_pacientes_atendidos = 0
+def validar_datos_paciente(nombre, edad, especialidad, prioridad=None):
+    # Los datos importados pueden traer cualquier tipo: se revisa antes de
+    # usar métodos de str o buscar en los diccionarios
+    if nombre is not None and not isinstance(nombre, str):
+        return "El nombre del paciente debe ser texto"
 
-    def registrar_paciente(self, nombre, edad, especialidad):
-        try:
-            if not nombre or not nombre.strip():
-                return False, "El nombre del paciente no puede estar vacío"
+    if not nombre or not nombre.strip():
+        return "El nombre del paciente no puede estar vacío"
 
-            if not isinstance(edad, int) or edad < 0 or edad > 120:
-                return False, "La edad debe ser un número válido entre 0 y 120"
+    try:
+        largo_nombre = len(nombre.strip().encode('utf-8'))
+    except UnicodeEncodeError:
+        return "El nombre del paciente contiene caracteres no válidos"
+    if largo_nombre > Paciente.LARGO_MAXIMO_NOMBRE:
+        return f"El nombre del paciente no puede superar {Paciente.LARGO_MAXIMO_NOMBRE} bytes"
 
-            if especialidad not in Paciente.TIEMPOS_ESPECIALIDAD:
-                return False, f"Especialidad no válida. Opciones: {list(Paciente.TIEMPOS_ESPECIALIDAD.keys())}"
+    if not isinstance(edad, int) or edad < 0 or edad > 120:
+        return "La edad debe ser un número válido entre 0 y 120"
 
-            if self.cola.buscar(nombre.strip()):
-                return False, f"El paciente {nombre.strip()} ya está registrado en la cola"
+    if not isinstance(especialidad, str) or especialidad not in Paciente.TIEMPOS_ESPECIALIDAD:
+        return f"Especialidad no válida. Opciones: {list(Paciente.TIEMPOS_ESPECIALIDAD.keys())}"
+
+    if prioridad is not None and (not isinstance(prioridad, int) or prioridad not in Paciente.PRIORIDADES):
+        return f"Prioridad no válida. Opciones: {Paciente.PRIORIDADES}"
 
-            paciente = Paciente(nombre.strip(), edad, especialidad)
+    return None
+
+
+class ControladorTurnos:
+    def __init__(self, depurar=False, almacen='enlazada', historial=None, concurrente=False):
+        # Con `concurrente` varias recepciones y doctores pueden usar el
+        # controlador desde hilos distintos (solo cola FIFO)
+        self.concurrente = concurrente
+        # Se guarda en el diario: la recuperación debe usar el mismo orden
+        self.almacen = 'enlazada' if concurrente else almacen
+        # Tiempos de atención aprendidos de atenciones consecutivas; con
+        # varios doctores en paralelo ese intervalo no es una consulta, así
+        # que en modo concurrente se usa la tabla fija
+        self.predictor = None if concurrente else PredictorServicio()
+        self._ultimo_atendido = None
+        if concurrente:
+            self.cola = ColaConcurrente()
+        else:
+            self.cola = ColaPacientes(depurar=depurar, almacen=almacen, predictor=self.predictor)
+        # Pacientes ya atendidos: los más recientes en memoria, el resto en disco
+        self.pacientes_atendidos = historial if historial is not None else HistorialAtendidos()
+        self.total_pacientes_atendidos = 0
+        self.diario = None  # DiarioTurnos opcional para persistir las mutaciones
+
+        # Cada cambio en la cola incrementa la versión y avisa a los suscriptores
+        self.version = 0
+        self._suscriptores = []
+        self._candado_version = threading.Lock()
+
+    def registrar_paciente(self, nombre, edad, especialidad, prioridad=None):
+        try:
+            error = validar_datos_paciente(nombre, edad, especialidad, prioridad)
+            if error:
+                return False, error
+
+            paciente = Paciente(nombre.strip(), edad, especialidad, prioridad)
             paciente.tiempo_registro = datetime.datetime.now()
-            self.cola.encolar(paciente)
+            # La revisión de duplicados y la inserción son una sola operación
+            if not self.cola.encolar_si_ausente(paciente, self._anotar_alta):
+                return False, f"El paciente {nombre.strip()} ya está registrado en la cola"
+            if self.diario is not None:
+                self._revisar_instantanea()
+            self._notificar(EventoTurnos.REGISTRO, [paciente])
 
-            return True, f"Paciente {nombre.strip()} registrado exitosamente. Posición en cola: {self.cola.tamano()}"
+            posicion = self.cola.obtener_posicion_paciente(paciente.nombre)
+            return True, f"Paciente {nombre.strip()} registrado exitosamente. Posición en cola: {posicion}"
 
         except Exception as e:
             return False, f"Error al registrar paciente: {str(e)}"
 
+    def registrar_pacientes_lote(self, filas):
+        # Cada fila es un diccionario {'nombre', 'edad', 'especialidad', 'prioridad'}
+        # o una tupla (nombre, edad, especialidad[, prioridad]); la prioridad es
+        # opcional. Devuelve un (éxito, mensaje) por fila.
+        resultados = []
+        aceptados = []  # (índice del resultado, paciente)
+        llaves_lote = set()
+        ahora = datetime.datetime.now()
+
+        for fila in filas:
+            try:
+                if isinstance(fila, dict):
+                    nombre = fila.get('nombre')
+                    edad = fila.get('edad')
+                    especialidad = fila.get('especialidad')
+                    prioridad = fila.get('prioridad')
+                else:
+                    nombre, edad, especialidad, *resto = fila
+                    prioridad = resto[0] if resto else None
+
+                error = validar_datos_paciente(nombre, edad, especialidad, prioridad)
+                if error:
+                    resultados.append((False, error))
+                    continue
+
+                nombre = nombre.strip()
+                llave = Paciente.normalizar_llave(nombre)
+                if llave in llaves_lote:
+                    resultados.append(
+                        (False, f"El paciente {nombre} está repetido en el lote"))
+                    continue
+                if self.cola.buscar(nombre):
+                    resultados.append(
+                        (False, f"El paciente {nombre} ya está registrado en la cola"))
+                    continue
+
+                paciente = Paciente(nombre, edad, especialidad, prioridad)
+                paciente.tiempo_registro = ahora
+                llaves_lote.add(llave)
+                aceptados.append((len(resultados), paciente))
+                resultados.append(None)  # Se completa cuando el lote ya está en la cola
+
+            except Exception as e:
+                resultados.append((False, f"Error al registrar paciente: {str(e)}"))
+
+        if self.concurrente:
+            # Otro hilo pudo registrar el mismo nombre después de la revisión
+            insertados = self.cola.encolar_lote([paciente for _, paciente in aceptados],
+                                                self._anotar_alta)
+            for (indice, paciente), insertado in zip(aceptados, insertados):
+                if not insertado:
+                    resultados[indice] = (
+                        False, f"El paciente {paciente.nombre} ya está registrado en la cola")
+            aceptados = [aceptado for aceptado, insertado in zip(aceptados, insertados) if insertado]
+        else:
+            self.cola.encolar_lote(paciente for _, paciente in aceptados)
+            for _, paciente in aceptados:
+                self._anotar_alta(paciente)
+        if self.diario is not None:
+            self._revisar_instantanea()
+        if aceptados:
+            self._notificar(EventoTurnos.REGISTRO, [paciente for _, paciente in aceptados])
+
+        for indice, paciente in aceptados:
+            posicion = self.cola.obtener_posicion_paciente(paciente.nombre)
+            resultados[indice] = (
+                True, f"Paciente {paciente.nombre} registrado exitosamente. Posición en cola: {posicion}")
+        return resultados
+
     def atender_paciente(self):
         try:
-            if self.cola.esta_vacia():
+            paciente = self.cola.desencolar(self._anotar_atencion)
+            if paciente is None:
                 return None, "No hay pacientes en espera"
 
-            paciente = self.cola.desencolar()
-            paciente.tiempo_atencion_actual = datetime.datetime.now()
-
-            self.pacientes_atendidos.append(paciente)
-            self.total_pacientes_atendidos += 1
+            if self.diario is not None:
+                self._revisar_instantanea()
+            self._notificar(EventoTurnos.ATENCION, [paciente])
 
             mensaje = f"Atendiendo a: {paciente.nombre}\n"
             mensaje += f"Edad: {paciente.edad} años\n"
@@ -66,10 +187,15 @@ class ControladorTurnos:
         return siguiente_paciente, mensaje
 
     def obtener_estado_cola(self):
+        # Con tiempos aprendidos queda en caché hasta que cambie la cola o el predictor
+        tiempo_total, p50, p90 = self.cola.obtener_cuantiles_espera()
         return {
             'total_pacientes': self.cola.tamano(),
             'esta_vacia': self.cola.esta_vacia(),
-            'tiempo_total_estimado': self.cola.obtener_tiempo_total_estimado(),
+            'tiempo_total_estimado': tiempo_total,
+            # Espera de quien llegue ahora: mediana y percentil 90
+            'tiempo_total_p50': p50,
+            'tiempo_total_p90': p90,
             'pacientes_atendidos_hoy': self.total_pacientes_atendidos,
             'siguiente_paciente': self.cola.ver_primero()
         }
@@ -81,23 +207,109 @@ class ControladorTurnos:
 
         return posicion, f"El paciente {nombre_paciente} está en la posición {posicion} de la cola"
 
-    def obtener_lista_pacientes(self):
-        return self.cola.a_lista()
+    def obtener_espera_paciente(self, nombre_paciente):
+        # Devuelve ({'media', 'p50', 'p90'} en minutos, mensaje)
+        paciente = self.cola.obtener_paciente(nombre_paciente)
+        if paciente is None:
+            return None, f"El paciente {nombre_paciente} no está en la cola"
+
+        estimador = self.cola.obtener_estimador()
+        if isinstance(estimador, EstimadorAprendido):
+            espera = estimador.cuantiles_de(paciente)
+        else:
+            media = paciente.tiempo_espera_estimado
+            espera = {'media': media, 'p50': media, 'p90': media}
+        return espera, (f"Espera estimada de {paciente.nombre}: {espera['media']} min "
+                        f"(p50 {espera['p50']}, p90 {espera['p90']})")
+
+    def obtener_minutos_especialidad(self):
+        # Minutos por paciente que usan las estimaciones de la cola
+        estimador = self.cola.obtener_estimador()
+        if isinstance(estimador, EstimadorAprendido):
+            return {especialidad: estimador.predictor.media(especialidad)
+                    for especialidad in Paciente.TIEMPOS_ESPECIALIDAD.keys()}
+        return dict(Paciente.TIEMPOS_ESPECIALIDAD)
+
+    def obtener_tiempos_servicio(self):
+        # especialidad -> {'media', 'p50', 'p90', 'muestras'}; sin predictor
+        # solo la tabla fija
+        if self.predictor is not None:
+            return self.predictor.resumen()
+        return {especialidad: {'media': tiempo, 'p50': None, 'p90': None, 'muestras': 0}
+                for especialidad, tiempo in Paciente.TIEMPOS_ESPECIALIDAD.items()}
+
+    def obtener_lista_pacientes(self, inicio=0, limite=None):
+        # Sin límite devuelve toda la cola; con límite solo esa página
+        if limite is None and inicio == 0:
+            return self.cola.a_lista()
+        if limite is None:
+            limite = self.cola.tamano() - inicio
+        return self.cola.ventana(inicio, limite)
+
+    def iterar_pacientes(self):
+        return self.cola.iterar()
 
     def limpiar_turnos(self):
-        cantidad_pacientes = self.cola.tamano()
-        self.cola.limpiar()
+        with self._exclusivo():
+            cantidad_pacientes = self.cola.tamano()
+            self.cola.limpiar()
+            if self.diario is not None:
+                self.diario.registrar_limpieza()
+        if self.diario is not None:
+            self._revisar_instantanea()
+        self._notificar(EventoTurnos.LIMPIEZA)
         return f"Cola limpiada. Se removieron {cantidad_pacientes} pacientes"
 
     def obtener_estadisticas_especialidad(self):
-        estadisticas = {
-            especialidad: 0 for especialidad in Paciente.TIEMPOS_ESPECIALIDAD.keys()}
+        return {especialidad: self.cola.obtener_conteo_especialidad(especialidad)
+                for especialidad in Paciente.TIEMPOS_ESPECIALIDAD.keys()}
+
+    def suscribir(self, callback):
+        # callback(evento) se llama después de cada registro, atención o limpieza
+        self._suscriptores.append(callback)
+
+    def desuscribir(self, callback):
+        if callback in self._suscriptores:
+            self._suscriptores.remove(callback)
+
+    def _notificar(self, tipo, pacientes=None):
+        with self._candado_version:
+            self.version += 1
+            evento = EventoTurnos(tipo, self.version, pacientes)
+        for callback in list(self._suscriptores):
+            try:
+                callback(evento)
+            except Exception as e:
+                # Un suscriptor con errores no debe deshacer el cambio en la cola
+                print(f"Error al notificar evento {tipo}: {str(e)}")
+
+    def _anotar_alta(self, paciente):
+        # La cola lo llama antes de que el paciente sea visible para otros hilos
+        if self.diario is not None:
+            self.diario.registrar_alta(paciente)
+
+    def _anotar_atencion(self, paciente):
+        # La cola lo llama dentro de su candado: el historial y el diario
+        # quedan en el mismo orden en que se atendió
+        paciente.tiempo_atencion_actual = datetime.datetime.now()
+        if self.predictor is not None:
+            self.predictor.observar_atencion(self._ultimo_atendido, paciente)
+            self._ultimo_atendido = paciente
+        self.pacientes_atendidos.append(paciente)
+        self.total_pacientes_atendidos += 1
+        if self.diario is not None:
+            self.diario.registrar_atencion(paciente.tiempo_atencion_actual)
 
-        pacientes = self.obtener_lista_pacientes()
-        for paciente in pacientes:
-            estadisticas[paciente.especialidad] += 1
+    def _exclusivo(self):
+        # En modo concurrente detiene ambos extremos de la cola
+        return self.cola.bloqueada() if self.concurrente else contextlib.nullcontext()
 
-        return estadisticas
+    def _revisar_instantanea(self):
+        if self.diario.requiere_instantanea():
+            with self._exclusivo():
+                # Otro hilo pudo guardarla mientras se esperaba el candado
+                if self.diario.requiere_instantanea():
+                    self.diario.guardar_instantanea(self)
 
     def validar_especialidad(self, especialidad):
         return especialidad in Paciente.TIEMPOS_ESPECIALIDAD
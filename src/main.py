@@ -1,4 +1,17 @@
-from views.main_page import main
+import sys
+
+
+def main():
+    # Con argumentos se usa la línea de comandos; la interfaz gráfica (Tk,
+    # PIL, Graphviz) solo se importa cuando se abre la ventana
+    if len(sys.argv) > 1:
+        from cli import main as main_cli
+        return main_cli(sys.argv[1:])
+
+    from views.main_page import main as main_gui
+    main_gui()
+    return 0
+
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
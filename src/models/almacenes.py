@@ -0,0 +1,339 @@
+import datetime
+import heapq
+import math
+from array import array
+
+from models.nodo import Nodo
+from models.paciente import Paciente
+from models.predictor import ESPECIALIDADES, ID_ESPECIALIDAD
+
+
+class AlmacenEnlazado:
+    # Almacenamiento original: lista enlazada simple de nodos.
+    # Cada SALTO nodos se guarda una marca para llegar a una posición sin
+    # recorrer desde el frente.
+    SALTO = 64
+    INDICE_POR_LLEGADA = False  # El índice de nombres guarda el Paciente mismo
+
+    def __init__(self):
+        self.primero = None  # Frente de la cola (próximo a atender)
+        self.ultimo = None   # Final de la cola (último en llegar)
+        self._siguiente_secuencia = 0
+        self._marcas = []         # Nodos cuya secuencia es múltiplo de SALTO
+        self._inicio_marcas = 0   # Marcas anteriores ya salieron de la cola
+        self.estimador = None     # Solo lo usa AlmacenCircular
+
+    def esta_vacio(self):
+        return self.primero is None
+
+    def agregar(self, paciente):
+        nuevo_nodo = Nodo(paciente)
+        paciente.secuencia = self._siguiente_secuencia
+        self._siguiente_secuencia += 1
+
+        if self.esta_vacio():
+            self.primero = nuevo_nodo  # Primer paciente en la cola
+            self.ultimo = nuevo_nodo
+        else:
+            self.ultimo.establecer_siguiente(nuevo_nodo)  # Conecto al final
+            self.ultimo = nuevo_nodo  # Actualizo el último nodo
+
+        if paciente.secuencia % self.SALTO == 0:
+            self._marcas.append(nuevo_nodo)
+
+    def agregar_lote(self, pacientes):
+        for paciente in pacientes:
+            self.agregar(paciente)
+
+    def paciente_de(self, entrada):
+        return entrada
+
+    def posicion_de(self, paciente):
+        # Cola FIFO: la posición sale de la diferencia de números de llegada
+        return paciente.secuencia - self.primero.obtener_info().secuencia + 1
+
+    def quitar_primero(self):
+        if self.esta_vacio():
+            return None
+
+        if self._inicio_marcas < len(self._marcas) and self._marcas[self._inicio_marcas] is self.primero:
+            self._inicio_marcas += 1
+            if self._inicio_marcas > len(self._marcas) // 2:
+                # Compactar de vez en cuando para no acumular marcas viejas
+                del self._marcas[:self._inicio_marcas]
+                self._inicio_marcas = 0
+
+        paciente = self.primero.obtener_info()
+        self.primero = self.primero.obtener_siguiente()  # Mover el frente de la cola
+
+        if self.primero is None:
+            self.ultimo = None
+
+        return paciente
+
+    def ventana(self, inicio, cantidad):
+        actual = self._nodo_en(inicio)
+        pacientes = []
+        while actual is not None and len(pacientes) < cantidad:
+            pacientes.append(actual.obtener_info())
+            actual = actual.obtener_siguiente()
+        return pacientes
+
+    def _nodo_en(self, indice):
+        # A lo sumo SALTO pasos desde la marca anterior a la posición buscada
+        if self.esta_vacio() or indice < 0:
+            return None
+        objetivo = self.primero.obtener_info().secuencia + indice
+        actual = self.primero
+
+        if self._inicio_marcas < len(self._marcas):
+            primera_marca = self._marcas[self._inicio_marcas].obtener_info().secuencia
+            if objetivo >= primera_marca:
+                posicion = self._inicio_marcas + (objetivo - primera_marca) // self.SALTO
+                if posicion >= len(self._marcas):
+                    return None
+                actual = self._marcas[posicion]
+
+        while actual is not None and actual.obtener_info().secuencia < objetivo:
+            actual = actual.obtener_siguiente()
+        return actual
+
+    def ver_primero(self):
+        if self.esta_vacio():
+            return None
+        return self.primero.obtener_info()
+
+    def __iter__(self):
+        actual = self.primero
+        while actual is not None:
+            yield actual.obtener_info()
+            actual = actual.obtener_siguiente()
+
+    def limpiar(self):
+        self.primero = None
+        self.ultimo = None
+        self._marcas = []
+        self._inicio_marcas = 0
+
+
+class AlmacenCircular:
+    # Arreglo circular que crece al doble, sin un objeto por paciente: cada
+    # campo va en su propia columna (los nombres en una lista y el resto en
+    # arrays de ancho fijo, como el historial) y los Paciente se arman al
+    # leerlos. Las esperas viven en las columnas del estimador.
+    CAPACIDAD_INICIAL = 16
+    INDICE_POR_LLEGADA = True  # El índice de nombres guarda el número de llegada
+
+    def __init__(self, capacidad=CAPACIDAD_INICIAL):
+        self._crear_columnas(max(capacidad, 1))
+        self._inicio = 0    # Índice del frente de la cola
+        self._cantidad = 0
+        self._siguiente_secuencia = 0
+        self._secuencia_inicio = 0  # Número de llegada del frente
+        self.estimador = None  # Los Paciente armados se vinculan a este estimador
+
+    def _crear_columnas(self, capacidad):
+        self._nombres = [None] * capacidad
+        self._edades = array('H', [0]) * capacidad
+        self._especialidades = array('B', [0]) * capacidad
+        self._prioridades = array('B', [0]) * capacidad
+        self._registros = array('d', [0.0]) * capacidad
+        self._atenciones = array('d', [0.0]) * capacidad
+
+    def esta_vacio(self):
+        return self._cantidad == 0
+
+    def agregar(self, paciente):
+        paciente.secuencia = self._siguiente_secuencia
+        self._siguiente_secuencia += 1
+
+        if self._cantidad == len(self._nombres):
+            self._redimensionar(len(self._nombres) * 2)
+
+        fin = (self._inicio + self._cantidad) % len(self._nombres)
+        self._nombres[fin] = paciente.nombre
+        self._edades[fin] = paciente.edad
+        self._especialidades[fin] = ID_ESPECIALIDAD[paciente.especialidad]
+        self._prioridades[fin] = paciente.prioridad
+        self._registros[fin] = _a_segundos(paciente.tiempo_registro)
+        self._atenciones[fin] = _a_segundos(paciente.tiempo_atencion_actual)
+        self._cantidad += 1
+
+    def agregar_lote(self, pacientes):
+        for paciente in pacientes:
+            self.agregar(paciente)
+
+    def _paciente_en(self, desplazamiento):
+        # Arma el paciente que está `desplazamiento` lugares detrás del frente
+        i = (self._inicio + desplazamiento) % len(self._nombres)
+        paciente = Paciente(self._nombres[i], self._edades[i],
+                            ESPECIALIDADES[self._especialidades[i]], self._prioridades[i])
+        paciente.tiempo_registro = _a_momento(self._registros[i])
+        paciente.tiempo_atencion_actual = _a_momento(self._atenciones[i])
+        paciente.secuencia = self._secuencia_inicio + desplazamiento
+        if self.estimador is not None:
+            paciente.vincular_estimador(self.estimador)
+        return paciente
+
+    def paciente_de(self, secuencia):
+        return self._paciente_en(secuencia - self._secuencia_inicio)
+
+    def posicion_de(self, secuencia):
+        return secuencia - self._secuencia_inicio + 1
+
+    def ventana(self, inicio, cantidad):
+        fin = min(inicio + cantidad, self._cantidad)
+        return [self._paciente_en(i) for i in range(max(inicio, 0), fin)]
+
+    def quitar_primero(self):
+        if self.esta_vacio():
+            return None
+
+        paciente = self._paciente_en(0)
+        self._nombres[self._inicio] = None  # Liberar la referencia
+        self._inicio = (self._inicio + 1) % len(self._nombres)
+        self._secuencia_inicio += 1
+        self._cantidad -= 1
+
+        # Se reduce cuando queda muy vacío para devolver memoria tras un pico
+        if self.CAPACIDAD_INICIAL < len(self._nombres) and self._cantidad <= len(self._nombres) // 4:
+            self._redimensionar(len(self._nombres) // 2)
+
+        return paciente
+
+    def ver_primero(self):
+        if self.esta_vacio():
+            return None
+        return self._paciente_en(0)
+
+    def __iter__(self):
+        for i in range(self._cantidad):
+            yield self._paciente_en(i)
+
+    def limpiar(self):
+        self._crear_columnas(self.CAPACIDAD_INICIAL)
+        self._inicio = 0
+        self._cantidad = 0
+        # Los números de llegada siguen: no se repiten después de limpiar
+        self._secuencia_inicio = self._siguiente_secuencia
+
+    def _redimensionar(self, nueva_capacidad):
+        self._nombres = self._en_orden(self._nombres, [None], nueva_capacidad)
+        self._edades = self._en_orden(self._edades, array('H', [0]), nueva_capacidad)
+        self._especialidades = self._en_orden(self._especialidades, array('B', [0]), nueva_capacidad)
+        self._prioridades = self._en_orden(self._prioridades, array('B', [0]), nueva_capacidad)
+        self._registros = self._en_orden(self._registros, array('d', [0.0]), nueva_capacidad)
+        self._atenciones = self._en_orden(self._atenciones, array('d', [0.0]), nueva_capacidad)
+        self._inicio = 0
+
+    def _en_orden(self, columna, relleno, nueva_capacidad):
+        # La columna desde el frente, sin dar la vuelta, completada con `relleno`
+        fin = self._inicio + self._cantidad
+        if fin <= len(columna):
+            datos = columna[self._inicio:fin]
+        else:
+            datos = columna[self._inicio:] + columna[:fin - len(columna)]
+        return datos + relleno * (nueva_capacidad - self._cantidad)
+
+
+class AlmacenMonticulo:
+    # Montículo binario ordenado por (prioridad, llegada dentro de la prioridad):
+    # los urgentes pasan primero y cada nivel conserva el orden FIFO.
+    # Las posiciones se calculan con contadores por nivel en O(niveles).
+    VENTANA_DIRECTA = 1024
+    INDICE_POR_LLEGADA = False
+
+    def __init__(self):
+        self._monticulo = []
+        self._llegadas = {}   # prioridad -> pacientes que han llegado
+        self._retirados = {}  # prioridad -> pacientes ya atendidos
+        self.estimador = None  # Solo lo usa AlmacenCircular
+
+        # Copia ordenada para ventanas profundas; vale hasta la próxima alta
+        self._ordenado = None
+        self._inicio_ordenado = 0
+
+    def esta_vacio(self):
+        return not self._monticulo
+
+    def agregar(self, paciente):
+        heapq.heappush(self._monticulo, self._entrada(paciente))
+        self._ordenado = None
+
+    def agregar_lote(self, pacientes):
+        entradas = [self._entrada(paciente) for paciente in pacientes]
+        if entradas:
+            self._ordenado = None
+        if len(entradas) > len(self._monticulo):
+            # Para lotes grandes es más barato reconstruir el montículo en O(n)
+            self._monticulo.extend(entradas)
+            heapq.heapify(self._monticulo)
+        else:
+            for entrada in entradas:
+                heapq.heappush(self._monticulo, entrada)
+
+    def paciente_de(self, entrada):
+        return entrada
+
+    def posicion_de(self, paciente):
+        posicion = paciente.secuencia - self._retirados.get(paciente.prioridad, 0) + 1
+        for prioridad, llegadas in self._llegadas.items():
+            if prioridad < paciente.prioridad:
+                posicion += llegadas - self._retirados.get(prioridad, 0)
+        return posicion
+
+    def ventana(self, inicio, cantidad):
+        if inicio < 0 or cantidad <= 0:
+            return []
+        if self._ordenado is None and inicio + cantidad <= self.VENTANA_DIRECTA:
+            # Cerca del inicio solo se ordenan los primeros inicio + cantidad: O(n log k)
+            primeros = heapq.nsmallest(inicio + cantidad, self._monticulo)
+            return [paciente for _, _, paciente in primeros[inicio:]]
+
+        # Más adentro se ordena la cola una vez y las ventanas siguientes
+        # (por ejemplo al desplazar una lista) salen de esa copia en O(k)
+        if self._ordenado is None:
+            self._ordenado = [paciente for _, _, paciente in sorted(self._monticulo)]
+            self._inicio_ordenado = 0
+        desde = self._inicio_ordenado + inicio
+        return self._ordenado[desde:desde + cantidad]
+
+    def quitar_primero(self):
+        if self.esta_vacio():
+            return None
+
+        prioridad, _, paciente = heapq.heappop(self._monticulo)
+        self._retirados[prioridad] = self._retirados.get(prioridad, 0) + 1
+        if self._ordenado is not None:
+            # El atendido es siempre el primero de la copia ordenada
+            self._inicio_ordenado += 1
+        return paciente
+
+    def ver_primero(self):
+        if self.esta_vacio():
+            return None
+        return self._monticulo[0][2]
+
+    def __iter__(self):
+        # El montículo no está ordenado: se recorre una copia ordenada
+        for _, _, paciente in sorted(self._monticulo):
+            yield paciente
+
+    def limpiar(self):
+        self._monticulo = []
+        self._llegadas = {}
+        self._retirados = {}
+        self._ordenado = None
+
+    def _entrada(self, paciente):
+        paciente.secuencia = self._llegadas.get(paciente.prioridad, 0)
+        self._llegadas[paciente.prioridad] = paciente.secuencia + 1
+        return (paciente.prioridad, paciente.secuencia, paciente)
+
+
+def _a_segundos(momento):
+    return momento.timestamp() if momento is not None else math.nan
+
+
+def _a_momento(segundos):
+    return None if math.isnan(segundos) else datetime.datetime.fromtimestamp(segundos)
@@ -1,97 +1,224 @@
-from models.nodo import Nodo
+from models.almacenes import AlmacenEnlazado, AlmacenCircular, AlmacenMonticulo
+from models.estimador import EstimadorEspera, EstimadorTriaje, EstimadorAprendido
+from models.paciente import Paciente
 
 
 class ColaPacientes:
-    def __init__(self):
-        self.primero = None  # Frente de la cola (próximo a atender)
-        self.ultimo = None   # Final de la cola (último en llegar)
+    ALMACENES = {
+        'enlazada': AlmacenEnlazado,
+        'circular': AlmacenCircular,
+        'triaje': AlmacenMonticulo  # Prioridad de triaje y FIFO dentro de cada nivel
+    }
+
+    ESTIMADORES = {
+        'triaje': EstimadorTriaje
+    }
+
+    def __init__(self, depurar=False, almacen='enlazada', estimador=None, predictor=None):
+        if almacen not in self.ALMACENES:
+            raise ValueError(f"Almacenamiento no válido. Opciones: {list(self.ALMACENES.keys())}")
+        self._almacen = self.ALMACENES[almacen]()
+        # Con un predictor las colas FIFO usan los tiempos aprendidos; el
+        # triaje conserva la tabla fija (su orden no es el de llegada)
+        self._predictor = predictor if almacen not in self.ESTIMADORES else None
+        if estimador is None:
+            if self._predictor is not None:
+                estimador = EstimadorAprendido(self._predictor)
+            else:
+                estimador = self.ESTIMADORES.get(almacen, EstimadorEspera)()
+        self._estimador = estimador
+        self._almacen.estimador = estimador
+
+        # Contadores mantenidos en cada operación para no recorrer la cola
+        self._tamano = 0
+        self._tiempo_total = 0
+        self._conteo_especialidad = {}
+
+        # Índice por llave de nombre para búsquedas y posiciones
+        self._indice = {}
+
+        # En modo depuración se comparan los contadores contra un recorrido
+        self.depurar = depurar
 
     def esta_vacia(self):
-        return self.primero is None
+        return self._almacen.esta_vacio()
 
     def encolar(self, paciente):
-        nuevo_nodo = Nodo(paciente)
-
-        if self.esta_vacia():
-            self.primero = nuevo_nodo  # Primer paciente en la cola
-            self.ultimo = nuevo_nodo
-        else:
-            self.ultimo.establecer_siguiente(nuevo_nodo)  # Conecto al final
-            self.ultimo = nuevo_nodo  # Actualizo el último nodo
-
-        self._actualizar_tiempos_espera()
-
-    def desencolar(self):
-        if self.esta_vacia():
+        self._almacen.agregar(paciente)
+        self._registrar_agregado(paciente)
+        if self.depurar:
+            self._verificar()
+
+    def encolar_si_ausente(self, paciente, al_agregar=None):
+        # Misma interfaz que ColaConcurrente; aquí no hay otros hilos
+        if self.buscar(paciente.nombre):
+            return False
+        self.encolar(paciente)
+        if al_agregar is not None:
+            al_agregar(paciente)
+        return True
+
+    def encolar_lote(self, pacientes):
+        # El almacenamiento recibe el lote completo y la verificación de
+        # depuración se hace una sola vez al final
+        pacientes = list(pacientes)
+        self._almacen.agregar_lote(pacientes)
+        for paciente in pacientes:
+            self._registrar_agregado(paciente)
+        if self.depurar:
+            self._verificar()
+        return len(pacientes)
+
+    def _registrar_agregado(self, paciente):
+        self._estimador.registrar(paciente)
+        self._sumar_contadores(paciente, 1)
+        self._indexar(paciente)
+
+    def desencolar(self, al_retirar=None):
+        # Con el contador basta: es la operación más frecuente de la cola
+        if self._tamano == 0:
             return None
 
-        paciente_atendido = self.primero.obtener_info()  # Guardar el paciente a atender
-        self.primero = self.primero.obtener_siguiente()  # Mover el frente de la cola
-
-        if self.primero is None:
-            self.ultimo = None
-
-        self._actualizar_tiempos_espera()
+        paciente_atendido = self._almacen.quitar_primero()
+        self._estimador.retirar(paciente_atendido)
+        self._sumar_contadores(paciente_atendido, -1)
+        self._desindexar(paciente_atendido)
+        if self.depurar:
+            self._verificar()
+        if al_retirar is not None:
+            al_retirar(paciente_atendido)
 
         return paciente_atendido
 
     def ver_primero(self):
-        if self.esta_vacia():
-            return None
-        return self.primero.obtener_info()
+        return self._almacen.ver_primero()
 
     def tamano(self):
-        actual = self.primero
-        contador = 0
-        while actual is not None:
-            contador += 1
-            actual = actual.obtener_siguiente()
-        return contador
+        return self._tamano
 
     def buscar(self, nombre_paciente):
-        actual = self.primero
-        while actual is not None:
-            if actual.obtener_info().es_igual_a_llave(nombre_paciente):
-                return True
-            actual = actual.obtener_siguiente()
-        return False
+        return self._buscar_en_indice(nombre_paciente) is not None
+
+    def obtener_paciente(self, nombre_paciente):
+        entrada = self._buscar_en_indice(nombre_paciente)
+        if entrada is None:
+            return None
+        return self._almacen.paciente_de(entrada)
 
     def obtener_posicion_paciente(self, nombre_paciente):
-        actual = self.primero
-        posicion = 1
-        while actual is not None:
-            if actual.obtener_info().es_igual_a_llave(nombre_paciente):
-                return posicion
-            actual = actual.obtener_siguiente()
-            posicion += 1
-        return -1
-
-    def _actualizar_tiempos_espera(self):
-        actual = self.primero
-        tiempo_acumulado = 0
-
-        while actual is not None:
-            paciente = actual.obtener_info()
-            paciente.establecer_tiempo_espera_estimado(tiempo_acumulado)
-            tiempo_acumulado += paciente.obtener_tiempo_atencion()
-            actual = actual.obtener_siguiente()
+        entrada = self._buscar_en_indice(nombre_paciente)
+        if entrada is None:
+            return -1
+        return self._almacen.posicion_de(entrada)
+
+    def _buscar_en_indice(self, nombre_paciente):
+        # Devuelve la entrada del almacenamiento (el Paciente, o su número de
+        # llegada en el arreglo circular)
+        entrada = self._indice.get(Paciente.normalizar_llave(nombre_paciente))
+        if isinstance(entrada, list):
+            return entrada[0]
+        return entrada
+
+    def _indexar(self, paciente):
+        llave = paciente.llave
+        nueva = paciente.secuencia if self._almacen.INDICE_POR_LLEGADA else paciente
+        entrada = self._indice.get(llave)
+        if entrada is None:
+            self._indice[llave] = nueva
+        elif isinstance(entrada, list):
+            entrada.append(nueva)
+        else:
+            # Nombre repetido encolado directamente: se guardan en orden de llegada
+            self._indice[llave] = [entrada, nueva]
+
+    def _desindexar(self, paciente):
+        llave = paciente.llave
+        vieja = paciente.secuencia if self._almacen.INDICE_POR_LLEGADA else paciente
+        entrada = self._indice.get(llave)
+        if isinstance(entrada, list):
+            entrada.remove(vieja)
+            if len(entrada) == 1:
+                self._indice[llave] = entrada[0]
+        elif entrada == vieja:
+            del self._indice[llave]
 
     def obtener_tiempo_total_estimado(self):
-        actual = self.primero
+        if self._predictor is not None:
+            return self._estimador.cuantiles_para_nuevo()[0]
+        return self._tiempo_total
+
+    def obtener_cuantiles_espera(self):
+        # (media, p50, p90) de la espera de quien llegue ahora; con tiempos
+        # fijos los tres son el total
+        if self._predictor is not None:
+            return self._estimador.cuantiles_para_nuevo()
+        return self._tiempo_total, self._tiempo_total, self._tiempo_total
+
+    def obtener_estimador(self):
+        return self._estimador
+
+    def obtener_conteo_especialidad(self, especialidad):
+        return self._conteo_especialidad.get(especialidad, 0)
+
+    def _sumar_contadores(self, paciente, signo):
+        self._tamano += signo
+        self._tiempo_total += signo * paciente.obtener_tiempo_atencion()
+        self._conteo_especialidad[paciente.especialidad] = (
+            self._conteo_especialidad.get(paciente.especialidad, 0) + signo)
+
+    def _verificar(self):
+        consistente, mensaje = self.verificar_contadores()
+        if not consistente:
+            raise AssertionError(mensaje)
+
+    def verificar_contadores(self):
+        # Recorrido completo O(n): solo para depuración y pruebas de carga
+        tamano = 0
         tiempo_total = 0
-        while actual is not None:
-            tiempo_total += actual.obtener_info().obtener_tiempo_atencion()
-            actual = actual.obtener_siguiente()
-        return tiempo_total
+        conteo = {}
+        for paciente in self._almacen:
+            tamano += 1
+            tiempo_total += paciente.obtener_tiempo_atencion()
+            conteo[paciente.especialidad] = conteo.get(paciente.especialidad, 0) + 1
+
+        conteo_mantenido = {especialidad: cantidad for especialidad, cantidad
+                            in self._conteo_especialidad.items() if cantidad != 0}
+
+        if tamano != self._tamano:
+            return False, f"Tamaño inconsistente: contador {self._tamano}, recorrido {tamano}"
+        if tiempo_total != self._tiempo_total:
+            return False, f"Tiempo total inconsistente: contador {self._tiempo_total}, recorrido {tiempo_total}"
+        if conteo != conteo_mantenido:
+            return False, f"Conteo por especialidad inconsistente: contador {conteo_mantenido}, recorrido {conteo}"
+        indexados = sum(len(entrada) if isinstance(entrada, list) else 1
+                        for entrada in self._indice.values())
+        if indexados != tamano:
+            return False, f"Índice inconsistente: {indexados} indexados, recorrido {tamano}"
+        return True, "Contadores consistentes"
 
     def a_lista(self):
-        lista_pacientes = []
-        actual = self.primero
-        while actual is not None:
-            lista_pacientes.append(actual.obtener_info())
-            actual = actual.obtener_siguiente()
-        return lista_pacientes
+        return list(self._almacen)
+
+    def __iter__(self):
+        return iter(self._almacen)
+
+    def iterar(self):
+        # Recorre la cola en orden de atención sin copiarla a una lista
+        yield from self._almacen
+
+    def ventana(self, inicio, cantidad):
+        # Pacientes en las posiciones [inicio, inicio + cantidad) en orden de atención
+        inicio = max(inicio, 0)
+        if cantidad <= 0 or inicio >= self._tamano:
+            return []
+        return self._almacen.ventana(inicio, cantidad)
 
     def limpiar(self):
-        self.primero = None
-        self.ultimo = None
+        self._almacen.limpiar()
+        # Los pacientes removidos conservan el estimador anterior (congelado)
+        self._estimador = self._estimador.reiniciado()
+        self._almacen.estimador = self._estimador
+        self._tamano = 0
+        self._tiempo_total = 0
+        self._conteo_especialidad = {}
+        self._indice = {}
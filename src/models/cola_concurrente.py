@@ -0,0 +1,221 @@
+import contextlib
+import threading
+
+from models.estimador import EstimadorEspera
+from models.nodo import Nodo
+from models.paciente import Paciente
+
+
+class ColaConcurrente:
+    # Cola FIFO para varios hilos (recepciones que encolan y doctores que
+    # desencolan) con dos candados, al estilo de Michael y Scott: los
+    # productores solo toman el candado del final y los consumidores el del
+    # frente, así que no se bloquean entre sí. Un nodo centinela separa ambos
+    # extremos. Todo lo que se mantiene en cada operación está partido por
+    # extremo: llegadas y acumulado del estimador del lado del final,
+    # retirados y desplazamiento del lado del frente.
+    # Orden de los candados: final -> frente -> índice.
+    def __init__(self):
+        self._candado_final = threading.RLock()
+        self._candado_frente = threading.RLock()
+        self._candado_indice = threading.Lock()
+        self._reiniciar()
+
+    def _reiniciar(self):
+        centinela = Nodo(None)
+        self._frente = centinela   # El primer paciente es self._frente.siguiente
+        self._final = centinela
+        self._estimador = EstimadorEspera()
+
+        # Lado del final
+        self._agregados = 0
+        self._llegadas_especialidad = {}
+        # Lado del frente
+        self._retirados = 0
+        self._retirados_especialidad = {}
+
+        # Índice por llave de nombre; cada nombre aparece una sola vez
+        self._indice = {}
+
+    def esta_vacia(self):
+        return self._frente.siguiente is None
+
+    def encolar(self, paciente):
+        return self.encolar_si_ausente(paciente)
+
+    def encolar_si_ausente(self, paciente, al_agregar=None):
+        # Revisión de duplicado e inserción atómicas. `al_agregar(paciente)` se
+        # llama dentro del candado y antes de que el paciente sea visible para
+        # los consumidores (por ejemplo para escribirlo en el diario).
+        with self._candado_final:
+            if not self._reservar_llave(paciente):
+                return False
+            self._enlazar(paciente, al_agregar)
+            return True
+
+    def encolar_lote(self, pacientes, al_agregar=None):
+        # Devuelve un booleano por paciente: False si ya estaba en la cola
+        agregados = []
+        with self._candado_final:
+            for paciente in pacientes:
+                if not self._reservar_llave(paciente):
+                    agregados.append(False)
+                    continue
+                self._enlazar(paciente, al_agregar)
+                agregados.append(True)
+        return agregados
+
+    def _reservar_llave(self, paciente):
+        with self._candado_indice:
+            if paciente.llave in self._indice:
+                return False
+            self._indice[paciente.llave] = paciente
+            return True
+
+    def _liberar_llave(self, paciente):
+        with self._candado_indice:
+            if self._indice.get(paciente.llave) is paciente:
+                del self._indice[paciente.llave]
+
+    def _enlazar(self, paciente, al_agregar):
+        # Se llama con el candado del final tomado y la llave ya reservada
+        if al_agregar is not None:
+            try:
+                al_agregar(paciente)
+            except Exception:
+                self._liberar_llave(paciente)
+                raise
+
+        # Todos los contadores se actualizan antes de publicar el nodo: un
+        # consumidor que lo retire enseguida nunca deja tamano() negativo
+        paciente.secuencia = self._agregados
+        self._agregados += 1
+        self._estimador.registrar(paciente)
+        self._llegadas_especialidad[paciente.especialidad] = (
+            self._llegadas_especialidad.get(paciente.especialidad, 0) + 1)
+
+        nodo = Nodo(paciente)
+        # Desde esta asignación los consumidores pueden ver al paciente
+        self._final.siguiente = nodo
+        self._final = nodo
+
+    def desencolar(self, al_retirar=None):
+        # `al_retirar(paciente)` se llama dentro del candado del frente, así
+        # los retiros quedan anotados en el mismo orden en que ocurren
+        with self._candado_frente:
+            primero = self._frente.siguiente
+            if primero is None:
+                return None
+
+            # El nodo pasa a ser el nuevo centinela
+            paciente = primero.info
+            self._frente = primero
+
+            self._estimador.retirar(paciente)
+            self._retirados += 1
+            self._retirados_especialidad[paciente.especialidad] = (
+                self._retirados_especialidad.get(paciente.especialidad, 0) + 1)
+            self._liberar_llave(paciente)
+
+            if al_retirar is not None:
+                al_retirar(paciente)
+            return paciente
+
+    def ver_primero(self):
+        primero = self._frente.siguiente
+        return primero.info if primero is not None else None
+
+    def tamano(self):
+        # Primero el lado del frente: así el resultado nunca es negativo
+        retirados = self._retirados
+        return self._agregados - retirados
+
+    def buscar(self, nombre_paciente):
+        return Paciente.normalizar_llave(nombre_paciente) in self._indice
+
+    def obtener_paciente(self, nombre_paciente):
+        return self._indice.get(Paciente.normalizar_llave(nombre_paciente))
+
+    def obtener_posicion_paciente(self, nombre_paciente):
+        paciente = self._indice.get(Paciente.normalizar_llave(nombre_paciente))
+        if paciente is None:
+            return -1
+        posicion = paciente.secuencia - self._retirados + 1
+        # Pudo ser atendido justo después de buscarlo en el índice
+        return posicion if posicion >= 1 else -1
+
+    def obtener_tiempo_total_estimado(self):
+        desplazamiento = self._estimador.desplazamiento
+        return self._estimador.acumulado - desplazamiento
+
+    def obtener_cuantiles_espera(self):
+        tiempo_total = self.obtener_tiempo_total_estimado()
+        return tiempo_total, tiempo_total, tiempo_total
+
+    def obtener_estimador(self):
+        return self._estimador
+
+    def obtener_conteo_especialidad(self, especialidad):
+        retirados = self._retirados_especialidad.get(especialidad, 0)
+        return self._llegadas_especialidad.get(especialidad, 0) - retirados
+
+    def bloqueada(self):
+        # Toma ambos extremos: para limpiar o guardar una instantánea coherente
+        pila = contextlib.ExitStack()
+        pila.enter_context(self._candado_final)
+        pila.enter_context(self._candado_frente)
+        return pila
+
+    def verificar_contadores(self):
+        with self.bloqueada():
+            pacientes = self.a_lista()
+            if len(pacientes) != self.tamano():
+                return False, f"Tamaño inconsistente: contador {self.tamano()}, recorrido {len(pacientes)}"
+            tiempo_total = sum(paciente.obtener_tiempo_atencion() for paciente in pacientes)
+            if tiempo_total != self.obtener_tiempo_total_estimado():
+                return False, (f"Tiempo total inconsistente: contador {self.obtener_tiempo_total_estimado()}, "
+                               f"recorrido {tiempo_total}")
+            if len(self._indice) != len(pacientes):
+                return False, f"Índice inconsistente: {len(self._indice)} indexados, recorrido {len(pacientes)}"
+            return True, "Contadores consistentes"
+
+    def a_lista(self):
+        # Copia coherente: ningún doctor atiende mientras se arma
+        with self._candado_frente:
+            return list(self.iterar())
+
+    def __iter__(self):
+        return self.iterar()
+
+    def iterar(self):
+        # Recorrido sin candado desde el frente actual: los que llegan
+        # mientras tanto al final también aparecen, y los atendidos durante
+        # el recorrido pueden aparecer todavía
+        actual = self._frente.siguiente
+        while actual is not None:
+            yield actual.info
+            actual = actual.siguiente
+
+    def ventana(self, inicio, cantidad):
+        # Sin marcas de salto: O(inicio + cantidad)
+        inicio = max(inicio, 0)
+        resultado = []
+        if cantidad <= 0:
+            return resultado
+        with self._candado_frente:
+            actual = self._frente.siguiente
+            for _ in range(inicio):
+                if actual is None:
+                    return resultado
+                actual = actual.siguiente
+            while actual is not None and len(resultado) < cantidad:
+                resultado.append(actual.info)
+                actual = actual.siguiente
+        return resultado
+
+    def limpiar(self):
+        with self.bloqueada():
+            # Los pacientes removidos conservan el estimador anterior (congelado)
+            estimador = self._estimador.reiniciado()
+            self._reiniciar()
+            self._estimador = estimador
@@ -0,0 +1,247 @@
+import heapq
+from array import array
+
+from models.predictor import ESPECIALIDADES, ID_ESPECIALIDAD
+
+
+# Las columnas por llegada se guardan en bloques de 2**BITS_BLOQUE valores
+BITS_BLOQUE = 10
+MASCARA_BLOQUE = (1 << BITS_BLOQUE) - 1
+
+
+class ColumnaLlegadas:
+    # Valor de ancho fijo por paciente, direccionado por su número de
+    # llegada (paciente.secuencia). Los bloques van en un dict: agregar al
+    # final y liberar el frente no mueven los demás valores, así que un hilo
+    # puede agregar mientras otro retira.
+    def __init__(self, codigo, ancho=1):
+        self.codigo = codigo
+        self.ancho = ancho
+        self._bloques = {}
+
+    def poner(self, indice, valores):
+        # `valores` es un array del mismo código: se copia sin convertir
+        bloque = self._bloques.get(indice >> BITS_BLOQUE) or self._nuevo_bloque(indice)
+        ancho = self.ancho
+        posicion = (indice & MASCARA_BLOQUE) * ancho
+        bloque[posicion:posicion + ancho] = valores
+
+    def poner_valor(self, indice, valor):
+        bloque = self._bloques.get(indice >> BITS_BLOQUE) or self._nuevo_bloque(indice)
+        bloque[indice & MASCARA_BLOQUE] = valor
+
+    def _nuevo_bloque(self, indice):
+        bloque = array(self.codigo, [0]) * ((MASCARA_BLOQUE + 1) * self.ancho)
+        self._bloques[indice >> BITS_BLOQUE] = bloque
+        return bloque
+
+    def obtener(self, indice):
+        # Lista de `ancho` valores, o None si el bloque ya se liberó
+        bloque = self._bloques.get(indice >> BITS_BLOQUE)
+        if bloque is None:
+            return None
+        ancho = self.ancho
+        posicion = (indice & MASCARA_BLOQUE) * ancho
+        return bloque[posicion:posicion + ancho].tolist()
+
+    def obtener_valor(self, indice):
+        bloque = self._bloques.get(indice >> BITS_BLOQUE)
+        return None if bloque is None else bloque[indice & MASCARA_BLOQUE]
+
+    def liberar(self, indice):
+        # Suelta el bloque de `indice`; se llama al retirar la última llegada
+        # del bloque (cuando el frente queda en múltiplo de 2**BITS_BLOQUE)
+        self._bloques.pop(indice >> BITS_BLOQUE, None)
+
+
+class EstimadorEspera:
+    # Mantiene las esperas como una suma acumulada: cada paciente tiene en
+    # la columna de prefijos el tiempo acumulado al momento de llegar y su
+    # espera real es ese valor menos lo que ya se atendió desde el frente.
+    def __init__(self):
+        self.acumulado = 0       # Suma de tiempos de todos los encolados
+        self.desplazamiento = 0  # Suma de tiempos de los ya desencolados
+        self.frente = 0          # Número de llegada del próximo a retirar
+        self._prefijos = ColumnaLlegadas('q')
+
+    def registrar(self, paciente):
+        self._prefijos.poner_valor(paciente.secuencia, self.acumulado)
+        paciente.vincular_estimador(self)
+        self.acumulado += paciente.obtener_tiempo_atencion()
+
+    def retirar(self, paciente):
+        # Se retira siempre el frente: su espera es 0
+        paciente.establecer_tiempo_espera_estimado(0)
+        self.desplazamiento += paciente.obtener_tiempo_atencion()
+        self.frente = paciente.secuencia + 1
+        if not self.frente & MASCARA_BLOQUE:
+            self._prefijos.liberar(paciente.secuencia)
+
+    def espera_de(self, paciente):
+        prefijo = self._prefijos.obtener_valor(paciente.secuencia)
+        if prefijo is None or paciente.secuencia < self.frente:
+            return 0  # Ya salió de la cola (una copia leída antes)
+        return prefijo - self.desplazamiento
+
+    def reiniciado(self):
+        return EstimadorEspera()
+
+
+class EstimadorTriaje:
+    # Una suma acumulada por nivel de prioridad: la espera de un paciente es
+    # todo lo pendiente en niveles más urgentes más lo que tiene adelante en
+    # su propio nivel. Cuesta O(niveles) por consulta. Cada nivel tiene su
+    # columna de prefijos, direccionada por la llegada dentro del nivel.
+    def __init__(self):
+        self.acumulado = {}
+        self.desplazamiento = {}
+        self.frente = {}
+        self._prefijos = {}
+
+    def registrar(self, paciente):
+        prioridad = paciente.prioridad
+        prefijo = self.acumulado.get(prioridad, 0)
+        if prioridad not in self._prefijos:
+            self._prefijos[prioridad] = ColumnaLlegadas('q')
+        self._prefijos[prioridad].poner_valor(paciente.secuencia, prefijo)
+        paciente.vincular_estimador(self)
+        self.acumulado[prioridad] = prefijo + paciente.obtener_tiempo_atencion()
+
+    def retirar(self, paciente):
+        prioridad = paciente.prioridad
+        paciente.establecer_tiempo_espera_estimado(0)
+        self.desplazamiento[prioridad] = (
+            self.desplazamiento.get(prioridad, 0) + paciente.obtener_tiempo_atencion())
+        self.frente[prioridad] = paciente.secuencia + 1
+        if not self.frente[prioridad] & MASCARA_BLOQUE:
+            self._prefijos[prioridad].liberar(paciente.secuencia)
+
+    def espera_de(self, paciente):
+        prioridad = paciente.prioridad
+        columna = self._prefijos.get(prioridad)
+        prefijo = columna.obtener_valor(paciente.secuencia) if columna is not None else None
+        if prefijo is None or paciente.secuencia < self.frente.get(prioridad, 0):
+            return 0
+        espera = prefijo - self.desplazamiento.get(prioridad, 0)
+        for nivel, acumulado in self.acumulado.items():
+            if nivel < prioridad:
+                espera += acumulado - self.desplazamiento.get(nivel, 0)
+        return espera
+
+    def reiniciado(self):
+        return EstimadorTriaje()
+
+
+class EstimadorMultiservidor:
+    # Varios doctores atienden la misma cola. Cada paciente recibe el instante
+    # (en minutos virtuales) en que quedará libre el primer doctor disponible,
+    # tomado de un min-heap; el reloj avanza cuando se atiende a alguien.
+    def __init__(self, cantidad_doctores=1):
+        if cantidad_doctores < 1:
+            raise ValueError("Debe haber al menos un doctor")
+        self.cantidad_doctores = cantidad_doctores
+        self._libres = [0] * cantidad_doctores  # Ya es un heap válido
+        self.reloj = 0
+        self.frente = 0
+        self._inicios = ColumnaLlegadas('q')
+
+    def registrar(self, paciente):
+        inicio = max(heapq.heappop(self._libres), self.reloj)
+        heapq.heappush(self._libres, inicio + paciente.obtener_tiempo_atencion())
+        self._inicios.poner_valor(paciente.secuencia, inicio)
+        paciente.vincular_estimador(self)
+
+    def retirar(self, paciente):
+        # Con varios doctores el frente puede tener que esperar a que uno se libere
+        inicio = self._inicios.obtener_valor(paciente.secuencia)
+        paciente.establecer_tiempo_espera_estimado(max(inicio - self.reloj, 0))
+        self.reloj = max(self.reloj, inicio)
+        self.frente = paciente.secuencia + 1
+        if not self.frente & MASCARA_BLOQUE:
+            self._inicios.liberar(paciente.secuencia)
+
+    def espera_de(self, paciente):
+        inicio = self._inicios.obtener_valor(paciente.secuencia)
+        if inicio is None or paciente.secuencia < self.frente:
+            return 0
+        return max(inicio - self.reloj, 0)
+
+    def espera_para_nuevo(self):
+        # Espera que tendría un paciente que llegue ahora, sin registrarlo
+        return max(self._libres[0] - self.reloj, 0)
+
+    def reiniciado(self):
+        return EstimadorMultiservidor(self.cantidad_doctores)
+
+
+class EstimadorAprendido:
+    # Como EstimadorEspera, pero el prefijo es un conteo de pacientes por
+    # especialidad en vez de minutos fijos: la espera es Σ pendientes × media
+    # aprendida. Cuando el predictor actualiza una media, todas las esperas
+    # cambian sin recorrer la cola. O(especialidades) por consulta.
+    # Los conteos de cada paciente ocupan una fila de la columna de prefijos
+    # (un entero de 32 bits por especialidad).
+    def __init__(self, predictor):
+        self.predictor = predictor
+        # Mismo código que la columna de prefijos para copiarlo tal cual
+        self.acumulado = array('I', [0]) * len(ESPECIALIDADES)
+        self.desplazamiento = [0] * len(ESPECIALIDADES)
+        self.frente = 0
+        self._prefijos = ColumnaLlegadas('I', len(ESPECIALIDADES))
+        # Espera de la cola completa, válida mientras no cambien la cola ni
+        # el predictor: el estado se consulta mucho más de lo que cambia.
+        # Cada alta o retiro la descarta; la versión detecta el predictor.
+        self._cache_nuevo = None
+        self._version_cache = None
+
+    def registrar(self, paciente):
+        self._prefijos.poner(paciente.secuencia, self.acumulado)
+        paciente.vincular_estimador(self)
+        self.acumulado[ID_ESPECIALIDAD[paciente.especialidad]] += 1
+        self._cache_nuevo = None
+
+    def retirar(self, paciente):
+        # Siempre se retira el frente, que no tiene a nadie adelante: se
+        # congela 0 sin calcular la distribución
+        paciente.establecer_tiempo_espera_estimado(0)
+        self.desplazamiento[ID_ESPECIALIDAD[paciente.especialidad]] += 1
+        self.frente = paciente.secuencia + 1
+        if not self.frente & MASCARA_BLOQUE:
+            self._prefijos.liberar(paciente.secuencia)
+        self._cache_nuevo = None
+
+    def _pendientes(self, prefijo):
+        return [antes - atendidos for antes, atendidos in zip(prefijo, self.desplazamiento)]
+
+    def _pendientes_de(self, paciente):
+        prefijo = self._prefijos.obtener(paciente.secuencia)
+        if prefijo is None or paciente.secuencia < self.frente:
+            return None  # Ya salió de la cola
+        return self._pendientes(prefijo)
+
+    def espera_de(self, paciente):
+        pendientes = self._pendientes_de(paciente)
+        if pendientes is None:
+            return 0
+        return round(self.predictor.distribucion(pendientes)[0])
+
+    def cuantiles_de(self, paciente):
+        pendientes = self._pendientes_de(paciente)
+        media, p50, p90 = self._cuantiles(pendientes) if pendientes is not None else (0, 0, 0)
+        return {'media': media, 'p50': p50, 'p90': p90}
+
+    def cuantiles_para_nuevo(self):
+        # (media, p50, p90) de un paciente que llegue ahora: toda la cola pendiente
+        if self._cache_nuevo is None or self._version_cache != self.predictor.version:
+            self._cache_nuevo = self._cuantiles(self._pendientes(self.acumulado))
+            self._version_cache = self.predictor.version
+        return self._cache_nuevo
+
+    def _cuantiles(self, pendientes):
+        media, varianza = self.predictor.distribucion(pendientes)
+        return (round(media),
+                round(self.predictor.cuantil_suma(media, varianza, 0.5)),
+                round(self.predictor.cuantil_suma(media, varianza, 0.9)))
+
+    def reiniciado(self):
+        return EstimadorAprendido(self.predictor)
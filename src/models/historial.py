@@ -0,0 +1,208 @@
+import collections
+import datetime
+import math
+import mmap
+import os
+import shutil
+import struct
+import tempfile
+import weakref
+
+from models.paciente import Paciente
+
+ESPECIALIDADES = list(Paciente.TIEMPOS_ESPECIALIDAD.keys())
+ID_ESPECIALIDAD = {especialidad: i for i, especialidad in enumerate(ESPECIALIDADES)}
+
+# Columna -> código de array/struct. Cada columna es un archivo de ancho fijo.
+COLUMNAS = {
+    'offset_nombre': 'Q',  # Posición del nombre en nombres.bin
+    'largo_nombre': 'H',
+    'edad': 'H',
+    'especialidad': 'B',   # Índice en ESPECIALIDADES
+    'prioridad': 'B',
+    'registro': 'd',       # Marca de tiempo (segundos); NaN si no hay
+    'atencion': 'd'
+}
+FORMATOS = {columna: struct.Struct('<' + codigo) for columna, codigo in COLUMNAS.items()}
+
+
+class HistorialAtendidos:
+    # Historial de pacientes atendidos con una ventana reciente en memoria.
+    # Los registros más antiguos se pasan a archivos columnares de ancho fijo
+    # que se leen con mmap, sin reconstruir objetos Paciente.
+    # Con `solo_lectura` no se crea ni modifica ningún archivo: los atendidos
+    # nuevos se quedan en memoria y las filas posteriores a `en_disco` se
+    # ignoran en vez de truncarse.
+    def __init__(self, directorio=None, ventana=1000, en_disco=None, solo_lectura=False):
+        if directorio is None:
+            directorio = tempfile.mkdtemp(prefix='historial_')
+            weakref.finalize(self, shutil.rmtree, directorio, True)
+        if not solo_lectura:
+            os.makedirs(directorio, exist_ok=True)
+
+        self.directorio = directorio
+        self.ventana = ventana
+        self.solo_lectura = solo_lectura
+        self._recientes = collections.deque()
+        self._archivos = {}
+        self._mapas = {}
+
+        for columna in list(COLUMNAS) + ['nombres']:
+            ruta = self._ruta(columna)
+            if solo_lectura:
+                # Las columnas que no existen se leen como vacías
+                archivo = open(ruta, 'rb') if os.path.exists(ruta) else None
+            else:
+                archivo = open(ruta, 'a+b')
+            self._archivos[columna] = archivo
+
+        # Al recuperar desde una instantánea se descartan filas escritas después
+        self._en_disco = self._filas_en_archivo()
+        if en_disco is not None:
+            if not solo_lectura:
+                self._truncar(en_disco)
+            self._en_disco = min(self._en_disco, en_disco)
+
+    def append(self, paciente):
+        self._recientes.append(paciente)
+        if len(self._recientes) > self.ventana and not self.solo_lectura:
+            self._volcar(self._recientes.popleft())
+
+    def __len__(self):
+        return self._en_disco + len(self._recientes)
+
+    def __getitem__(self, indice):
+        # Paciente reconstruido; para lecturas masivas use obtener_registro
+        indice = self._normalizar_indice(indice)
+        if indice >= self._en_disco:
+            return self._recientes[indice - self._en_disco]
+        return self._registro_a_paciente(self.obtener_registro(indice))
+
+    def __iter__(self):
+        for indice in range(self._en_disco):
+            yield self._registro_a_paciente(self.obtener_registro(indice))
+        yield from list(self._recientes)
+
+    def cantidad_en_disco(self):
+        return self._en_disco
+
+    def obtener_recientes(self):
+        return list(self._recientes)
+
+    def obtener_registro(self, indice):
+        indice = self._normalizar_indice(indice)
+        if indice >= self._en_disco:
+            paciente = self._recientes[indice - self._en_disco]
+            return {
+                'nombre': paciente.nombre,
+                'edad': paciente.edad,
+                'especialidad': paciente.especialidad,
+                'prioridad': paciente.prioridad,
+                'tiempo_registro': paciente.tiempo_registro,
+                'tiempo_atencion': paciente.tiempo_atencion_actual
+            }
+
+        offset = self.obtener_columna('offset_nombre')[indice]
+        largo = self.obtener_columna('largo_nombre')[indice]
+        return {
+            'nombre': bytes(self._mapa('nombres')[offset:offset + largo]).decode('utf-8'),
+            'edad': self.obtener_columna('edad')[indice],
+            'especialidad': ESPECIALIDADES[self.obtener_columna('especialidad')[indice]],
+            'prioridad': self.obtener_columna('prioridad')[indice],
+            'tiempo_registro': _a_momento(self.obtener_columna('registro')[indice]),
+            'tiempo_atencion': _a_momento(self.obtener_columna('atencion')[indice])
+        }
+
+    def obtener_columna(self, columna):
+        # memoryview tipado sobre el mmap de la parte en disco; en solo
+        # lectura el archivo puede tener filas de después de la instantánea
+        mapa = self._mapa(columna)
+        if mapa is None:
+            return memoryview(b'').cast(COLUMNAS[columna])
+        return memoryview(mapa).cast(COLUMNAS[columna])[:self._en_disco]
+
+    def sincronizar(self):
+        if self.solo_lectura:
+            return
+        for archivo in self._archivos.values():
+            archivo.flush()
+            os.fsync(archivo.fileno())
+
+    def cerrar(self):
+        self._mapas = {}  # Los mmap se liberan cuando no queden vistas abiertas
+        for archivo in self._archivos.values():
+            if archivo is not None:
+                archivo.close()
+
+    def _volcar(self, paciente):
+        nombre = paciente.nombre.encode('utf-8')
+        archivo_nombres = self._archivos['nombres']
+        archivo_nombres.seek(0, os.SEEK_END)
+        valores = {
+            'offset_nombre': archivo_nombres.tell(),
+            'largo_nombre': len(nombre),
+            'edad': paciente.edad,
+            'especialidad': ID_ESPECIALIDAD[paciente.especialidad],
+            'prioridad': paciente.prioridad,
+            'registro': _a_segundos(paciente.tiempo_registro),
+            'atencion': _a_segundos(paciente.tiempo_atencion_actual)
+        }
+        archivo_nombres.write(nombre)
+        for columna, formato in FORMATOS.items():
+            self._archivos[columna].write(formato.pack(valores[columna]))
+        self._en_disco += 1
+        self._mapas = {}  # Los mapas se vuelven a abrir en la siguiente lectura
+
+    def _mapa(self, columna):
+        if columna not in self._mapas:
+            archivo = self._archivos[columna]
+            if archivo is None:
+                self._mapas[columna] = None
+                return None
+            archivo.flush()
+            tamano = os.path.getsize(self._ruta(columna))
+            self._mapas[columna] = (mmap.mmap(archivo.fileno(), tamano, access=mmap.ACCESS_READ)
+                                    if tamano else None)
+        return self._mapas[columna]
+
+    def _truncar(self, en_disco):
+        for columna, formato in FORMATOS.items():
+            self._archivos[columna].truncate(en_disco * formato.size)
+        if en_disco:
+            offsets = self.obtener_columna('offset_nombre')
+            largos = self.obtener_columna('largo_nombre')
+            fin_nombres = offsets[en_disco - 1] + largos[en_disco - 1]
+            self._mapas = {}
+        else:
+            fin_nombres = 0
+        self._archivos['nombres'].truncate(fin_nombres)
+
+    def _filas_en_archivo(self):
+        ruta = self._ruta('edad')
+        return os.path.getsize(ruta) // FORMATOS['edad'].size if os.path.exists(ruta) else 0
+
+    def _normalizar_indice(self, indice):
+        total = len(self)
+        if indice < 0:
+            indice += total
+        if not 0 <= indice < total:
+            raise IndexError("Índice fuera del historial")
+        return indice
+
+    def _ruta(self, columna):
+        return os.path.join(self.directorio, f"{columna}.bin")
+
+    def _registro_a_paciente(self, registro):
+        paciente = Paciente(registro['nombre'], registro['edad'],
+                            registro['especialidad'], registro['prioridad'])
+        paciente.tiempo_registro = registro['tiempo_registro']
+        paciente.tiempo_atencion_actual = registro['tiempo_atencion']
+        return paciente
+
+
+def _a_segundos(momento):
+    return momento.timestamp() if momento is not None else math.nan
+
+
+def _a_momento(segundos):
+    return None if math.isnan(segundos) else datetime.datetime.fromtimestamp(segundos)
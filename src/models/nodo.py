@@ -1,4 +1,6 @@
 class Nodo:
+    __slots__ = ('info', 'siguiente')
+
     def __init__(self, info):
         self.info = info
         self.siguiente = None
@@ -1,11 +1,23 @@
 class Paciente:
-    def __init__(self, nombre, edad, especialidad):
+    # Sin __dict__ por instancia: reduce la memoria de colas grandes. Lo
+    # que el estimador necesita de cada paciente vive en sus columnas.
+    __slots__ = ('nombre', 'llave', 'secuencia', 'edad', 'especialidad', 'prioridad',
+                 'tiempo_atencion', 'tiempo_registro', 'tiempo_atencion_actual', '_espera')
+
+    def __init__(self, nombre, edad, especialidad, prioridad=None):
         self.nombre = nombre
+        # Llave precalculada para búsquedas; es el mismo objeto que el nombre
+        # si ya está normalizado, así que solo ocupa memoria cuando difiere
+        self.llave = Paciente.normalizar_llave(nombre)
+        self.secuencia = None  # Número de llegada asignado por la cola
         self.edad = edad
         self.especialidad = especialidad
+        # Solo se usa en la cola de triaje: un número menor se atiende antes
+        self.prioridad = Paciente.PRIORIDAD_NORMAL if prioridad is None else prioridad
         self.tiempo_atencion = self.TIEMPOS_ESPECIALIDAD.get(especialidad, 10)
         self.tiempo_registro = None
-        self.tiempo_espera_estimado = 0
+        self.tiempo_atencion_actual = None
+        self._espera = 0  # Espera congelada, o el estimador de la cola donde espera
 
     TIEMPOS_ESPECIALIDAD = {
         "Medicina General": 10,
@@ -14,12 +26,36 @@ class Paciente:
         "Dermatología": 25
     }
 
+    PRIORIDADES = {
+        1: "Urgente",
+        2: "Preferente",
+        3: "Normal"
+    }
+    PRIORIDAD_NORMAL = 3
+    # Bytes UTF-8: el diario y el historial guardan el largo del nombre en 16 bits
+    LARGO_MAXIMO_NOMBRE = 0xFFFF
+
     def obtener_tiempo_atencion(self):
         return self.tiempo_atencion
 
+    @property
+    def tiempo_espera_estimado(self):
+        # Mientras está en cola la espera se deriva del estimador en O(1)
+        espera = self._espera
+        if isinstance(espera, (int, float)):
+            return espera
+        return espera.espera_de(self)
+
+    @tiempo_espera_estimado.setter
+    def tiempo_espera_estimado(self, tiempo_espera):
+        self._espera = tiempo_espera
+
     def establecer_tiempo_espera_estimado(self, tiempo_espera):
         self.tiempo_espera_estimado = tiempo_espera
 
+    def vincular_estimador(self, estimador):
+        self._espera = estimador
+
     def obtener_tiempo_total_estimado(self):
         return self.tiempo_espera_estimado + self.tiempo_atencion
 
@@ -34,8 +70,13 @@ class Paciente:
             f"Tiempo total estimado: {self.obtener_tiempo_total_estimado()} minutos")
         print("-" * 50)
 
+    @staticmethod
+    def normalizar_llave(nombre):
+        llave = nombre.casefold()
+        return nombre if llave == nombre else llave  # Evita duplicar la cadena
+
     def es_igual_a_llave(self, nombre):
-        return self.nombre.lower() == nombre.lower()
+        return self.llave == Paciente.normalizar_llave(nombre)
 
     def __str__(self):
         return f"{self.nombre} ({self.edad} años) - {self.especialidad}"
@@ -45,6 +86,7 @@ class Paciente:
             'nombre': self.nombre,
             'edad': self.edad,
             'especialidad': self.especialidad,
+            'prioridad': self.prioridad,
             'tiempo_atencion': self.tiempo_atencion,
             'tiempo_espera_estimado': self.tiempo_espera_estimado
         }
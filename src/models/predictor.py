@@ -0,0 +1,165 @@
+import math
+
+from models.paciente import Paciente
+
+ESPECIALIDADES = list(Paciente.TIEMPOS_ESPECIALIDAD.keys())
+ID_ESPECIALIDAD = {especialidad: i for i, especialidad in enumerate(ESPECIALIDADES)}
+
+ALFA = 0.2               # Peso de cada atención nueva en el promedio móvil
+MINIMO_SERVICIO = 0.5    # Minutos; menos que esto son atenciones en lote o de prueba
+MAXIMO_SERVICIO = 240    # Minutos; más que esto es una pausa, no una consulta
+DISPERSION_INICIAL = 0.3  # Desviación supuesta antes de tener datos (fracción de la media)
+Z_CUANTIL = {0.5: 0.0, 0.9: 1.2816}
+
+
+class CuantilP2:
+    # Cuantil en línea con el algoritmo P² (Jain y Chlamtac): cinco
+    # marcadores cuyas alturas se ajustan con interpolación parabólica.
+    # Memoria y costo O(1) por muestra, sin guardar el historial.
+    def __init__(self, cuantil):
+        self.cuantil = cuantil
+        self.alturas = []
+        self.posiciones = [1, 2, 3, 4, 5]
+        self.deseadas = [1, 1 + 2 * cuantil, 1 + 4 * cuantil, 3 + 2 * cuantil, 5]
+        self.incrementos = [0, cuantil / 2, cuantil, (1 + cuantil) / 2, 1]
+
+    def agregar(self, valor):
+        alturas = self.alturas
+        if len(alturas) < 5:
+            alturas.append(valor)
+            alturas.sort()
+            return
+
+        if valor < alturas[0]:
+            alturas[0] = valor
+            celda = 0
+        elif valor >= alturas[4]:
+            alturas[4] = valor
+            celda = 3
+        else:
+            celda = next(i for i in range(4) if alturas[i] <= valor < alturas[i + 1])
+
+        for i in range(celda + 1, 5):
+            self.posiciones[i] += 1
+        for i in range(5):
+            self.deseadas[i] += self.incrementos[i]
+
+        # Ajuste de los tres marcadores centrales
+        for i in range(1, 4):
+            diferencia = self.deseadas[i] - self.posiciones[i]
+            if (diferencia >= 1 and self.posiciones[i + 1] - self.posiciones[i] > 1) or \
+                    (diferencia <= -1 and self.posiciones[i - 1] - self.posiciones[i] < -1):
+                paso = 1 if diferencia > 0 else -1
+                altura = self._parabolica(i, paso)
+                if not alturas[i - 1] < altura < alturas[i + 1]:
+                    altura = self._lineal(i, paso)
+                alturas[i] = altura
+                self.posiciones[i] += paso
+
+    def _parabolica(self, i, paso):
+        n, q = self.posiciones, self.alturas
+        return q[i] + paso / (n[i + 1] - n[i - 1]) * (
+            (n[i] - n[i - 1] + paso) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+            + (n[i + 1] - n[i] - paso) * (q[i] - q[i - 1]) / (n[i] - n[i - 1]))
+
+    def _lineal(self, i, paso):
+        n, q = self.posiciones, self.alturas
+        return q[i] + paso * (q[i + paso] - q[i]) / (n[i + paso] - n[i])
+
+    def valor(self):
+        if not self.alturas:
+            return None
+        if len(self.alturas) < 5:
+            # Pocas muestras: cuantil directo sobre las ordenadas
+            return self.alturas[min(int(self.cuantil * len(self.alturas)), len(self.alturas) - 1)]
+        return self.alturas[2]
+
+
+class PredictorServicio:
+    # Tiempos de atención por especialidad aprendidos de las atenciones
+    # reales: promedio y varianza exponenciales (se adaptan si el ritmo de
+    # la clínica cambia) y cuantiles P² para informar. Antes de la primera
+    # muestra se usa la tabla fija de Paciente.TIEMPOS_ESPECIALIDAD.
+    def __init__(self, alfa=ALFA):
+        self.alfa = alfa
+        self.medias = [float(Paciente.TIEMPOS_ESPECIALIDAD[especialidad])
+                       for especialidad in ESPECIALIDADES]
+        self.varianzas = [(media * DISPERSION_INICIAL) ** 2 for media in self.medias]
+        self.muestras = [0] * len(ESPECIALIDADES)
+        self.version = 0  # Cambia con cada muestra aceptada (para cachés)
+        self.cuantiles = [{cuantil: CuantilP2(cuantil) for cuantil in Z_CUANTIL}
+                          for _ in ESPECIALIDADES]
+
+    def observar(self, especialidad, minutos):
+        indice = ID_ESPECIALIDAD.get(especialidad)
+        if indice is None or not MINIMO_SERVICIO <= minutos <= MAXIMO_SERVICIO:
+            return False
+
+        diferencia = minutos - self.medias[indice]
+        incremento = self.alfa * diferencia
+        self.medias[indice] += incremento
+        self.varianzas[indice] = (1 - self.alfa) * (self.varianzas[indice] + diferencia * incremento)
+        self.muestras[indice] += 1
+        self.version += 1
+        for estimador in self.cuantiles[indice].values():
+            estimador.agregar(minutos)
+        return True
+
+    def observar_atencion(self, anterior, actual):
+        # Con un solo consultorio, la consulta del paciente anterior dura
+        # desde su atención hasta la del actual. Si el actual llegó después,
+        # el consultorio pudo quedar libre y el intervalo no sirve.
+        if anterior is None or anterior.tiempo_atencion_actual is None \
+                or actual.tiempo_atencion_actual is None:
+            return False
+        if actual.tiempo_registro is not None and actual.tiempo_registro > anterior.tiempo_atencion_actual:
+            return False
+        minutos = (actual.tiempo_atencion_actual - anterior.tiempo_atencion_actual).total_seconds() / 60
+        return self.observar(anterior.especialidad, minutos)
+
+    def entrenar(self, atendidos):
+        # Recorre pacientes atendidos en orden (p. ej. el historial reciente)
+        anterior = None
+        for paciente in atendidos:
+            self.observar_atencion(anterior, paciente)
+            anterior = paciente
+
+    def media(self, especialidad):
+        return self.medias[ID_ESPECIALIDAD[especialidad]]
+
+    def distribucion(self, cantidades):
+        # cantidades: una por especialidad en el orden de ESPECIALIDADES.
+        # Media y varianza de la suma, suponiendo consultas independientes.
+        media = 0.0
+        varianza = 0.0
+        for cantidad, media_servicio, varianza_servicio in zip(cantidades, self.medias, self.varianzas):
+            if cantidad:
+                media += cantidad * media_servicio
+                varianza += cantidad * varianza_servicio
+        return media, varianza
+
+    @staticmethod
+    def cuantil_suma(media, varianza, cuantil):
+        # Aproximación gamma (Wilson-Hilferty): la espera es una suma de
+        # tiempos positivos y sesgados, así que la mediana queda por debajo
+        # de la media y el p90 por encima; con muchos pacientes tiende a la normal
+        if media <= 0:
+            return 0.0
+        if varianza <= 0:
+            return media
+        forma = media * media / varianza
+        termino = 1 / (9 * forma)
+        return media * max(1 - termino + Z_CUANTIL[cuantil] * math.sqrt(termino), 0) ** 3
+
+    def resumen(self):
+        # especialidad -> {'media', 'p50', 'p90', 'muestras'} en minutos
+        resumen = {}
+        for indice, especialidad in enumerate(ESPECIALIDADES):
+            cuantiles = {cuantil: estimador.valor() for cuantil, estimador in self.cuantiles[indice].items()}
+            resumen[especialidad] = {
+                'media': round(self.medias[indice], 1),
+                'p50': round(cuantiles[0.5], 1) if cuantiles[0.5] is not None else None,
+                'p90': round(cuantiles[0.9], 1) if cuantiles[0.9] is not None else None,
+                'muestras': self.muestras[indice]
+            }
+        return resumen
@@ -0,0 +1,253 @@
+# Servidor HTTP/JSON sin interfaz gráfica sobre ControladorTurnos, para que
+# recepción, consultorios y pantallas de sala de espera compartan la misma
+# cola. Uso (desde src/):
+#   python servidor.py [--host 127.0.0.1] [--puerto 8080] [--datos DIR | --memoria]
+#
+# Rutas:
+#   POST /pacientes     {"nombre", "edad", "especialidad", "prioridad" (opcional)}
+#   POST /atender
+#   GET  /siguiente
+#   GET  /posicion?nombre=...
+#   GET  /estado
+#   GET  /estadisticas
+#   GET  /metricas      (solo con --metricas; formato de texto de Prometheus)
+import argparse
+import asyncio
+import contextlib
+import http
+import json
+import os
+import sys
+from urllib.parse import urlsplit, parse_qs
+
+from controllers.turnos import ControladorTurnos
+from models.cola import ColaPacientes
+from utils.diario import recuperar_controlador
+from utils.metricas import RegistroMetricas, METODOS_CONTROLADOR
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'datos')
+MAX_CUERPO = 1024 * 1024
+
+
+class ServidorTurnos:
+    def __init__(self, controlador, metricas=None):
+        self.controlador = controlador
+        self.metricas = metricas
+        self._escrituras = None  # Se crea dentro del loop en iniciar()
+        self._escritor = None
+        self._servidor = None
+
+        self.rutas = {
+            ('POST', '/pacientes'): self._registrar,
+            ('POST', '/atender'): self._atender,
+            ('GET', '/siguiente'): self._siguiente,
+            ('GET', '/posicion'): self._posicion,
+            ('GET', '/estado'): self._estado,
+            ('GET', '/estadisticas'): self._estadisticas
+        }
+        if metricas is not None:
+            self.rutas[('GET', '/metricas')] = self._metricas
+
+    async def iniciar(self, host='127.0.0.1', puerto=8080):
+        self._escrituras = asyncio.Queue()
+        self._escritor = asyncio.create_task(self._escribir())
+        self._servidor = await asyncio.start_server(self._atender_conexion, host, puerto)
+        # Con puerto 0 el sistema elige uno libre; se devuelve el real
+        return self._servidor.sockets[0].getsockname()[1]
+
+    async def detener(self):
+        self._servidor.close()
+        await self._servidor.wait_closed()
+        self._escritor.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self._escritor
+
+    async def _escribir(self):
+        # Única tarea que modifica el controlador: las mutaciones se aplican de
+        # a una y en orden de llegada. Las lecturas no pasan por aquí y se
+        # responden directamente en cada conexión.
+        while True:
+            operacion, futuro = await self._escrituras.get()
+            try:
+                resultado = operacion()
+            except Exception as e:
+                if not futuro.cancelled():
+                    futuro.set_exception(e)
+                continue
+            if not futuro.cancelled():
+                futuro.set_result(resultado)
+
+    async def _mutar(self, operacion):
+        futuro = asyncio.get_running_loop().create_future()
+        await self._escrituras.put((operacion, futuro))
+        return await futuro
+
+    async def _atender_conexion(self, lector, escritor):
+        # HTTP/1.1 mínimo con conexiones persistentes
+        try:
+            while True:
+                linea = await lector.readline()
+                if not linea:
+                    break
+                partes = linea.decode('latin-1').split()
+                if len(partes) != 3:
+                    self._responder(escritor, 400, {'error': "Solicitud mal formada"}, False)
+                    break
+                metodo, objetivo, version = partes
+
+                encabezados = {}
+                while True:
+                    linea = await lector.readline()
+                    if linea in (b'\r\n', b'\n', b''):
+                        break
+                    clave, _, valor = linea.decode('latin-1').partition(':')
+                    encabezados[clave.strip().lower()] = valor.strip()
+
+                try:
+                    largo = int(encabezados.get('content-length') or 0)
+                except ValueError:
+                    largo = -1
+                if largo < 0 or largo > MAX_CUERPO:
+                    self._responder(escritor, 400, {'error': "Content-Length no válido"}, False)
+                    break
+                cuerpo = await lector.readexactly(largo) if largo else b''
+
+                estado, datos = await self._despachar(metodo, objetivo, cuerpo)
+                mantener = (version == 'HTTP/1.1'
+                            and encabezados.get('connection', '').lower() != 'close')
+                self._responder(escritor, estado, datos, mantener)
+                await escritor.drain()
+                if not mantener:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            escritor.close()
+
+    def _responder(self, escritor, estado, datos, mantener):
+        # Las respuestas de texto (métricas) se envían tal cual
+        if isinstance(datos, str):
+            cuerpo, tipo = datos.encode('utf-8'), 'text/plain; version=0.0.4'
+        else:
+            cuerpo, tipo = json.dumps(datos, ensure_ascii=False).encode('utf-8'), 'application/json'
+        encabezado = (f"HTTP/1.1 {estado} {http.HTTPStatus(estado).phrase}\r\n"
+                      f"Content-Type: {tipo}; charset=utf-8\r\n"
+                      f"Content-Length: {len(cuerpo)}\r\n"
+                      f"Connection: {'keep-alive' if mantener else 'close'}\r\n\r\n")
+        escritor.write(encabezado.encode('latin-1') + cuerpo)
+
+    async def _despachar(self, metodo, objetivo, cuerpo):
+        partes = urlsplit(objetivo)
+        manejador = self.rutas.get((metodo, partes.path))
+        if manejador is None:
+            if any(ruta == partes.path for _, ruta in self.rutas):
+                return 405, {'error': f"Método {metodo} no permitido en {partes.path}"}
+            return 404, {'error': f"Ruta no encontrada: {partes.path}"}
+
+        try:
+            datos = json.loads(cuerpo) if cuerpo else {}
+        except ValueError:
+            return 400, {'error': "El cuerpo no es JSON válido"}
+        if not isinstance(datos, dict):
+            return 400, {'error': "El cuerpo debe ser un objeto JSON"}
+        consulta = {clave: valores[-1] for clave, valores in parse_qs(partes.query).items()}
+
+        try:
+            return await manejador(datos, consulta)
+        except Exception as e:
+            return 500, {'error': f"Error interno: {str(e)}"}
+
+    async def _registrar(self, datos, consulta):
+        nombre = datos.get('nombre')
+
+        def registrar():
+            exito, mensaje = self.controlador.registrar_paciente(
+                nombre, datos.get('edad'), datos.get('especialidad'), datos.get('prioridad'))
+            # La posición se lee en la misma escritura, antes de otra mutación
+            posicion = self.controlador.cola.obtener_posicion_paciente(nombre.strip()) if exito else -1
+            return exito, mensaje, posicion
+
+        exito, mensaje, posicion = await self._mutar(registrar)
+        if not exito:
+            return 400, {'exito': False, 'mensaje': mensaje}
+        return 201, {'exito': True, 'mensaje': mensaje, 'posicion': posicion}
+
+    async def _atender(self, datos, consulta):
+        paciente, mensaje = await self._mutar(self.controlador.atender_paciente)
+        return 200, {'paciente': paciente.a_diccionario() if paciente else None,
+                     'mensaje': mensaje}
+
+    async def _siguiente(self, datos, consulta):
+        paciente, mensaje = self.controlador.ver_siguiente_paciente()
+        return 200, {'paciente': paciente.a_diccionario() if paciente else None,
+                     'mensaje': mensaje}
+
+    async def _posicion(self, datos, consulta):
+        nombre = consulta.get('nombre')
+        if not nombre:
+            return 400, {'error': "Falta el parámetro nombre"}
+        posicion, mensaje = self.controlador.obtener_posicion_paciente(nombre)
+        espera, _ = self.controlador.obtener_espera_paciente(nombre)
+        return (200 if posicion != -1 else 404), {'posicion': posicion, 'espera': espera,
+                                                  'mensaje': mensaje}
+
+    async def _estado(self, datos, consulta):
+        estado = self.controlador.obtener_estado_cola()
+        siguiente = estado['siguiente_paciente']
+        estado['siguiente_paciente'] = siguiente.a_diccionario() if siguiente else None
+        return 200, estado
+
+    async def _estadisticas(self, datos, consulta):
+        return 200, {'especialidades': self.controlador.obtener_estadisticas_especialidad(),
+                     'tiempos_servicio': self.controlador.obtener_tiempos_servicio(),
+                     'pacientes_atendidos': self.controlador.total_pacientes_atendidos}
+
+    async def _metricas(self, datos, consulta):
+        return 200, self.metricas.exportar_prometheus()
+
+
+async def servir(controlador, host, puerto, metricas=None):
+    servidor = ServidorTurnos(controlador, metricas)
+    puerto = await servidor.iniciar(host, puerto)
+    print(f"Servidor de turnos escuchando en http://{host}:{puerto}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await servidor.detener()
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description="Servidor HTTP/JSON de turnos médicos")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--puerto', type=int, default=8080)
+    parser.add_argument('--datos', default=DATA_DIR, help="Directorio del diario e instantáneas")
+    parser.add_argument('--memoria', action='store_true', help="No persistir la cola en disco")
+    parser.add_argument('--almacen', default=None, choices=list(ColaPacientes.ALMACENES.keys()),
+                        help="Por defecto el guardado en --datos (o enlazada)")
+    parser.add_argument('--metricas', action='store_true',
+                        help="Medir la latencia del controlador y publicarla en GET /metricas")
+    opciones = parser.parse_args(argumentos)
+
+    if opciones.memoria:
+        controlador = ControladorTurnos(almacen=opciones.almacen or 'enlazada')
+    else:
+        controlador = recuperar_controlador(opciones.datos, almacen=opciones.almacen)
+
+    metricas = None
+    if opciones.metricas:
+        metricas = RegistroMetricas()
+        metricas.instrumentar(controlador, METODOS_CONTROLADOR, 'controlador')
+
+    try:
+        asyncio.run(servir(controlador, opciones.host, opciones.puerto, metricas))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        # Asegura que el diario quede escrito en disco antes de salir
+        if controlador.diario is not None:
+            controlador.diario.cerrar()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
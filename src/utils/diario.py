@@ -0,0 +1,413 @@
+import datetime
+import math
+import os
+import struct
+import threading
+import time
+import zlib
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None  # Windows: sin candados entre procesos
+
+from controllers.turnos import ControladorTurnos
+from models.historial import HistorialAtendidos
+from models.paciente import Paciente
+
+# Registro del diario: encabezado (tipo, longitud del contenido, crc32) + contenido
+ENCABEZADO = struct.Struct('<BII')
+ALTA = 1
+ATENCION = 2
+LIMPIEZA = 3
+MODO = 4  # Primer registro de cada diario: almacenamiento de la cola
+
+# Cada proceso sigue anexando al último diario si nadie más lo tiene abierto;
+# si no, abre uno nuevo. Con más diarios que esto sin cubrir conviene guardar
+# una instantánea al cerrar
+MAXIMO_DIARIOS_PENDIENTES = 4
+
+# Paciente: edad, especialidad, prioridad, registro, atención, largo del nombre
+DATOS_PACIENTE = struct.Struct('<HBBddH')
+MOMENTO = struct.Struct('<d')
+
+# Instantánea: marca, versión, generación cubierta, total atendidos, en cola,
+# atendidos en memoria, atendidos ya volcados al historial en disco y
+# almacenamiento de la cola (desde la versión 3)
+ENCABEZADO_INSTANTANEA = struct.Struct('<4sBQQQQQB')
+ENCABEZADO_INSTANTANEA_V2 = struct.Struct('<4sBQQQQQ')
+MARCA_INSTANTANEA = b'TURN'
+VERSION_INSTANTANEA = 3
+
+# El orden de atención depende del almacenamiento: una atención del diario
+# solo se puede reproducir sobre una cola con el mismo orden
+ALMACENES = ['enlazada', 'circular', 'triaje']
+ID_ALMACEN = {almacen: i for i, almacen in enumerate(ALMACENES)}
+
+ESPECIALIDADES = list(Paciente.TIEMPOS_ESPECIALIDAD.keys())
+ID_ESPECIALIDAD = {especialidad: i for i, especialidad in enumerate(ESPECIALIDADES)}
+
+
+class DiarioTurnos:
+    # Diario de solo-anexar de las mutaciones del controlador. Las escrituras
+    # van a un búfer y un hilo hace flush + fsync cada `intervalo_fsync`
+    # segundos (group commit), así cada clic no espera al disco.
+    # Cada `umbral_instantanea` registros se guarda una instantánea compacta y
+    # se empieza un diario nuevo; los diarios cubiertos se borran. El diario
+    # abierto queda con un candado (flock) mientras el proceso lo usa.
+    def __init__(self, directorio, almacen='enlazada', intervalo_fsync=0.05, umbral_instantanea=50_000):
+        self.directorio = directorio
+        self.almacen = almacen
+        self.intervalo_fsync = intervalo_fsync
+        self.umbral_instantanea = umbral_instantanea
+        os.makedirs(directorio, exist_ok=True)
+
+        self._candado = threading.Lock()
+        self._pendiente = threading.Event()
+        self._cerrado = False
+        self._registros_desde_instantanea = 0
+
+        generaciones = self._generaciones_existentes()
+        cubierta = leer_generacion_instantanea(directorio)
+        # Diarios anteriores aún no cubiertos por una instantánea
+        self.diarios_pendientes = len(generaciones)
+        self._archivo = None
+        if generaciones and generaciones[-1] > cubierta:
+            self._archivo = self._continuar_diario(generaciones[-1])
+        if self._archivo is not None:
+            self.generacion = generaciones[-1]
+            self.diarios_pendientes -= 1
+        else:
+            self.generacion = max(generaciones + [cubierta]) + 1
+            self._abrir_generacion()
+
+        self._hilo = threading.Thread(target=self._ciclo_sincronizacion, daemon=True)
+        self._hilo.start()
+
+    def registrar_alta(self, paciente):
+        self._escribir(ALTA, codificar_paciente(paciente))
+
+    def registrar_atencion(self, momento):
+        self._escribir(ATENCION, MOMENTO.pack(_a_segundos(momento)))
+
+    def registrar_limpieza(self):
+        self._escribir(LIMPIEZA, b'')
+
+    def requiere_instantanea(self):
+        return self._registros_desde_instantanea >= self.umbral_instantanea
+
+    def contar_reproducidos(self, cantidad):
+        # Lo reproducido al recuperar también cuenta para el umbral
+        self._registros_desde_instantanea += cantidad
+
+    def requiere_compactacion(self):
+        return self.requiere_instantanea() or self.diarios_pendientes >= MAXIMO_DIARIOS_PENDIENTES
+
+    def guardar_instantanea(self, controlador):
+        with self._candado:
+            # Las mutaciones nuevas van al siguiente diario desde este punto
+            generacion_cubierta = self.generacion
+            self._archivo.flush()
+            os.fsync(self._archivo.fileno())
+            self._archivo.close()
+            self.generacion += 1
+            self._abrir_generacion()
+            self._registros_desde_instantanea = 0
+            self.diarios_pendientes = 0
+
+        escribir_instantanea(self.directorio, controlador, generacion_cubierta)
+
+        for generacion in self._generaciones_existentes():
+            if generacion <= generacion_cubierta:
+                os.remove(self._ruta_diario(generacion))
+
+    def sincronizar(self):
+        with self._candado:
+            if not self._archivo.closed:
+                self._archivo.flush()
+                os.fsync(self._archivo.fileno())
+
+    def cerrar(self):
+        self._cerrado = True
+        self._pendiente.set()
+        self._hilo.join()
+        self.sincronizar()
+        with self._candado:
+            self._archivo.close()
+
+    def _continuar_diario(self, generacion):
+        # El último diario se reutiliza si es del mismo almacenamiento y ningún
+        # otro proceso lo tiene abierto; None si hay que empezar uno nuevo
+        ruta = self._ruta_diario(generacion)
+        if fcntl is None or leer_almacen_diario(ruta) != self.almacen:
+            return None
+        archivo = open(ruta, 'ab')
+        if not _bloquear(archivo, esperar=False):
+            archivo.close()
+            return None
+        # Un registro incompleto al final (escritura interrumpida) se descarta
+        with open(ruta, 'rb') as lector:
+            datos = lector.read()
+        fin = 0
+        for _, _, fin in _registros(datos):
+            pass
+        archivo.truncate(fin)
+        return archivo
+
+    def _abrir_generacion(self):
+        # Cada diario empieza declarando el almacenamiento con que se escribió
+        self._archivo = open(self._ruta_diario(self.generacion), 'ab')
+        _bloquear(self._archivo, esperar=False)
+        contenido = self.almacen.encode('utf-8')
+        self._archivo.write(ENCABEZADO.pack(MODO, len(contenido), zlib.crc32(contenido)) + contenido)
+
+    def _escribir(self, tipo, contenido):
+        registro = ENCABEZADO.pack(tipo, len(contenido), zlib.crc32(contenido)) + contenido
+        with self._candado:
+            self._archivo.write(registro)
+            self._registros_desde_instantanea += 1
+        self._pendiente.set()
+
+    def _ciclo_sincronizacion(self):
+        while not self._cerrado:
+            self._pendiente.wait()
+            if self._cerrado:
+                break
+            # Se espera el intervalo para agrupar todo lo escrito en un solo fsync
+            time.sleep(self.intervalo_fsync)
+            self._pendiente.clear()
+            self.sincronizar()
+
+    def _ruta_diario(self, generacion):
+        return os.path.join(self.directorio, f"diario.{generacion:08d}.log")
+
+    def _generaciones_existentes(self):
+        return sorted(int(nombre.split('.')[1]) for nombre in os.listdir(self.directorio)
+                      if nombre.startswith('diario.') and nombre.endswith('.log'))
+
+
+def bloquear_datos(directorio):
+    # Candado exclusivo sobre `directorio`/bloqueo para que los procesos que
+    # modifican los datos se ejecuten de a uno: espera a que se libere y se
+    # suelta al cerrar el archivo devuelto
+    os.makedirs(directorio, exist_ok=True)
+    archivo = open(os.path.join(directorio, 'bloqueo'), 'ab')
+    _bloquear(archivo)
+    return archivo
+
+
+def _bloquear(archivo, esperar=True):
+    if fcntl is None:
+        return True
+    try:
+        fcntl.flock(archivo.fileno(), fcntl.LOCK_EX | (0 if esperar else fcntl.LOCK_NB))
+    except BlockingIOError:
+        return False
+    return True
+
+
+def codificar_paciente(paciente):
+    nombre = paciente.nombre.encode('utf-8')
+    return DATOS_PACIENTE.pack(paciente.edad, ID_ESPECIALIDAD[paciente.especialidad],
+                               paciente.prioridad, _a_segundos(paciente.tiempo_registro),
+                               _a_segundos(paciente.tiempo_atencion_actual), len(nombre)) + nombre
+
+
+def decodificar_paciente(datos, inicio=0):
+    edad, especialidad, prioridad, registro, atencion, largo = DATOS_PACIENTE.unpack_from(datos, inicio)
+    inicio += DATOS_PACIENTE.size
+    paciente = Paciente(datos[inicio:inicio + largo].decode('utf-8'), edad,
+                        ESPECIALIDADES[especialidad], prioridad)
+    paciente.tiempo_registro = _a_momento(registro)
+    paciente.tiempo_atencion_actual = _a_momento(atencion)
+    return paciente, inicio + largo
+
+
+def escribir_instantanea(directorio, controlador, generacion_cubierta):
+    pacientes = controlador.cola.a_lista()
+    historial = controlador.pacientes_atendidos
+    # La parte del historial en disco ya es persistente: solo se guarda cuánto hay
+    historial.sincronizar()
+    atendidos = historial.obtener_recientes()
+    partes = [ENCABEZADO_INSTANTANEA.pack(MARCA_INSTANTANEA, VERSION_INSTANTANEA, generacion_cubierta,
+                                          controlador.total_pacientes_atendidos,
+                                          len(pacientes), len(atendidos),
+                                          historial.cantidad_en_disco(),
+                                          ID_ALMACEN[controlador.almacen])]
+    partes.extend(codificar_paciente(paciente) for paciente in pacientes)
+    partes.extend(codificar_paciente(paciente) for paciente in atendidos)
+
+    # Se escribe aparte y se reemplaza de forma atómica
+    ruta = os.path.join(directorio, 'instantanea.bin')
+    temporal = ruta + '.tmp'
+    with open(temporal, 'wb') as archivo:
+        archivo.write(b''.join(partes))
+        archivo.flush()
+        os.fsync(archivo.fileno())
+    os.replace(temporal, ruta)
+
+
+def leer_generacion_instantanea(directorio):
+    ruta = os.path.join(directorio, 'instantanea.bin')
+    if not os.path.exists(ruta):
+        return 0
+    with open(ruta, 'rb') as archivo:
+        return _leer_encabezado_instantanea(archivo.read(ENCABEZADO_INSTANTANEA.size), ruta)[2]
+
+
+def _leer_encabezado_instantanea(datos, ruta):
+    # Devuelve los campos de la versión 3; las instantáneas de la versión 2
+    # no guardaban el almacenamiento (None)
+    if len(datos) >= ENCABEZADO_INSTANTANEA_V2.size:
+        marca, version = struct.unpack_from('<4sB', datos, 0)
+        if marca == MARCA_INSTANTANEA and version == 2:
+            return ENCABEZADO_INSTANTANEA_V2.unpack_from(datos, 0) + (None,)
+        if marca == MARCA_INSTANTANEA and version == VERSION_INSTANTANEA \
+                and len(datos) >= ENCABEZADO_INSTANTANEA.size:
+            campos = ENCABEZADO_INSTANTANEA.unpack_from(datos, 0)
+            return campos[:-1] + (ALMACENES[campos[-1]],)
+    raise ValueError(f"Instantánea no válida: {ruta}")
+
+
+def leer_almacen_diario(ruta):
+    # Almacenamiento declarado al inicio del diario (None en diarios antiguos)
+    with open(ruta, 'rb') as archivo:
+        datos = archivo.read(ENCABEZADO.size + 64)
+    if len(datos) < ENCABEZADO.size:
+        return None
+    tipo, largo, crc = ENCABEZADO.unpack_from(datos, 0)
+    contenido = datos[ENCABEZADO.size:ENCABEZADO.size + largo]
+    if tipo != MODO or len(contenido) < largo or zlib.crc32(contenido) != crc:
+        return None
+    return contenido.decode('utf-8')
+
+
+def mismo_orden(almacen, otro):
+    # enlazada y circular atienden en orden de llegada; triaje por prioridad
+    return (almacen == 'triaje') == (otro == 'triaje')
+
+
+def recuperar_controlador(directorio, diario=True, ventana_historial=1000, **opciones_controlador):
+    # Reconstruye el controlador con la última instantánea más los diarios
+    # posteriores y, si `diario` es verdadero, le conecta un diario. Sin
+    # diario no se escribe nada: el historial de atendidos, que vive en
+    # `directorio`/historial, se abre en solo lectura.
+    # Sin `almacen` se usa el guardado en los datos; si se pide uno con otro
+    # orden de atención se rechaza, porque las atenciones del diario no se
+    # podrían reproducir sobre él.
+    generacion_cubierta = 0
+    en_disco = 0
+    datos = None
+    almacen_guardado = None
+
+    ruta = os.path.join(directorio, 'instantanea.bin')
+    if os.path.exists(ruta):
+        with open(ruta, 'rb') as archivo:
+            datos = archivo.read()
+        _, version, generacion_cubierta, total, en_cola, cantidad_atendidos, en_disco, almacen_guardado = \
+            _leer_encabezado_instantanea(datos, ruta)
+        tamano_encabezado = ENCABEZADO_INSTANTANEA.size if version == VERSION_INSTANTANEA \
+            else ENCABEZADO_INSTANTANEA_V2.size
+
+    diarios = []
+    if os.path.isdir(directorio):
+        diarios = [os.path.join(directorio, nombre) for nombre in sorted(os.listdir(directorio))
+                   if nombre.startswith('diario.') and nombre.endswith('.log')
+                   and int(nombre.split('.')[1]) > generacion_cubierta]
+    for ruta_diario in diarios:
+        almacen_diario = leer_almacen_diario(ruta_diario)
+        if almacen_diario is None:
+            continue
+        if almacen_guardado is not None and not mismo_orden(almacen_guardado, almacen_diario):
+            raise ValueError(f"Datos inconsistentes en {directorio}: '{almacen_guardado}' "
+                             f"y '{almacen_diario}' en {os.path.basename(ruta_diario)}")
+        almacen_guardado = almacen_guardado or almacen_diario
+
+    opciones_controlador = dict(opciones_controlador)
+    almacen = opciones_controlador.get('almacen')
+    if opciones_controlador.get('concurrente'):
+        almacen = 'enlazada'  # La cola concurrente es FIFO
+    if almacen is None:
+        almacen = almacen_guardado or 'enlazada'
+        opciones_controlador['almacen'] = almacen
+    if almacen_guardado is not None and not mismo_orden(almacen, almacen_guardado):
+        raise ValueError(f"Los datos de {directorio} se guardaron con almacenamiento "
+                         f"'{almacen_guardado}' y no se pueden recuperar como '{almacen}'")
+
+    historial = HistorialAtendidos(os.path.join(directorio, 'historial'), ventana=ventana_historial,
+                                   en_disco=en_disco, solo_lectura=not diario)
+    controlador = ControladorTurnos(historial=historial, **opciones_controlador)
+
+    if datos is not None:
+        inicio = tamano_encabezado
+        pacientes = []
+        for _ in range(en_cola):
+            paciente, inicio = decodificar_paciente(datos, inicio)
+            pacientes.append(paciente)
+        controlador.cola.encolar_lote(pacientes)
+        for _ in range(cantidad_atendidos):
+            paciente, inicio = decodificar_paciente(datos, inicio)
+            controlador.pacientes_atendidos.append(paciente)
+        controlador.total_pacientes_atendidos = total
+
+    reproducidos = sum(_reproducir_diario(controlador, ruta_diario) for ruta_diario in diarios)
+
+    # Los tiempos aprendidos se reconstruyen con las atenciones recientes
+    if controlador.predictor is not None:
+        controlador.predictor.entrenar(controlador.pacientes_atendidos.obtener_recientes())
+
+    if diario:
+        controlador.diario = DiarioTurnos(directorio, controlador.almacen)
+        controlador.diario.contar_reproducidos(reproducidos)
+    return controlador
+
+
+def _reproducir_diario(controlador, ruta):
+    with open(ruta, 'rb') as archivo:
+        datos = archivo.read()
+
+    # Devuelve la cantidad de registros reproducidos
+    altas = []  # Las altas consecutivas se encolan juntas en un solo lote
+    cantidad = 0
+    for tipo, contenido, _ in _registros(datos):
+        cantidad += 1
+
+        if tipo == ALTA:
+            altas.append(decodificar_paciente(contenido)[0])
+            continue
+        if tipo == MODO:
+            continue  # Ya se validó al elegir el almacenamiento
+
+        controlador.cola.encolar_lote(altas)
+        altas = []
+        if tipo == ATENCION:
+            paciente = controlador.cola.desencolar()
+            if paciente is not None:
+                paciente.tiempo_atencion_actual = _a_momento(MOMENTO.unpack(contenido)[0])
+                controlador.pacientes_atendidos.append(paciente)
+                controlador.total_pacientes_atendidos += 1
+        elif tipo == LIMPIEZA:
+            controlador.cola.limpiar()
+
+    controlador.cola.encolar_lote(altas)
+    return cantidad
+
+
+def _registros(datos):
+    # (tipo, contenido, fin) de cada registro válido del diario
+    inicio = 0
+    while inicio + ENCABEZADO.size <= len(datos):
+        tipo, largo, crc = ENCABEZADO.unpack_from(datos, inicio)
+        contenido = datos[inicio + ENCABEZADO.size:inicio + ENCABEZADO.size + largo]
+        if len(contenido) < largo or zlib.crc32(contenido) != crc:
+            return  # Registro incompleto al final: escritura interrumpida
+        inicio += ENCABEZADO.size + largo
+        yield tipo, contenido, inicio
+
+
+def _a_segundos(momento):
+    return momento.timestamp() if momento is not None else math.nan
+
+
+def _a_momento(segundos):
+    return None if math.isnan(segundos) else datetime.datetime.fromtimestamp(segundos)
@@ -1,137 +1,279 @@
-try:
-    import graphviz
-    GRAPHVIZ_AVAILABLE = True
-except ImportError:
-    GRAPHVIZ_AVAILABLE = False
-    print("Graphviz no está instalado. Para instalarlo ejecute: pip install graphviz")
-
+import importlib
+import importlib.util
 import os
 import tempfile
-from models.cola import ColaPacientes
+from models.paciente import Paciente
+from utils.render_cache import RenderCache
+
+# Solo se comprueba que el paquete exista; se importa en el primer render
+GRAPHVIZ_AVAILABLE = importlib.util.find_spec('graphviz') is not None
+_graphviz = None
+
+
+def load_graphviz():
+    global _graphviz
+    if _graphviz is None:
+        _graphviz = importlib.import_module('graphviz')
+    return _graphviz
 
 
 class GraphvizGenerator:
-    def __init__(self):
+    SPECIALTY_COLORS = {
+        'Medicina General': 'lightgreen',
+        'Pediatría': 'lightcoral',
+        'Ginecología': 'lightpink',
+        'Dermatología': 'lightyellow'
+    }
+
+    def __init__(self, cache_size=32, detail_limit=25):
         self.available = GRAPHVIZ_AVAILABLE
+        # Pacientes dibujados con todo su detalle; el resto se agrupa
+        self.detail_limit = detail_limit
         self.output_dir = tempfile.gettempdir()
+        self.cache = RenderCache(os.path.join(self.output_dir, 'graphviz_cache'), cache_size)
+        self._executable_found = None if self.available else False
 
     def is_available(self):
         return self.available
 
-    def generate_queue_graph(self, patients_list, filename='queue_visualization'):
+    def has_executable(self):
+        # El paquete de Python no trae el binario `dot`; se comprueba una vez
+        if self._executable_found is None:
+            try:
+                load_graphviz().version()
+                self._executable_found = True
+            except Exception:
+                self._executable_found = False
+        return self.available and self._executable_found
+
+    def generate_queue_graph(self, patients_list, filename='queue_visualization',
+                             total_patients=None, specialty_counts=None,
+                             total_time=None, specialty_minutes=None):
         if not self.available:
             return False, "", "Graphviz no está disponible"
 
         try:
-            dot = graphviz.Digraph(comment='Cola de Pacientes')
-            dot.attr(rankdir='TB')
-            dot.attr('node', shape='box', style='filled')
-            dot.attr('graph', bgcolor='white')
-
-            if not patients_list:
-                dot.node('empty', 'COLA VACÍA\\n\\nNo hay pacientes\\nen espera',
-                         fillcolor='lightgray', fontcolor='black')
-                dot.node('info', 'Estado: Sin pacientes\\nTiempo total: 0 min',
-                         shape='note', fillcolor='lightyellow')
-            else:
-                header_text = f'SISTEMA DE TURNOS MÉDICOS\\n'
-                header_text += f'Pacientes en cola: {len(patients_list)}\\n'
-                header_text += f'Tiempo total estimado: {sum(p.obtener_tiempo_atencion() for p in patients_list)} min'
-
-                dot.node('header', header_text, shape='box', fillcolor='lightblue',
-                         fontsize='12', fontcolor='black')
-
-                for i, patient in enumerate(patients_list):
-                    node_id = f'patient_{i}'
-
-                    colors = {
-                        'Medicina General': 'lightgreen',
-                        'Pediatría': 'lightcoral',
-                        'Ginecología': 'lightpink',
-                        'Dermatología': 'lightyellow'
-                    }
-                    color = colors.get(patient.especialidad, 'lightgray')
-
-                    label = f'Posición: {i+1}\\n'
-                    label += f'Nombre: {patient.nombre}\\n'
-                    label += f'Edad: {patient.edad} años\\n'
-                    label += f'Especialidad: {patient.especialidad}\\n'
-                    label += f'Tiempo atención: {patient.tiempo_atencion} min\\n'
-                    label += f'Tiempo espera: {patient.tiempo_espera_estimado} min\\n'
-                    label += f'Tiempo total: {patient.obtener_tiempo_total_estimado()} min'
-
-                    dot.node(node_id, label, fillcolor=color, fontsize='10')
-
-                    if i == 0:
-                        dot.edge('header', node_id, label='PRÓXIMO')
-                    else:
-                        dot.edge(f'patient_{i-1}', node_id, style='dashed')
-
-            filepath = os.path.join(self.output_dir, filename)
-            dot.render(filepath, format='png', cleanup=True)
-            png_filepath = f"{filepath}.png"
+            dot = self.build_queue_dot(patients_list, total_patients, specialty_counts,
+                                       total_time, specialty_minutes)
+            png_filepath, cached = self._render_cached(dot, filename)
+            if cached:
+                return True, png_filepath, f"Gráfico sin cambios (caché): {png_filepath}"
 
             return True, png_filepath, f"Gráfico generado exitosamente en: {png_filepath}"
 
         except Exception as e:
             return False, "", f"Error al generar gráfico: {str(e)}"
 
-    def generate_statistics_graph(self, specialty_stats, filename='specialty_stats'):
-
+    def generate_queue_image(self, patients_list, total_patients=None, specialty_counts=None,
+                             total_time=None, specialty_minutes=None):
+        # Igual que generate_queue_graph pero sin archivos: devuelve los bytes PNG
         if not self.available:
-            return False, "", "Graphviz no está disponible"
+            return False, b"", "Graphviz no está disponible"
 
         try:
-            dot = graphviz.Digraph(comment='Estadísticas por Especialidad')
-            dot.attr(rankdir='TB')
-            dot.attr('node', shape='box', style='filled')
-
-            dot.node('title', 'ESTADÍSTICAS POR ESPECIALIDAD',
-                     shape='box', fillcolor='lightblue', fontsize='14')
-
-            for specialty, count in specialty_stats.items():
-                node_id = specialty.lower().replace(' ', '_').replace('í', 'i').replace('ó', 'o')
-                label = f'{specialty}\\nPacientes: {count}'
-
-                if count == 0:
-                    color = 'lightgray'
-                elif count <= 2:
-                    color = 'lightgreen'
-                elif count <= 4:
-                    color = 'lightyellow'
+            dot = self.build_queue_dot(patients_list, total_patients, specialty_counts,
+                                       total_time, specialty_minutes)
+            png_bytes, cached = self._pipe_cached(dot)
+            return True, png_bytes, "Gráfico sin cambios (caché)" if cached else "Gráfico generado en memoria"
+
+        except Exception as e:
+            return False, b"", f"Error al generar gráfico: {str(e)}"
+
+    def build_queue_dot(self, patients_list, total_patients=None, specialty_counts=None,
+                        total_time=None, specialty_minutes=None):
+        # Solo los primeros `detail_limit` pacientes se dibujan completos; el
+        # resto de la cola se agrupa en un nodo por especialidad, así el número
+        # de nodos no depende del tamaño de la cola. `patients_list` puede ser
+        # solo el inicio de la cola si se pasan los totales de la cola entera.
+        # `total_time` y `specialty_minutes` (minutos por paciente) vienen del
+        # controlador, que puede usar tiempos aprendidos; sin ellos se usa la
+        # tabla fija.
+        detailed = patients_list[:self.detail_limit]
+        if total_patients is None:
+            total_patients = len(patients_list)
+        if specialty_counts is None:
+            specialty_counts = {}
+            for patient in patients_list:
+                specialty_counts[patient.especialidad] = specialty_counts.get(patient.especialidad, 0) + 1
+
+        if specialty_minutes is None:
+            specialty_minutes = Paciente.TIEMPOS_ESPECIALIDAD
+        if total_time is None:
+            total_time = sum(count * specialty_minutes.get(specialty, 10)
+                             for specialty, count in specialty_counts.items())
+
+        dot = load_graphviz().Digraph(comment='Cola de Pacientes')
+        dot.attr(rankdir='TB')
+        dot.attr('node', shape='box', style='filled')
+        dot.attr('graph', bgcolor='white')
+
+        if total_patients == 0:
+            dot.node('empty', 'COLA VACÍA\\n\\nNo hay pacientes\\nen espera',
+                     fillcolor='lightgray', fontcolor='black')
+            dot.node('info', 'Estado: Sin pacientes\\nTiempo total: 0 min',
+                     shape='note', fillcolor='lightyellow')
+        else:
+            header_text = f'SISTEMA DE TURNOS MÉDICOS\\n'
+            header_text += f'Pacientes en cola: {total_patients}\\n'
+            header_text += f'Tiempo total estimado: {round(total_time)} min'
+
+            dot.node('header', header_text, shape='box', fillcolor='lightblue',
+                     fontsize='12', fontcolor='black')
+
+            shown_counts = {}
+            for i, patient in enumerate(detailed):
+                node_id = f'patient_{i}'
+                shown_counts[patient.especialidad] = shown_counts.get(patient.especialidad, 0) + 1
+                color = self.SPECIALTY_COLORS.get(patient.especialidad, 'lightgray')
+
+                label = f'Posición: {i+1}\\n'
+                label += f'Nombre: {patient.nombre}\\n'
+                label += f'Edad: {patient.edad} años\\n'
+                label += f'Especialidad: {patient.especialidad}\\n'
+                attention = round(specialty_minutes.get(patient.especialidad, patient.tiempo_atencion))
+                label += f'Tiempo atención: {attention} min\\n'
+                label += f'Tiempo espera: {patient.tiempo_espera_estimado} min\\n'
+                label += f'Tiempo total: {patient.tiempo_espera_estimado + attention} min'
+
+                dot.node(node_id, label, fillcolor=color, fontsize='10')
+
+                if i == 0:
+                    dot.edge('header', node_id, label='PRÓXIMO')
                 else:
-                    color = 'lightcoral'
+                    dot.edge(f'patient_{i-1}', node_id, style='dashed')
+
+            remaining = total_patients - len(detailed)
+            if remaining > 0:
+                self._add_remaining_summary(dot, len(detailed), remaining,
+                                            specialty_counts, shown_counts, specialty_minutes)
+
+        return dot
 
-                dot.node(node_id, label, fillcolor=color)
-                dot.edge('title', node_id, style='dotted')
+    def _add_remaining_summary(self, dot, detailed_count, remaining, specialty_counts, shown_counts,
+                               specialty_minutes):
+        remaining_time = 0
+        groups = []
+        for specialty, count in specialty_counts.items():
+            pending = count - shown_counts.get(specialty, 0)
+            if pending > 0:
+                minutes = round(pending * specialty_minutes.get(specialty, 10))
+                remaining_time += minutes
+                groups.append((specialty, pending, minutes))
 
-            filepath = os.path.join(self.output_dir, filename)
-            dot.render(filepath, format='png', cleanup=True)
-            png_filepath = f"{filepath}.png"
+        dot.node('remaining', f'... y {remaining} pacientes más\\nTiempo: {remaining_time} min',
+                 shape='box', style='filled,dashed', fillcolor='white', fontsize='11')
+        previous = f'patient_{detailed_count - 1}' if detailed_count else 'header'
+        dot.edge(previous, 'remaining', style='dashed')
+
+        with dot.subgraph(name='cluster_remaining') as cluster:
+            cluster.attr(label='Resto de la cola por especialidad', style='dashed', color='gray')
+            for i, (specialty, pending, minutes) in enumerate(groups):
+                node_id = f'remaining_{i}'
+                cluster.node(node_id, f'{specialty}\\nPacientes: {pending}\\nTiempo: {minutes} min',
+                             shape='folder', fillcolor=self.SPECIALTY_COLORS.get(specialty, 'lightgray'),
+                             fontsize='10')
+
+        for i in range(len(groups)):
+            dot.edge('remaining', f'remaining_{i}', style='dotted')
+
+    def generate_statistics_graph(self, specialty_stats, filename='specialty_stats'):
+
+        if not self.available:
+            return False, "", "Graphviz no está disponible"
+
+        try:
+            dot = self.build_statistics_dot(specialty_stats)
+            png_filepath, cached = self._render_cached(dot, filename)
+            if cached:
+                return True, png_filepath, f"Gráfico de estadísticas sin cambios (caché): {png_filepath}"
 
             return True, png_filepath, f"Gráfico de estadísticas generado en: {png_filepath}"
 
         except Exception as e:
             return False, "", f"Error al generar gráfico de estadísticas: {str(e)}"
 
-    def generate_simple_queue_representation(self, patients_list):
+    def generate_statistics_image(self, specialty_stats):
+        if not self.available:
+            return False, b"", "Graphviz no está disponible"
+
+        try:
+            png_bytes, cached = self._pipe_cached(self.build_statistics_dot(specialty_stats))
+            return True, png_bytes, ("Gráfico de estadísticas sin cambios (caché)" if cached
+                                     else "Gráfico de estadísticas generado en memoria")
+
+        except Exception as e:
+            return False, b"", f"Error al generar gráfico de estadísticas: {str(e)}"
+
+    def build_statistics_dot(self, specialty_stats):
+        dot = load_graphviz().Digraph(comment='Estadísticas por Especialidad')
+        dot.attr(rankdir='TB')
+        dot.attr('node', shape='box', style='filled')
+
+        dot.node('title', 'ESTADÍSTICAS POR ESPECIALIDAD',
+                 shape='box', fillcolor='lightblue', fontsize='14')
+
+        for specialty, count in specialty_stats.items():
+            node_id = specialty.lower().replace(' ', '_').replace('í', 'i').replace('ó', 'o')
+            label = f'{specialty}\\nPacientes: {count}'
+
+            if count == 0:
+                color = 'lightgray'
+            elif count <= 2:
+                color = 'lightgreen'
+            elif count <= 4:
+                color = 'lightyellow'
+            else:
+                color = 'lightcoral'
+
+            dot.node(node_id, label, fillcolor=color)
+            dot.edge('title', node_id, style='dotted')
+
+        return dot
+
+    def _render_cached(self, dot, filename):
+        # Si el código DOT ya se renderizó se reutiliza la imagen sin llamar a dot
+        key = RenderCache.make_key(dot.source, 'png')
+        png_filepath = self.cache.get(key)
+        if png_filepath is not None:
+            return png_filepath, True
+
+        filepath = self.cache.path_for(key, filename)
+        dot.render(filepath, format='png', cleanup=True)
+        png_filepath = f"{filepath}.png"
+        self.cache.put(key, png_filepath)
+        return png_filepath, False
+
+    def _pipe_cached(self, dot):
+        # dot recibe el código por stdin y devuelve el PNG por stdout:
+        # no se escriben archivos temporales. La llave es distinta a la de
+        # _render_cached porque aquí se guardan bytes y allá una ruta.
+        key = RenderCache.make_key(dot.source, 'png-bytes')
+        png_bytes = self.cache.get(key)
+        if png_bytes is not None:
+            return png_bytes, True
+
+        png_bytes = dot.pipe(format='png')
+        self.cache.put(key, png_bytes)
+        return png_bytes, False
+
+    def get_cache_stats(self):
+        return self.cache.get_stats()
+
+    def generate_simple_queue_representation(self, patients_list, total_time=None):
         if not patients_list:
             return "COLA VACÍA: [ ]"
 
-        representation = "COLA DE TURNOS: "
-        representation += "[ "
-        for i, patient in enumerate(patients_list):
-            if i > 0:
-                representation += " -> "
-            representation += f"{patient.nombre}({patient.especialidad})"
-        representation += " ]"
-        representation += f"\nTotal: {len(patients_list)} pacientes"
-        representation += f" | Tiempo total: {sum(p.obtener_tiempo_atencion() for p in patients_list)} min"
-
-        return representation
+        # Se arma con join: concatenar con += copia el texto en cada paciente
+        nodes = " -> ".join(f"{patient.nombre}({patient.especialidad})" for patient in patients_list)
+        if total_time is None:
+            total_time = sum(p.obtener_tiempo_atencion() for p in patients_list)
+        return (f"COLA DE TURNOS: [ {nodes} ]"
+                f"\nTotal: {len(patients_list)} pacientes | Tiempo total: {round(total_time)} min")
 
     def set_output_directory(self, directory):
         if os.path.exists(directory) and os.path.isdir(directory):
             self.output_dir = directory
+            self.cache.clear()
+            self.cache.directory = os.path.join(directory, 'graphviz_cache')
             return True
         return False
@@ -0,0 +1,150 @@
+import csv
+import itertools
+import json
+import os
+
+
+class FilaInvalida:
+    # Marca una fila que no se pudo leer: el importador la cuenta como
+    # rechazada y sigue con las demás
+    __slots__ = ('mensaje',)
+
+    def __init__(self, mensaje):
+        self.mensaje = mensaje
+
+
+def leer_csv(ruta):
+    # Lee fila por fila; se esperan las columnas nombre, edad, especialidad y opcionalmente prioridad
+    with open(ruta, newline='', encoding='utf-8') as archivo:
+        for fila in csv.DictReader(archivo):
+            yield _normalizar_fila(fila)
+
+
+def leer_json(ruta):
+    # Los archivos .jsonl (un paciente por línea) se leen sin cargarlos completos;
+    # un .json debe contener una lista de pacientes
+    with open(ruta, encoding='utf-8') as archivo:
+        if ruta.lower().endswith('.jsonl'):
+            for linea in archivo:
+                if linea.strip():
+                    try:
+                        fila = json.loads(linea)
+                    except ValueError as e:
+                        yield FilaInvalida(f"JSON no válido: {str(e)}")
+                        continue
+                    yield _normalizar_fila(fila)
+        else:
+            filas = json.load(archivo)
+            if not isinstance(filas, list):
+                raise ValueError("El archivo .json debe contener una lista de pacientes")
+            for fila in filas:
+                yield _normalizar_fila(fila)
+
+
+def leer_archivo(ruta):
+    extension = os.path.splitext(ruta)[1].lower()
+    if extension == '.csv':
+        return leer_csv(ruta)
+    if extension in ('.json', '.jsonl'):
+        return leer_json(ruta)
+    raise ValueError(f"Formato no soportado: {extension}. Use .csv, .json o .jsonl")
+
+
+def importar_pacientes(controlador, ruta, tamano_lote=1000):
+    # Envía el archivo al controlador por bloques para no cargarlo completo.
+    # Las filas ilegibles se informan como errores de fila; si el archivo
+    # completo falla a mitad, lo ya registrado queda en la cola y se informa.
+    registrados = 0
+    errores = []  # (número de fila, mensaje)
+    try:
+        filas = leer_archivo(ruta)
+        numero_fila = 0
+
+        while True:
+            bloque = list(itertools.islice(filas, tamano_lote))
+            if not bloque:
+                break
+
+            lote = []
+            numeros = []
+            for fila in bloque:
+                numero_fila += 1
+                if isinstance(fila, FilaInvalida):
+                    errores.append((numero_fila, fila.mensaje))
+                else:
+                    lote.append(fila)
+                    numeros.append(numero_fila)
+
+            for numero, (exito, mensaje) in zip(numeros, controlador.registrar_pacientes_lote(lote)):
+                if exito:
+                    registrados += 1
+                else:
+                    errores.append((numero, mensaje))
+
+        errores.sort()
+        mensaje = f"Importación completada: {registrados} registrados, {len(errores)} rechazados"
+        return True, mensaje, errores
+
+    except Exception as e:
+        errores.sort()
+        return False, (f"Error al importar pacientes: {str(e)}. "
+                       f"Se registraron {registrados} antes del error"), errores
+
+
+def exportar_pacientes(controlador, ruta):
+    # Escribe la cola en orden de atención, recorriéndola sin copiarla. El
+    # archivo se puede volver a importar (las columnas extra se ignoran).
+    columnas = ['posicion', 'nombre', 'edad', 'especialidad', 'prioridad',
+                'tiempo_atencion', 'tiempo_espera_estimado']
+    extension = os.path.splitext(ruta)[1].lower()
+    if extension not in ('.csv', '.json', '.jsonl'):
+        return False, f"Formato no soportado: {extension}. Use .csv, .json o .jsonl"
+    try:
+        filas = ({'posicion': posicion, **paciente.a_diccionario()}
+                 for posicion, paciente in enumerate(controlador.iterar_pacientes(), 1))
+        cantidad = 0
+        with open(ruta, 'w', newline='', encoding='utf-8') as archivo:
+            if extension == '.csv':
+                escritor = csv.DictWriter(archivo, fieldnames=columnas)
+                escritor.writeheader()
+                for fila in filas:
+                    escritor.writerow(fila)
+                    cantidad += 1
+            elif extension == '.jsonl':
+                for fila in filas:
+                    archivo.write(json.dumps(fila, ensure_ascii=False) + '\n')
+                    cantidad += 1
+            else:
+                lista = list(filas)
+                json.dump(lista, archivo, ensure_ascii=False, indent=2)
+                cantidad = len(lista)
+        return True, f"Exportación completada: {cantidad} pacientes en {ruta}"
+
+    except Exception as e:
+        return False, f"Error al exportar pacientes: {str(e)}"
+
+
+def _normalizar_fila(fila):
+    if not isinstance(fila, dict):
+        return FilaInvalida(f"Se esperaba un objeto, se recibió {type(fila).__name__}")
+    return {
+        'nombre': _sin_espacios(fila.get('nombre')),
+        'edad': _a_entero(fila.get('edad')),
+        'especialidad': _sin_espacios(fila.get('especialidad') or ''),
+        'prioridad': _a_entero(fila.get('prioridad') or None)  # Columna opcional
+    }
+
+
+def _sin_espacios(valor):
+    # En JSON un campo puede traer un número o una lista: se deja tal cual
+    # para que la validación rechace esa fila sin detener la importación
+    return valor.strip() if isinstance(valor, str) else valor
+
+
+def _a_entero(valor):
+    if isinstance(valor, str):
+        try:
+            return int(valor.strip())
+        except ValueError:
+            pass  # Se deja tal cual para que la validación la rechace
+    return valor
@@ -0,0 +1,113 @@
+import bisect
+import functools
+import os
+import threading
+import time
+
+# Límites superiores de los buckets en segundos (como los de Prometheus)
+LIMITES = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+           0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+METODOS_CONTROLADOR = ('registrar_paciente', 'registrar_pacientes_lote', 'atender_paciente',
+                       'ver_siguiente_paciente', 'obtener_estado_cola', 'obtener_posicion_paciente',
+                       'obtener_lista_pacientes', 'limpiar_turnos', 'obtener_estadisticas_especialidad')
+METODOS_GRAPHVIZ = ('generate_queue_graph', 'generate_queue_image',
+                    'generate_statistics_graph', 'generate_statistics_image')
+
+
+class HistogramaLatencia:
+    # Conteo por bucket fijo: registrar una medición es una búsqueda binaria
+    # sobre 16 límites y tres sumas, sin guardar las muestras
+    def __init__(self):
+        self.conteos = [0] * (len(LIMITES) + 1)  # El último es +Inf
+        self.cantidad = 0
+        self.suma = 0.0
+        self._candado = threading.Lock()
+
+    def observar(self, segundos):
+        indice = bisect.bisect_left(LIMITES, segundos)
+        with self._candado:
+            self.conteos[indice] += 1
+            self.cantidad += 1
+            self.suma += segundos
+
+    def percentil(self, fraccion):
+        # Interpolación lineal dentro del bucket, como histogram_quantile
+        if self.cantidad == 0:
+            return 0.0
+        objetivo = fraccion * self.cantidad
+        acumulado = 0
+        for indice, conteo in enumerate(self.conteos):
+            if conteo and acumulado + conteo >= objetivo:
+                if indice == len(LIMITES):
+                    return LIMITES[-1]
+                inferior = LIMITES[indice - 1] if indice else 0.0
+                return inferior + (LIMITES[indice] - inferior) * (objetivo - acumulado) / conteo
+            acumulado += conteo
+        return LIMITES[-1]
+
+    def promedio(self):
+        return self.suma / self.cantidad if self.cantidad else 0.0
+
+
+class RegistroMetricas:
+    # Un histograma por operación ("controlador.atender_paciente", ...)
+    NOMBRE = 'turnos_operacion_segundos'
+
+    def __init__(self):
+        self.histogramas = {}
+        self._candado = threading.Lock()
+
+    def histograma(self, operacion):
+        with self._candado:
+            if operacion not in self.histogramas:
+                self.histogramas[operacion] = HistogramaLatencia()
+            return self.histogramas[operacion]
+
+    def instrumentar(self, objeto, metodos, prefijo):
+        # Reemplaza los métodos solo en esta instancia: sin instrumentar no
+        # hay ningún costo extra
+        for nombre in metodos:
+            original = getattr(objeto, nombre)
+            setattr(objeto, nombre, _medido(original, self.histograma(f"{prefijo}.{nombre}")))
+
+    def resumen(self):
+        # [(operación, cantidad, promedio, p50, p99)] en segundos
+        return [(operacion, histograma.cantidad, histograma.promedio(),
+                 histograma.percentil(0.5), histograma.percentil(0.99))
+                for operacion, histograma in sorted(self.histogramas.items())
+                if histograma.cantidad]
+
+    def exportar_prometheus(self):
+        lineas = [f"# HELP {self.NOMBRE} Latencia de las operaciones de turnos en segundos",
+                  f"# TYPE {self.NOMBRE} histogram"]
+        for operacion, histograma in sorted(self.histogramas.items()):
+            with histograma._candado:
+                conteos = list(histograma.conteos)
+                cantidad, suma = histograma.cantidad, histograma.suma
+            etiqueta = f'operacion="{operacion}"'
+            acumulado = 0
+            for limite, conteo in zip(LIMITES + ('+Inf',), conteos):
+                acumulado += conteo
+                lineas.append(f'{self.NOMBRE}_bucket{{{etiqueta},le="{limite}"}} {acumulado}')
+            lineas.append(f"{self.NOMBRE}_sum{{{etiqueta}}} {suma}")
+            lineas.append(f"{self.NOMBRE}_count{{{etiqueta}}} {cantidad}")
+        return "\n".join(lineas) + "\n"
+
+    def escribir_prometheus(self, ruta):
+        # Reemplazo atómico, para el textfile collector de node_exporter
+        temporal = ruta + '.tmp'
+        with open(temporal, 'w', encoding='utf-8') as archivo:
+            archivo.write(self.exportar_prometheus())
+        os.replace(temporal, ruta)
+
+
+def _medido(funcion, histograma):
+    @functools.wraps(funcion)
+    def envoltura(*argumentos, **opciones):
+        inicio = time.perf_counter()
+        try:
+            return funcion(*argumentos, **opciones)
+        finally:
+            histograma.observar(time.perf_counter() - inicio)
+    return envoltura
@@ -0,0 +1,151 @@
+import cProfile
+import datetime
+import functools
+import io
+import os
+import pstats
+import threading
+import tracemalloc
+
+TOP_ASIGNACIONES = 25
+MARCOS_TRACEMALLOC = 10
+
+
+class SesionPerfilado:
+    # Perfila las próximas `llamadas` invocaciones de los métodos envueltos
+    # con cProfile y toma una instantánea de tracemalloc antes y otra
+    # después. Los envoltorios se ponen al iniciar y se quitan al terminar,
+    # así que fuera de una sesión no hay ningún costo.
+    def __init__(self, directorio, llamadas=50, al_terminar=None):
+        self.directorio = directorio
+        self.llamadas = llamadas
+        self.al_terminar = al_terminar
+        self.restantes = 0
+        self.activa = False
+        self._perfil = None
+        self._antes = None
+        self._inicio_propio = False
+        self._profundidad = 0
+        self._hilo = None
+        self._originales = []
+        self._candado = threading.Lock()
+
+    def iniciar(self, objetivos):
+        # objetivos: [(objeto, métodos)]
+        if self.activa:
+            return False, "Ya hay una sesión de perfilado activa"
+        try:
+            os.makedirs(self.directorio, exist_ok=True)
+            # Si tracemalloc ya estaba activo (p. ej. desde el arranque) la
+            # primera instantánea incluye todo el estado cargado
+            self._inicio_propio = not tracemalloc.is_tracing()
+            if self._inicio_propio:
+                tracemalloc.start(MARCOS_TRACEMALLOC)
+            self._antes = tracemalloc.take_snapshot()
+
+            for objeto, metodos in objetivos:
+                for nombre in metodos:
+                    anterior = objeto.__dict__.get(nombre)
+                    self._originales.append((objeto, nombre, anterior))
+                    setattr(objeto, nombre, self._envolver(getattr(objeto, nombre)))
+
+            self._perfil = cProfile.Profile()
+            self._hilo = threading.get_ident()
+            self.restantes = self.llamadas
+            self.activa = True
+            return True, f"Perfilando las próximas {self.llamadas} llamadas"
+        except Exception as e:
+            self._restaurar()
+            return False, f"Error al iniciar el perfilado: {str(e)}"
+
+    def _envolver(self, funcion):
+        @functools.wraps(funcion)
+        def envoltura(*argumentos, **opciones):
+            # Solo se cuentan las llamadas externas del hilo que inició la
+            # sesión: update_display llama al controlador y eso es una sola
+            if not self.activa or threading.get_ident() != self._hilo:
+                return funcion(*argumentos, **opciones)
+            self._profundidad += 1
+            if self._profundidad == 1:
+                self._perfil.enable()
+            try:
+                return funcion(*argumentos, **opciones)
+            finally:
+                self._profundidad -= 1
+                if self._profundidad == 0:
+                    self._perfil.disable()
+                    self.restantes -= 1
+                    if self.restantes <= 0:
+                        self.terminar()
+        return envoltura
+
+    def terminar(self):
+        # Escribe los reportes; devuelve (éxito, mensaje, rutas)
+        with self._candado:
+            if not self.activa:
+                return False, "No hay una sesión de perfilado activa", []
+            self.activa = False
+        self._restaurar()
+
+        try:
+            despues = tracemalloc.take_snapshot()
+            if self._inicio_propio:
+                tracemalloc.stop()
+
+            marca = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+            base = os.path.join(self.directorio, f"perfil-{marca}")
+            rutas = [base + '.pstats', base + '-antes.tracemalloc',
+                     base + '-despues.tracemalloc', base + '.txt']
+
+            self._perfil.dump_stats(rutas[0])
+            # Las instantáneas se guardan para compararlas después con
+            # tracemalloc.Snapshot.load(...).compare_to(...)
+            self._antes.dump(rutas[1])
+            despues.dump(rutas[2])
+            with open(rutas[3], 'w', encoding='utf-8') as archivo:
+                archivo.write(self._informe(despues))
+
+            llamadas = self.llamadas - max(self.restantes, 0)
+            mensaje = f"Perfilado terminado ({llamadas} llamadas). Reportes en {self.directorio}"
+            resultado = (True, mensaje, rutas)
+        except Exception as e:
+            resultado = (False, f"Error al escribir el perfilado: {str(e)}", [])
+        finally:
+            self._perfil = None
+            self._antes = None
+
+        if self.al_terminar is not None:
+            self.al_terminar(*resultado)
+        return resultado
+
+    def _restaurar(self):
+        # Vuelve a dejar cada método como estaba (incluidos los envoltorios
+        # de métricas, que viven en la instancia)
+        for objeto, nombre, anterior in reversed(self._originales):
+            if anterior is None:
+                objeto.__dict__.pop(nombre, None)
+            else:
+                setattr(objeto, nombre, anterior)
+        self._originales = []
+        self._profundidad = 0
+
+    def _informe(self, despues):
+        salida = io.StringIO()
+        salida.write("== Funciones por tiempo acumulado ==\n")
+        estadisticas = pstats.Stats(self._perfil, stream=salida)
+        estadisticas.sort_stats('cumulative').print_stats(TOP_ASIGNACIONES)
+
+        filtros = [tracemalloc.Filter(False, tracemalloc.__file__),
+                   tracemalloc.Filter(False, __file__),
+                   tracemalloc.Filter(False, "<frozen importlib._bootstrap*>")]
+        antes = self._antes.filter_traces(filtros)
+        despues = despues.filter_traces(filtros)
+
+        salida.write(f"\n== Crecimiento de memoria (top {TOP_ASIGNACIONES}) ==\n")
+        for diferencia in despues.compare_to(antes, 'lineno')[:TOP_ASIGNACIONES]:
+            salida.write(f"{diferencia}\n")
+
+        salida.write(f"\n== Asignaciones vivas al terminar (top {TOP_ASIGNACIONES}) ==\n")
+        for estadistica in despues.statistics('lineno')[:TOP_ASIGNACIONES]:
+            salida.write(f"{estadistica}\n")
+        return salida.getvalue()
@@ -0,0 +1,65 @@
+import collections
+import hashlib
+import os
+
+
+class RenderCache:
+    # Caché LRU de imágenes renderizadas, indexada por el hash del código DOT.
+    # Cada entrada es la ruta de una imagen en disco dentro de `directory` o
+    # directamente los bytes de la imagen en memoria. Al pasar de
+    # `max_entries` se descarta la más vieja (y se borra su archivo).
+    def __init__(self, directory, max_entries=32):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()  # clave -> ruta o bytes
+
+    @staticmethod
+    def make_key(source, image_format='png'):
+        return hashlib.sha256(f"{image_format}\n{source}".encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        value = self._entries.get(key)
+        if value is None or (isinstance(value, str) and not os.path.exists(value)):
+            self._entries.pop(key, None)
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def path_for(self, key, prefix='render'):
+        # Ruta base (sin extensión) donde se debe renderizar una clave nueva
+        os.makedirs(self.directory, exist_ok=True)
+        return os.path.join(self.directory, f"{prefix}_{key[:20]}")
+
+    def put(self, key, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_entries:
+            _, old_value = self._entries.popitem(last=False)
+            self._discard(old_value)
+
+    def clear(self):
+        for value in self._entries.values():
+            self._discard(value)
+        self._entries.clear()
+
+    def _discard(self, value):
+        if isinstance(value, str):
+            try:
+                os.remove(value)
+            except OSError:
+                pass
+
+    def get_stats(self):
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'entries': len(self._entries),
+            'hit_rate': self.hits / total if total else 0.0
+        }
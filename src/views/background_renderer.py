@@ -0,0 +1,70 @@
+import queue
+import threading
+
+
+class BackgroundRenderer:
+    # Ejecuta trabajos de renderizado en un hilo aparte. Cada trabajo tiene una
+    # clave: si llegan varios con la misma clave antes de procesarse, solo se
+    # ejecuta el más reciente. Los resultados vuelven al hilo de Tk con
+    # root.after y se descartan si ya se pidió un render más nuevo.
+    POLL_MS = 50
+
+    def __init__(self, root):
+        self.root = root
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._pending = {}   # clave -> (ticket, trabajo, callback)
+        self._latest = {}    # clave -> último ticket pedido
+        self._tickets = 0
+        self._results = queue.Queue()
+        self._stopped = False
+
+        self._thread = threading.Thread(target=self._worker_loop, daemon=True)
+        self._thread.start()
+        self.root.after(self.POLL_MS, self._deliver_results)
+
+    def submit(self, key, job, callback):
+        # `job` corre en el hilo de fondo (no debe tocar widgets);
+        # `callback(resultado)` corre en el hilo de Tk
+        with self._lock:
+            self._tickets += 1
+            self._latest[key] = self._tickets
+            self._pending[key] = (self._tickets, job, callback)
+        self._wakeup.set()
+
+    def stop(self):
+        self._stopped = True
+        self._wakeup.set()
+
+    def _worker_loop(self):
+        while not self._stopped:
+            self._wakeup.wait()
+            with self._lock:
+                pending = self._pending
+                self._pending = {}
+                self._wakeup.clear()
+
+            for key, (ticket, job, callback) in pending.items():
+                if self._stopped:
+                    return
+                if ticket != self._latest.get(key):
+                    continue  # Ya hay un pedido más nuevo para esta clave
+                try:
+                    result = job()
+                except Exception as e:
+                    result = e
+                self._results.put((key, ticket, callback, result))
+
+    def _deliver_results(self):
+        while True:
+            try:
+                key, ticket, callback, result = self._results.get_nowait()
+            except queue.Empty:
+                break
+            with self._lock:
+                stale = ticket != self._latest.get(key)
+            if not stale:
+                callback(result)
+
+        if not self._stopped:
+            self.root.after(self.POLL_MS, self._deliver_results)
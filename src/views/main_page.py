@@ -1,7 +1,12 @@
 import tkinter as tk
-from tkinter import ttk, messagebox, simpledialog
+from tkinter import ttk, messagebox, simpledialog, filedialog
 from controllers.turnos import ControladorTurnos
 from utils.graphviz_generator import GraphvizGenerator
+from utils.diario import recuperar_controlador
+from utils.metricas import RegistroMetricas, METODOS_CONTROLADOR, METODOS_GRAPHVIZ
+from utils.perfilado import SesionPerfilado
+from views.background_renderer import BackgroundRenderer
+import io
 import os
 import datetime
 
@@ -13,23 +18,274 @@ except ImportError:
     print("PIL no está instalado. Para instalarlo ejecute: pip install Pillow")
 
 
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'datos')
+
+# Espera tras un evento antes de redibujar, para agrupar ráfagas de cambios
+REDRAW_DEBOUNCE_MS = 150
+
+# Medición de latencias (opcional): TURNOS_METRICAS=1 escribe en
+# datos/metricas.prom, o TURNOS_METRICAS=<ruta> en esa ruta
+METRICS_ENV = 'TURNOS_METRICAS'
+METRICS_REFRESH_MS = 2000
+METODOS_VISTA = ('update_display', 'flush_redraw', 'render_queue_image', 'render_statistics_image')
+# Operaciones que se muestran en el pie de la ventana
+METRICS_FOOTER = ('controlador.registrar_paciente', 'controlador.atender_paciente',
+                  'vista.update_display', 'graphviz.generate_queue_image')
+
+# Perfilado bajo demanda (F12): cProfile y tracemalloc durante las próximas
+# llamadas de redibujo o al controlador
+PROFILE_SHORTCUT = "<F12>"
+PROFILE_CALLS = 20
+PROFILE_DIR = os.path.join(DATA_DIR, 'perfiles')
+METODOS_VISTA_PERFIL = ('update_display', 'flush_redraw')
+
+# Paleta por especialidad (los mismos colores que usa Graphviz)
+SPECIALTY_HEX_COLORS = {
+    'Medicina General': '#90EE90',      # lightgreen
+    'Pediatría': '#F08080',             # lightcoral
+    'Ginecología': '#FFB6C1',           # lightpink
+    'Dermatología': '#FFFFE0'           # lightyellow
+}
+
+
+class CanvasQueueRenderer:
+    # Dibuja la cola directamente en un tk.Canvas, sin Graphviz ni imágenes.
+    # Cada paciente visible es un grupo de items con su propia etiqueta; en
+    # cada actualización solo se crean, mueven, borran o reescriben los
+    # grupos que cambiaron, así que el costo depende del cambio y no del
+    # largo de la cola.
+    MARGIN = 10
+    HEADER_HEIGHT = 40
+    CARD_WIDTH = 460
+    CARD_HEIGHT = 48
+    CARD_GAP = 8
+
+    def __init__(self, canvas, detail_limit=25):
+        self.canvas = canvas
+        self.detail_limit = detail_limit
+        self.drawn = []  # [paciente, etiqueta, rectángulo, texto, contenido, es_primero]
+        self._next_tag = 0
+
+        self.header = canvas.create_text(self.MARGIN, self.MARGIN, anchor="nw",
+                                         font=('Segoe UI', 11, 'bold'),
+                                         fill="#2c3e50", text="")
+        self.summary = canvas.create_text(self.MARGIN, self._slot_y(0), anchor="nw",
+                                          font=('Segoe UI', 10, 'italic'),
+                                          fill="#666666", text="")
+
+    def _slot_y(self, index):
+        return self.MARGIN + self.HEADER_HEIGHT + index * (self.CARD_HEIGHT + self.CARD_GAP)
+
+    def _card_text(self, index, paciente):
+        texto = f"{index + 1}. {paciente.nombre} ({paciente.edad} años)\n"
+        texto += f"{paciente.especialidad} | Espera: {paciente.tiempo_espera_estimado} min"
+        texto += f" | Total: {paciente.obtener_tiempo_total_estimado()} min"
+        return texto
+
+    def _outline(self, es_primero):
+        # El próximo paciente se resalta con un borde más grueso
+        return ("#2c5aa0", 3) if es_primero else ("#7f8c8d", 1)
+
+    def _create_card(self, index, paciente, texto):
+        tag = f"paciente_{self._next_tag}"
+        self._next_tag += 1
+        y = self._slot_y(index)
+        color, ancho = self._outline(index == 0)
+        rect = self.canvas.create_rectangle(
+            self.MARGIN, y, self.MARGIN + self.CARD_WIDTH, y + self.CARD_HEIGHT,
+            fill=SPECIALTY_HEX_COLORS.get(paciente.especialidad, "#D3D3D3"),
+            outline=color, width=ancho, tags=(tag, "paciente"))
+        text_id = self.canvas.create_text(
+            self.MARGIN + 10, y + self.CARD_HEIGHT // 2, anchor="w",
+            font=('Segoe UI', 10), text=texto, tags=(tag, "paciente"))
+        return [paciente, tag, rect, text_id, texto, index == 0]
+
+    @staticmethod
+    def _key(paciente):
+        # El arreglo circular arma un Paciente nuevo en cada lectura: se
+        # identifica por su llegada y no por id()
+        return paciente.prioridad, paciente.secuencia, paciente.nombre
+
+    def update(self, pacientes, total_patients, total_time):
+        pacientes = pacientes[:self.detail_limit]
+        visibles = {self._key(paciente) for paciente in pacientes}
+
+        # Los que salieron de la vista (atendidos, limpiados o desplazados)
+        anteriores = {}
+        for index, entrada in enumerate(self.drawn):
+            if self._key(entrada[0]) in visibles:
+                anteriores[self._key(entrada[0])] = (index, entrada)
+            else:
+                self.canvas.delete(entrada[1])
+
+        # Al atender, todos los que quedan suben lo mismo: un solo move
+        desplazamientos = {}
+        for index, paciente in enumerate(pacientes):
+            previo = anteriores.get(self._key(paciente))
+            if previo is not None and previo[0] != index:
+                desplazamientos[previo[1][1]] = self._slot_y(index) - self._slot_y(previo[0])
+        if len(desplazamientos) == len(anteriores) and len(set(desplazamientos.values())) == 1:
+            self.canvas.move("paciente", 0, next(iter(desplazamientos.values())))
+        else:
+            for tag, dy in desplazamientos.items():
+                self.canvas.move(tag, 0, dy)
+
+        drawn = []
+        for index, paciente in enumerate(pacientes):
+            texto = self._card_text(index, paciente)
+            previo = anteriores.get(self._key(paciente))
+            if previo is None:
+                drawn.append(self._create_card(index, paciente, texto))
+                continue
+
+            entrada = previo[1]
+            if entrada[4] != texto:
+                self.canvas.itemconfigure(entrada[3], text=texto)
+                entrada[4] = texto
+            if entrada[5] != (index == 0):
+                color, ancho = self._outline(index == 0)
+                self.canvas.itemconfigure(entrada[2], outline=color, width=ancho)
+                entrada[5] = index == 0
+            drawn.append(entrada)
+        self.drawn = drawn
+
+        if total_patients == 0:
+            encabezado = "COLA VACÍA - No hay pacientes en espera"
+        else:
+            encabezado = f"Pacientes en cola: {total_patients} | Tiempo total estimado: {total_time} min"
+        self._set_text(self.header, encabezado)
+
+        restantes = total_patients - len(drawn)
+        self._set_text(self.summary, f"... y {restantes} pacientes más" if restantes > 0 else "")
+        self.canvas.coords(self.summary, self.MARGIN, self._slot_y(len(drawn)))
+        self.canvas.configure(scrollregion=(0, 0, self.MARGIN * 2 + self.CARD_WIDTH,
+                                            self._slot_y(len(drawn)) + self.HEADER_HEIGHT))
+
+    def _set_text(self, item, texto):
+        if self.canvas.itemcget(item, "text") != texto:
+            self.canvas.itemconfigure(item, text=texto)
+
+
+class VirtualPatientList:
+    # Treeview con un número fijo de filas que se reutilizan: la barra de
+    # desplazamiento representa la cola completa, pero al moverse solo se
+    # piden al controlador los pacientes visibles y se reescriben esas filas
+    COLUMNS = (
+        ('posicion', 'Pos.', 60),
+        ('nombre', 'Nombre', 180),
+        ('especialidad', 'Especialidad', 140),
+        ('espera', 'Espera (min)', 100),
+        ('total', 'Total (min)', 100)
+    )
+
+    def __init__(self, parent, fetch, count, rows=15):
+        self.fetch = fetch  # fetch(inicio, cantidad) -> pacientes en ese rango
+        self.count = count  # count() -> tamaño de la cola
+        self.rows = rows
+        self.offset = 0
+
+        self.tree = ttk.Treeview(parent,
+                                 columns=[column for column, _, _ in self.COLUMNS],
+                                 show="headings",
+                                 height=rows,
+                                 selectmode="browse")
+        for column, title, width in self.COLUMNS:
+            self.tree.heading(column, text=title)
+            self.tree.column(column, width=width,
+                             anchor="w" if column == 'nombre' else "center")
+
+        self.scrollbar = ttk.Scrollbar(parent, orient="vertical", command=self.on_scroll)
+        self.scrollbar.pack(side="right", fill="y")
+        self.tree.pack(side="left", fill="both", expand=True)
+
+        self.items = [self.tree.insert("", "end", values=()) for _ in range(rows)]
+        self.shown = [()] * rows  # Valores de cada fila, para no reescribir lo igual
+
+        self.tree.bind("<MouseWheel>", self.on_wheel)
+        self.tree.bind("<Button-4>", self.on_wheel)
+        self.tree.bind("<Button-5>", self.on_wheel)
+        self.tree.bind("<Prior>", lambda event: self.scroll_to(self.offset - self.rows))
+        self.tree.bind("<Next>", lambda event: self.scroll_to(self.offset + self.rows))
+
+    def on_scroll(self, action, amount, unit=None):
+        if action == "moveto":
+            self.scroll_to(int(float(amount) * self.count()))
+        else:
+            paso = self.rows if unit == "pages" else 1
+            self.scroll_to(self.offset + int(amount) * paso)
+
+    def on_wheel(self, event):
+        if event.num == 4 or event.delta > 0:
+            self.scroll_to(self.offset - 3)
+        else:
+            self.scroll_to(self.offset + 3)
+        return "break"
+
+    def scroll_to(self, offset):
+        self.offset = offset
+        self.refresh()
+
+    def refresh(self):
+        total = self.count()
+        self.offset = max(0, min(self.offset, total - self.rows))
+        pacientes = self.fetch(self.offset, self.rows)
+
+        for i, item in enumerate(self.items):
+            if i < len(pacientes):
+                paciente = pacientes[i]
+                valores = (self.offset + i + 1, paciente.nombre, paciente.especialidad,
+                           paciente.tiempo_espera_estimado,
+                           paciente.obtener_tiempo_total_estimado())
+            else:
+                valores = ()
+            if valores != self.shown[i]:
+                self.tree.item(item, values=valores)
+                self.shown[i] = valores
+
+        if total:
+            self.scrollbar.set(self.offset / total, min(1.0, (self.offset + self.rows) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+
 class ModernMedicalApp:
-    def __init__(self, root):
+    def __init__(self, root, controlador=None, metricas=None, metrics_path=None):
         self.root = root
         self.setup_window()
         self.setup_style()
-        self.controlador = ControladorTurnos()
+        self.controlador = controlador if controlador is not None else ControladorTurnos()
         self.graphviz = GraphvizGenerator()
 
+        # Se instrumenta antes de crear los widgets para que los botones
+        # queden enlazados a los métodos medidos
+        self.metricas = metricas
+        self.metrics_path = metrics_path
+        self.pending_metrics = None
+        self.profiling = None
+        if metricas is not None:
+            metricas.instrumentar(self.controlador, METODOS_CONTROLADOR, 'controlador')
+            metricas.instrumentar(self.graphviz, METODOS_GRAPHVIZ, 'graphviz')
+            metricas.instrumentar(self, METODOS_VISTA, 'vista')
+
         self.current_image = None
+        self.current_image_bytes = None  # PNG (de la caché) que se muestra ahora
         self.stats_image = None
+        self.renderer = BackgroundRenderer(self.root)
         self.auto_refresh = tk.BooleanVar(value=True)
 
+        # Redibujo por eventos: solo si la versión del controlador cambió
+        # desde el último dibujo. Registrar, atender y limpiar cambian la
+        # vista de la cola, la lista, el estado y los conteos por igual.
+        self.pending_redraw = None
+        self.drawn_version = None
+
         self.create_widgets()
         self.setup_layout()
         self.update_display()
 
-        self.auto_update_loop()
+        self.controlador.suscribir(self.on_controller_event)
+        if self.metricas is not None:
+            self.update_metrics()
 
     def setup_window(self):
         self.root.title(
@@ -37,6 +293,8 @@ class ModernMedicalApp:
         self.root.geometry("1200x800")
         self.root.configure(bg="#f0f4f8")
         self.root.resizable(True, True)
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.root.bind_all(PROFILE_SHORTCUT, self.toggle_profiling)
 
         self.root.update_idletasks()
         x = (self.root.winfo_screenwidth() // 2) - (1200 // 2)
@@ -125,15 +383,8 @@ class ModernMedicalApp:
                                bg="white")
         title_label.pack(pady=(0, 10))
 
-        especialidades_colores = {
-            'Medicina General': '#90EE90',      # lightgreen
-            'Pediatría': '#F08080',             # lightcoral
-            'Ginecología': '#FFB6C1',           # lightpink
-            'Dermatología': '#FFFFE0'           # lightyellow
-        }
-
         # Crear un frame para cada especialidad
-        for especialidad, color in especialidades_colores.items():
+        for especialidad, color in SPECIALTY_HEX_COLORS.items():
             esp_frame = tk.Frame(parent_frame, bg="white")
             esp_frame.pack(fill="x", pady=2)
 
@@ -158,7 +409,7 @@ class ModernMedicalApp:
         info_frame.pack(fill="x", pady=(15, 0))
 
         info_label = tk.Label(info_frame,
-                              text="Los colores se reflejan en la visualización Graphviz",
+                              text="Los colores se reflejan en la visualización de la cola",
                               font=('Segoe UI', 9, 'italic'),
                               bg="white",
                               fg="#666666")
@@ -267,18 +518,45 @@ class ModernMedicalApp:
 
         self.auto_refresh_check = ttk.Checkbutton(leyenda_frame,
                                                   text="Actualización automática",
-                                                  variable=self.auto_refresh)
+                                                  variable=self.auto_refresh,
+                                                  command=self.on_auto_refresh_toggle)
         self.auto_refresh_check.pack(pady=(10, 0))
 
     def create_right_panel(self):
         right_frame = tk.Frame(self.main_frame, bg="#f0f4f8")
         right_frame.pack(side="right", fill="both", expand=True)
 
-        viz_frame = ttk.LabelFrame(right_frame,
+        queue_tabs = ttk.Notebook(right_frame)
+        queue_tabs.pack(fill="both", expand=True, pady=(0, 10))
+
+        viz_frame = ttk.LabelFrame(queue_tabs,
                                    text="Visualización de Cola en Tiempo Real",
                                    style="Modern.TLabelframe",
                                    padding=15)
-        viz_frame.pack(fill="both", expand=True, pady=(0, 10))
+        queue_tabs.add(viz_frame, text="Visualización")
+
+        list_frame = ttk.LabelFrame(queue_tabs,
+                                    text="Pacientes en Espera",
+                                    style="Modern.TLabelframe",
+                                    padding=15)
+        queue_tabs.add(list_frame, text="Lista de Pacientes")
+        self.patient_list = VirtualPatientList(list_frame,
+                                               self.controlador.obtener_lista_pacientes,
+                                               self.controlador.cola.tamano)
+
+        # Sin el binario `dot` solo queda disponible el lienzo nativo
+        graphviz_ok = self.graphviz.has_executable()
+        self.queue_view = tk.StringVar(value="graphviz" if graphviz_ok else "canvas")
+
+        view_frame = tk.Frame(viz_frame, bg="white")
+        view_frame.pack(fill="x", pady=(0, 5))
+        ttk.Radiobutton(view_frame, text="Lienzo nativo", value="canvas",
+                        variable=self.queue_view,
+                        command=self.on_queue_view_change).pack(side="left", padx=5)
+        ttk.Radiobutton(view_frame, text="Graphviz", value="graphviz",
+                        variable=self.queue_view,
+                        command=self.on_queue_view_change,
+                        state="normal" if graphviz_ok else "disabled").pack(side="left", padx=5)
 
         canvas_frame = tk.Frame(viz_frame, bg="white", relief="sunken", bd=2)
         canvas_frame.pack(fill="both", expand=True)
@@ -287,7 +565,21 @@ class ModernMedicalApp:
                                      text="Cargando visualización...",
                                      bg="white",
                                      font=('Segoe UI', 12))
-        self.queue_canvas.pack(expand=True, fill="both")
+
+        self.queue_native = tk.Canvas(canvas_frame, bg="white", highlightthickness=0)
+        self.queue_native_scroll = ttk.Scrollbar(canvas_frame, orient="vertical",
+                                                 command=self.queue_native.yview)
+        self.queue_native.configure(yscrollcommand=self.queue_native_scroll.set)
+        self.queue_renderer = CanvasQueueRenderer(self.queue_native,
+                                                  self.graphviz.detail_limit)
+        self.show_queue_view()
+
+        self.render_status = tk.Label(viz_frame,
+                                      text="",
+                                      font=('Segoe UI', 9, 'italic'),
+                                      bg="white",
+                                      fg="#666666")
+        self.render_status.pack()
 
         btn_refresh = ttk.Button(viz_frame,
                                  text="Actualizar Visualización",
@@ -328,6 +620,15 @@ class ModernMedicalApp:
                                     fg="#2c3e50")
         self.system_info.pack(side="left", padx=20, pady=15)
 
+        # Solo se muestra con las métricas activadas
+        self.metrics_info = tk.Label(bottom_frame,
+                                     text="",
+                                     font=('Segoe UI', 9),
+                                     bg="#ecf0f1",
+                                     fg="#7f8c8d")
+        if self.metricas is not None:
+            self.metrics_info.pack(side="left", padx=10, pady=15)
+
         graphviz_status = "Graphviz disponible" if self.graphviz.is_available(
         ) else "Graphviz no disponible"
         self.graphviz_info = tk.Label(bottom_frame,
@@ -364,26 +665,25 @@ class ModernMedicalApp:
 
         success, mensaje = self.controlador.registrar_paciente(
             nombre, edad, especialidad)
+        self.redraw_now()
 
         if success:
             messagebox.showinfo("Éxito", mensaje)
             self.entry_nombre.delete(0, tk.END)
             self.entry_edad.delete(0, tk.END)
             self.combo_especialidad.set("")
-            self.update_display()
         else:
             messagebox.showerror("Error", mensaje)
 
     def atender_paciente(self):
         paciente, mensaje = self.controlador.atender_paciente()
+        self.redraw_now()
 
         if paciente:
             messagebox.showinfo("Paciente Atendido", mensaje)
         else:
             messagebox.showwarning("Aviso", mensaje)
 
-        self.update_display()
-
     def ver_siguiente(self):
         paciente, mensaje = self.controlador.ver_siguiente_paciente()
 
@@ -400,7 +700,8 @@ class ModernMedicalApp:
             posicion, mensaje = self.controlador.obtener_posicion_paciente(
                 nombre)
             if posicion != -1:
-                messagebox.showinfo("Paciente Encontrado", mensaje)
+                _, mensaje_espera = self.controlador.obtener_espera_paciente(nombre)
+                messagebox.showinfo("Paciente Encontrado", f"{mensaje}\n{mensaje_espera}")
             else:
                 messagebox.showwarning("No Encontrado", mensaje)
 
@@ -409,35 +710,43 @@ class ModernMedicalApp:
                                "¿Está seguro de que desea limpiar toda la cola?\n"
                                "Esta acción no se puede deshacer."):
             mensaje = self.controlador.limpiar_turnos()
+            self.redraw_now()
             messagebox.showinfo("Cola Limpiada", mensaje)
-            self.update_display()
 
     def generar_estadisticas(self):
         stats = self.controlador.obtener_estadisticas_especialidad()
 
-        if self.graphviz.is_available():
-            success, filepath, mensaje = self.graphviz.generate_statistics_graph(
-                stats)
-
-            if success and os.path.exists(filepath) and PIL_AVAILABLE:
-                try:
-                    img = Image.open(filepath)
-                    img = img.resize((400, 180), Image.Resampling.LANCZOS)
-                    self.stats_image = ImageTk.PhotoImage(img)
-                    self.stats_canvas.config(image=self.stats_image, text="")
-                except Exception as e:
-                    self.stats_canvas.config(
-                        text=f"Error al cargar imagen: {str(e)}")
-            else:
-                stats_text = "Estadísticas por Especialidad:\n\n"
-                for especialidad, cantidad in stats.items():
-                    stats_text += f"{especialidad}: {cantidad} paciente(s)\n"
-                self.stats_canvas.config(text=stats_text)
+        if self.graphviz.is_available() and PIL_AVAILABLE:
+            self.renderer.submit('stats',
+                                 lambda: self.render_statistics_image(stats),
+                                 lambda result: self.show_statistics_image(result, stats))
         else:
-            stats_text = "Estadísticas por Especialidad:\n\n"
-            for especialidad, cantidad in stats.items():
-                stats_text += f"{especialidad}: {cantidad} paciente(s)\n"
-            self.stats_canvas.config(text=stats_text)
+            self.show_statistics_text(stats)
+
+    def render_statistics_image(self, stats):
+        # Corre en el hilo de fondo: no debe tocar widgets
+        success, png_bytes, mensaje = self.graphviz.generate_statistics_image(
+            stats)
+        if not success:
+            return None
+        img = Image.open(io.BytesIO(png_bytes))
+        return img.resize((400, 180), Image.Resampling.LANCZOS)
+
+    def show_statistics_image(self, result, stats):
+        if isinstance(result, Exception):
+            self.stats_canvas.config(
+                text=f"Error al cargar imagen: {str(result)}")
+        elif result is None:
+            self.show_statistics_text(stats)
+        else:
+            self.stats_image = ImageTk.PhotoImage(result)
+            self.stats_canvas.config(image=self.stats_image, text="")
+
+    def show_statistics_text(self, stats):
+        stats_text = "Estadísticas por Especialidad:\n\n"
+        for especialidad, cantidad in stats.items():
+            stats_text += f"{especialidad}: {cantidad} paciente(s)\n"
+        self.stats_canvas.config(text=stats_text)
 
     def update_visualization_manual(self):
         self.update_display()
@@ -445,10 +754,71 @@ class ModernMedicalApp:
             "Actualizado", "Visualización actualizada correctamente")
 
     def update_display(self):
+        self.drawn_version = self.controlador.version
         self.update_queue_visualization()
+        self.patient_list.refresh()
         self.update_system_status()
 
+    def on_controller_event(self, evento):
+        # Los cambios que llegan solos (otro hilo, el servidor) solo se
+        # dibujan con la actualización automática activa
+        if self.auto_refresh.get():
+            self.schedule_redraw()
+
+    def schedule_redraw(self):
+        if self.pending_redraw is None:
+            self.pending_redraw = self.root.after(REDRAW_DEBOUNCE_MS,
+                                                  self.flush_redraw)
+
+    def redraw_now(self):
+        # Tras una acción del propio usuario se dibuja enseguida, aunque la
+        # actualización automática esté apagada
+        if self.pending_redraw is not None:
+            self.root.after_cancel(self.pending_redraw)
+        self.flush_redraw()
+
+    def on_auto_refresh_toggle(self):
+        # Al reactivar se dibuja lo que quedó pendiente mientras estaba apagada
+        if self.auto_refresh.get() and self.controlador.version != self.drawn_version:
+            self.schedule_redraw()
+
+    def flush_redraw(self):
+        self.pending_redraw = None
+        if self.controlador.version == self.drawn_version:
+            return
+        self.drawn_version = self.controlador.version
+
+        self.update_queue_visualization()
+        self.patient_list.refresh()
+        self.update_system_status()
+        # Las estadísticas solo se regeneran si el usuario ya las pidió
+        if self.stats_image is not None:
+            self.generar_estadisticas()
+
+    def show_queue_view(self):
+        if self.queue_view.get() == "canvas":
+            self.queue_canvas.pack_forget()
+            self.queue_native_scroll.pack(side="right", fill="y")
+            self.queue_native.pack(side="left", expand=True, fill="both")
+        else:
+            self.queue_native.pack_forget()
+            self.queue_native_scroll.pack_forget()
+            self.queue_canvas.pack(expand=True, fill="both")
+
+    def on_queue_view_change(self):
+        self.show_queue_view()
+        self.update_queue_visualization()
+
     def update_queue_visualization(self):
+        if self.queue_view.get() == "canvas":
+            # Solo la ventana visible; el lienzo aplica las diferencias
+            pacientes = self.controlador.obtener_lista_pacientes(
+                0, self.queue_renderer.detail_limit)
+            self.queue_renderer.update(pacientes,
+                                       self.controlador.cola.tamano(),
+                                       self.controlador.cola.obtener_tiempo_total_estimado())
+            return
+
         if not self.graphviz.is_available():
             self.queue_canvas.config(text="Graphviz no disponible\n\n"
                                      "Para visualización gráfica,\n"
@@ -456,28 +826,64 @@ class ModernMedicalApp:
                                      "pip install graphviz")
             return
 
-        pacientes = self.controlador.obtener_lista_pacientes()
-
-        success, filepath, mensaje = self.graphviz.generate_queue_graph(
-            pacientes)
-
-        if success and os.path.exists(filepath):
-            if PIL_AVAILABLE:
-                try:
-                    img = Image.open(filepath)
-                    img.thumbnail((600, 400), Image.Resampling.LANCZOS)
-                    self.current_image = ImageTk.PhotoImage(img)
-                    self.queue_canvas.config(image=self.current_image, text="")
-                except Exception as e:
-                    self.queue_canvas.config(
-                        text=f"Error al cargar imagen:\n{str(e)}")
-            else:
-                simple_repr = self.graphviz.generate_simple_queue_representation(
-                    pacientes)
-                self.queue_canvas.config(text=simple_repr)
+        if PIL_AVAILABLE:
+            # Solo se piden los pacientes que se dibujan en detalle; el resto
+            # de la cola se resume con los contadores del controlador
+            pacientes = self.controlador.obtener_lista_pacientes(
+                0, self.graphviz.detail_limit)
         else:
+            pacientes = self.controlador.obtener_lista_pacientes()
+        total_pacientes = self.controlador.cola.tamano()
+        conteo_especialidad = self.controlador.obtener_estadisticas_especialidad()
+        # Los mismos totales que la barra de estado y el lienzo
+        tiempo_total = self.controlador.cola.obtener_tiempo_total_estimado()
+        minutos = self.controlador.obtener_minutos_especialidad()
+
+        # El render corre en segundo plano; si llegan varios seguidos solo se
+        # dibuja el estado más reciente
+        self.render_status.config(text="Renderizando...")
+        self.renderer.submit('queue',
+                             lambda: self.render_queue_image(
+                                 pacientes, total_pacientes, conteo_especialidad,
+                                 tiempo_total, minutos),
+                             self.show_queue_image)
+
+    def render_queue_image(self, pacientes, total_pacientes, conteo_especialidad,
+                           tiempo_total=None, minutos=None):
+        # Corre en el hilo de fondo: no debe tocar widgets
+        if not PIL_AVAILABLE:
+            return 'text', self.graphviz.generate_simple_queue_representation(pacientes, tiempo_total), None
+
+        # El PNG llega en memoria y se decodifica sin pasar por disco
+        success, png_bytes, mensaje = self.graphviz.generate_queue_image(
+            pacientes, total_pacientes, conteo_especialidad, tiempo_total, minutos)
+
+        if not success:
+            return 'error', f"Error en visualización:\n{mensaje}", None
+        if png_bytes is self.current_image_bytes:
+            return 'unchanged', png_bytes, None  # Mismo objeto de la caché
+
+        img = Image.open(io.BytesIO(png_bytes))
+        img.thumbnail((600, 400), Image.Resampling.LANCZOS)
+        return 'image', png_bytes, img
+
+    def show_queue_image(self, result):
+        self.render_status.config(text="")
+
+        if isinstance(result, Exception):
+            self.current_image_bytes = None
             self.queue_canvas.config(
-                text=f"Error en visualización:\n{mensaje}")
+                text=f"Error al cargar imagen:\n{str(result)}")
+            return
+
+        kind, value, img = result
+        if kind == 'image':
+            self.current_image = ImageTk.PhotoImage(img)
+            self.current_image_bytes = value
+            self.queue_canvas.config(image=self.current_image, text="")
+        elif kind in ('text', 'error'):
+            self.current_image_bytes = None
+            self.queue_canvas.config(text=value)
 
     def update_system_status(self):
         now = datetime.datetime.now()
@@ -486,20 +892,88 @@ class ModernMedicalApp:
         estado = self.controlador.obtener_estado_cola()
         status_text = f"Última actualización: {timestamp} | "
         status_text += f"Cola: {estado['total_pacientes']} pacientes | "
-        status_text += f"Tiempo estimado: {estado['tiempo_total_estimado']} min"
+        status_text += f"Tiempo estimado: {estado['tiempo_total_estimado']} min "
+        status_text += f"(p50 {estado['tiempo_total_p50']}, p90 {estado['tiempo_total_p90']})"
+
+        if self.graphviz.is_available():
+            cache_stats = self.graphviz.get_cache_stats()
+            status_text += f" | Caché gráficos: {cache_stats['hits']} aciertos, {cache_stats['misses']} fallos"
 
         self.system_info.config(text=status_text)
 
-    def auto_update_loop(self):
-        if self.auto_refresh.get():
-            self.update_display()
+    def update_metrics(self):
+        # Pie con p50/p99 de las operaciones principales y exportación
+        # periódica del archivo de Prometheus
+        resumen = {operacion: (p50, p99) for operacion, _, _, p50, p99
+                   in self.metricas.resumen()}
+        partes = []
+        for operacion in METRICS_FOOTER:
+            if operacion in resumen:
+                p50, p99 = resumen[operacion]
+                partes.append(f"{operacion.split('.')[-1]} p50 {p50 * 1000:.1f} / "
+                              f"p99 {p99 * 1000:.1f} ms")
+        self.metrics_info.config(text=" | ".join(partes) or "Métricas: sin mediciones")
+
+        if self.metrics_path:
+            try:
+                self.metricas.escribir_prometheus(self.metrics_path)
+            except OSError as e:
+                self.metrics_info.config(text=f"Error al escribir métricas: {str(e)}")
+        self.pending_metrics = self.root.after(METRICS_REFRESH_MS, self.update_metrics)
+
+    def toggle_profiling(self, event=None):
+        # Primera pulsación: elegir directorio e iniciar; segunda: terminar
+        # antes de completar las llamadas
+        if self.profiling is not None and self.profiling.activa:
+            self.profiling.terminar()
+            return
+
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        directorio = filedialog.askdirectory(title="Directorio para los reportes de perfilado",
+                                             initialdir=PROFILE_DIR)
+        if not directorio:
+            return
+        self.profiling = SesionPerfilado(directorio, PROFILE_CALLS, self.on_profiling_done)
+        success, mensaje = self.profiling.iniciar(
+            [(self, METODOS_VISTA_PERFIL), (self.controlador, METODOS_CONTROLADOR)])
+        if success:
+            self.root.title(f"{self.root.title()} [perfilando]")
+        else:
+            messagebox.showerror("Error", mensaje)
 
-        self.root.after(5000, self.auto_update_loop)
+    def on_profiling_done(self, success, mensaje, rutas):
+        # Puede llegar desde dentro de update_display: se avisa después
+        self.root.title(self.root.title().replace(" [perfilando]", ""))
+        if success:
+            self.root.after(0, lambda: messagebox.showinfo("Perfilado", mensaje))
+        else:
+            self.root.after(0, lambda: messagebox.showerror("Error", mensaje))
+
+    def on_close(self):
+        if self.profiling is not None and self.profiling.activa:
+            self.profiling.terminar()
+        self.controlador.desuscribir(self.on_controller_event)
+        if self.pending_redraw is not None:
+            self.root.after_cancel(self.pending_redraw)
+        if self.pending_metrics is not None:
+            self.root.after_cancel(self.pending_metrics)
+            if self.metrics_path:
+                self.metricas.escribir_prometheus(self.metrics_path)
+        self.renderer.stop()
+        # Asegura que el diario quede escrito en disco antes de salir
+        if self.controlador.diario is not None:
+            self.controlador.diario.cerrar()
+        self.root.destroy()
 
 
 def main():
     root = tk.Tk()
-    app = ModernMedicalApp(root)
+    metricas, metrics_path = None, None
+    destino = os.environ.get(METRICS_ENV)
+    if destino:
+        metricas = RegistroMetricas()
+        metrics_path = os.path.join(DATA_DIR, 'metricas.prom') if destino == '1' else destino
+    app = ModernMedicalApp(root, recuperar_controlador(DATA_DIR), metricas, metrics_path)
     root.mainloop()
 
 